@@ -25,6 +25,18 @@ const getSupabaseClient = () => {
   );
 };
 
+// --- Optional reduced-dimension ranking (sql/2026-10-22_reduced_embeddings.sql) ---
+// EMBEDDING_DIMENSIONS=256 ranks against artists.embedding_256 with rank_artists_ann_256.
+// The full embedding is still stored; the query is its first N values, re-normalized,
+// which is what the embeddings API returns for `dimensions: N`.
+const reducedDimensions = Number(process.env.EMBEDDING_DIMENSIONS) || null;
+
+const shortenEmbedding = (vector, dims) => {
+  const head = vector.slice(0, dims);
+  const norm = Math.sqrt(head.reduce((sum, v) => sum + v * v, 0));
+  return norm > 0 ? head.map(v => v / norm) : head;
+};
+
 // --- Main /match endpoint ---
 router.post("/", async (req, res) => {
   try {
@@ -72,13 +84,27 @@ router.post("/", async (req, res) => {
       }
     }
 
-    // 3️⃣ Call ranking function
-    const { data, error } = await supabase.rpc("rank_artists_by_embedding", {
+    // 3️⃣ Call ranking function: HNSW candidates + rerank (sql/2026-10-19_rank_artists_ann.sql),
+    //     or the full-scan function on databases where that migration isn't applied yet
+    const rankParams = {
       query_embedding: embedding,
       only_successful_collabs: only_successful,
       match_count: topN,
       min_semantic_similarity: minSim
-    });
+    };
+    let data, error;
+    if (reducedDimensions && reducedDimensions < embedding.length) {
+      ({ data, error } = await supabase.rpc(`rank_artists_ann_${reducedDimensions}`, {
+        ...rankParams,
+        query_embedding: shortenEmbedding(embedding, reducedDimensions)
+      }));
+    }
+    if (!data && (!error || error.code === "PGRST202")) {
+      ({ data, error } = await supabase.rpc("rank_artists_ann", rankParams));
+    }
+    if (error && error.code === "PGRST202") {
+      ({ data, error } = await supabase.rpc("rank_artists_by_embedding", rankParams));
+    }
 
     if (error) {
       console.error("Supabase RPC error:", error);
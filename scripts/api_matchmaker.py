@@ -1,13 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
 from pydantic import BaseModel
 from typing import List, Optional
+from contextlib import asynccontextmanager
+import atexit
+import itertools
 import os
-import pandas as pd
+import threading
+import time
 import numpy as np
-from openai import OpenAI
 from dotenv import load_dotenv
-from sklearn.metrics.pairwise import cosine_similarity
-import requests
+
+from catalog_feed import CatalogFeed
+from catalog_snapshot import DEFAULT_ROOT, Catalog, CatalogWatcher
+from embedding_client import EmbeddingBatcher
+from embedding_dims import configured_dimensions, configured_reduction
+from match_cache import MatchCache, canonical_tags, etag_matches, make_etag, result_digest
+from precompute_matches import DEFAULT_PATH as TOP_MATCHES_PATH, TopMatchesWatcher
+from supabase_rest import SupabaseError, get_client
+from tag_bitsets import TagHistory
+from write_behind import QueueFull, WriteBehind
 
 # Load environment variables
 load_dotenv()
@@ -17,29 +28,123 @@ api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     raise ValueError("OPENAI_API_KEY not found in .env file")
 
-client = OpenAI(api_key=api_key)
+def openai_client():
+    # Imported here: the openai package and its client take about a second, paid by
+    # warm-up (or the first embedding) instead of every process start
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+# Concurrent embedding requests (matches and ingested artists) share one OpenAI call
+embedder = EmbeddingBatcher(openai_client, max_batch=int(os.getenv("EMBEDDING_MAX_BATCH", "64")),
+                            max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5")))
+
+# Supabase client (pooled session, retries; reads SUPABASE_URL / SUPABASE_SERVICE_KEY)
+db = get_client()
+
+# Shared catalog snapshot (published by catalog_snapshot.py, memory-mapped by every worker).
+catalog_watcher = CatalogWatcher(os.getenv("CATALOG_DIR", DEFAULT_ROOT))
+
+# Change feed (catalog_feed.py): the catalog is loaded once and kept current by polling
+# Supabase every CATALOG_FEED_INTERVAL seconds. 0 turns it off: every request then builds
+# the catalog from Supabase unless a snapshot is published.
+feed_interval = float(os.getenv("CATALOG_FEED_INTERVAL", "5"))
+catalog_feed = None
+if feed_interval > 0:
+    catalog_feed = CatalogFeed(db, catalog_watcher, mode=os.getenv("CATALOG_FEED_MODE", "updated_at"),
+                               interval=feed_interval, dimensions=configured_dimensions(),
+                               reduction=configured_reduction())
+
+# Ingested artists: searchable in this worker at once under a provisional (negative) id,
+# persisted by a write-behind queue, then re-keyed to the id Supabase assigned.
+_provisional_ids = {}  # artist_name -> provisional id, until its upsert lands
+_provisional_lock = threading.Lock()
+_next_provisional_id = itertools.count(-1, -1)
+
+def _artists_persisted(rows, returned=()):
+    """WriteBehind callback: swap provisional ids for the real ones (rejected rows just leave)"""
+    if catalog_feed is None or catalog_feed.live is None:
+        return
+    real_ids = {r["artist_name"]: r["id"] for r in returned}
+    with _provisional_lock:
+        provisional = [_provisional_ids.pop(r["artist_name"], None) for r in rows]
+    catalog_feed.unpin_artists(pid for pid in provisional if pid is not None)
+    catalog_feed.live.apply_artists({**r, "id": real_ids[r["artist_name"]]}
+                                    for r in rows if r["artist_name"] in real_ids)
+
+artist_writer = WriteBehind(
+    db, "artists", key="artist_name",
+    chunk_size=int(os.getenv("ARTIST_WRITE_CHUNK", "500")),
+    max_delay=float(os.getenv("ARTIST_WRITE_MAX_DELAY", "1.0")),
+    max_pending=int(os.getenv("ARTIST_WRITE_MAX_PENDING", "10000")),
+    returning="id,artist_name",
+    on_flushed=_artists_persisted,
+    on_dropped=_artists_persisted,
+)
+atexit.register(artist_writer.close)
 
-# Supabase credentials
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
+# Nightly precomputed top-k per artist (precompute_matches.py), reloaded when the job replaces the file
+top_matches = TopMatchesWatcher(os.getenv("TOP_MATCHES_PATH", TOP_MATCHES_PATH))
 
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env file")
+# Combined score weights: (semantic similarity, historical success rate)
+SCORE_WEIGHTS = (0.6, 0.4)
 
-# Supabase API headers
-headers = {
-    "apikey": supabase_key,
-    "Authorization": f"Bearer {supabase_key}",
-    "Content-Type": "application/json"
-}
+# /matches results by canonical request, valid for the catalog version they were computed from.
+# MATCH_CACHE_SIZE=0 turns it off.
+match_cache = MatchCache(int(os.getenv("MATCH_CACHE_SIZE", "1024")))
+
+# Cold start: the module imports only what serving needs (pandas, pyarrow and scipy are loaded
+# by the code paths that use them). Warm-up loads the catalog (a published snapshot is
+# memory-mapped), creates the OpenAI client and scores one query, so the first real request
+# finds everything in place. /health answers as soon as the server is up; /ready only after warm-up.
+# STARTUP_WARMUP: background (default, /health is served meanwhile), blocking (the server
+# accepts connections after warm-up) or off (the first request pays).
+startup = {"mode": os.getenv("STARTUP_WARMUP", "background"), "ready": False,
+           "attempts": 0, "warmup_s": None, "last_error": None}
+
+def warm_up():
+    """Load everything the first request would; retries until Supabase/the snapshot is reachable"""
+    t0 = time.perf_counter()
+    while True:
+        startup["attempts"] += 1
+        try:
+            catalog = load_catalog()
+            embedder.client  # imports openai and creates the client
+            top_matches.get()
+            if len(catalog):
+                # Pages in the mapped embeddings and profiles, and runs BLAS and the history scoring once
+                tags = catalog.tags[0]
+                rows = catalog.candidates(tags, 0)
+                width = getattr(catalog, "base", catalog).embeddings.shape[1]
+                catalog.similarities(np.ones(width, dtype=np.float32), rows)
+                catalog.history_rates(tags, rows)
+            break
+        except Exception as e:
+            startup["last_error"] = str(getattr(e, "detail", e))
+            print(f"⚠️  Warm-up failed ({startup['last_error']}), retrying")
+            time.sleep(min(30, 2 ** startup["attempts"]))
+    startup["warmup_s"] = round(time.perf_counter() - t0, 3)
+    startup["ready"] = True
+    print(f"✅ Warm-up done in {startup['warmup_s']} s ({len(catalog)} artists)")
+
+@asynccontextmanager
+async def lifespan(app):
+    if startup["mode"] == "blocking":
+        warm_up()
+    elif startup["mode"] == "off":
+        startup["ready"] = True
+    else:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    yield
 
 # Initialize FastAPI app
-app = FastAPI(title="Artist Collaboration Matchmaker API")
+app = FastAPI(title="Artist Collaboration Matchmaker API", lifespan=lifespan)
 
 # Request/Response schemas
 class MatchRequest(BaseModel):
     tags: str
     top_n: Optional[int] = 10
+    # Only score artists sharing at least this many tags with the request (0 = score everyone)
+    min_tag_overlap: Optional[int] = 0
 
 class ArtistMatch(BaseModel):
     artist_name: str
@@ -54,81 +159,63 @@ class MatchResponse(BaseModel):
     matches: List[ArtistMatch]
     total_artists_analyzed: int
 
-def generate_embedding(tags):
-    """Generate embedding for given tags using OpenAI"""
+class ArtistIn(BaseModel):
+    artist_name: str
+    artist_tags: str
+
+class ArtistIngestRequest(BaseModel):
+    artists: List[ArtistIn]
+
+class ArtistIngestResponse(BaseModel):
+    accepted: int
+    searchable: bool
+    queue_depth: int
+
+def generate_embedding(tags, dimensions=None):
+    """Generate embedding for given tags using OpenAI (micro-batched with concurrent requests)"""
     try:
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=tags
-        )
-        return response.data[0].embedding
+        return embedder.embed(tags, dimensions)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating embedding: {str(e)}")
 
 def fetch_artists():
-    """Fetch all artists with embeddings from Supabase"""
-    url = f"{supabase_url}/rest/v1/artists?select=id,artist_name,artist_tags,embedding"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        return response.json()
-    else:
+    """Fetch all artists with embeddings from Supabase (paged, so tables over the max-rows limit are complete)"""
+    try:
+        return db.select_all("artists", "id,artist_name,artist_tags,embedding")
+    except (SupabaseError, OSError):
         raise HTTPException(status_code=500, detail="Error fetching artists from database")
 
 def fetch_collaboration_history():
     """Fetch historical collaboration data from Supabase"""
-    url = f"{supabase_url}/rest/v1/maindb?select=*"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        return pd.DataFrame(response.json())
-    else:
+    import pandas as pd
+    try:
+        return pd.DataFrame(db.select_all("maindb", "*"))
+    except (SupabaseError, OSError):
         raise HTTPException(status_code=500, detail="Error fetching collaboration history")
 
-def analyze_artist_pair_history(user_tags, artist_tags, history_df):
+def load_catalog():
+    """The live catalog (snapshot or Supabase, plus the change feed), or one built for this request"""
+    if catalog_feed is not None:
+        try:
+            return catalog_feed.view()
+        except (SupabaseError, OSError):
+            raise HTTPException(status_code=500, detail="Error loading artist catalog")
+    catalog = catalog_watcher.get()
+    if catalog is None:
+        catalog = Catalog.build(fetch_artists(), fetch_collaboration_history(),
+                                configured_dimensions(), configured_reduction())
+    return catalog
+
+def analyze_artist_pair_history(user_tags, artist_tags, history):
     """
     Analyze historical patterns for similar tag combinations
     Returns a success probability based on historical data
+
+    `history` is a TagHistory (see tag_bitsets.py) or the raw history DataFrame
     """
-    if history_df.empty:
-        return 0.5  # Neutral score if no history
-    
-    # Combine user tags and artist tags
-    combined_tags_set = set(user_tags.lower().split(', ')) | set(artist_tags.lower().split(', '))
-    
-    # Find relevant collaborations with similar genres
-    relevant_collabs = []
-    
-    for _, row in history_df.iterrows():
-        artist1_tags = set(str(row['artist_01_tags']).lower().split(', '))
-        artist2_tags = set(str(row['artist_02_tags']).lower().split(', '))
-        collab_tags = artist1_tags | artist2_tags
-        
-        # Calculate tag overlap
-        overlap = len(combined_tags_set & collab_tags)
-        if overlap > 0:
-            relevant_collabs.append({
-                'overlap': overlap,
-                'status': row['collaboration_status']
-            })
-    
-    if not relevant_collabs:
-        return 0.5  # Neutral score if no similar collaborations found
-    
-    # Weight by overlap - more similar collaborations have more influence
-    total_weight = 0
-    success_weight = 0
-    
-    for collab in relevant_collabs:
-        weight = collab['overlap']
-        total_weight += weight
-        if collab['status'] == 'Success':
-            success_weight += weight
-    
-    # Calculate weighted success probability
-    historical_score = success_weight / total_weight if total_weight > 0 else 0.5
-    
-    return historical_score
+    if not isinstance(history, TagHistory):
+        history = TagHistory.from_frame(history)
+    return float(history.success_rates(user_tags, [artist_tags])[0])
 
 def get_recommendation_text(score):
     """Get recommendation text based on combined score"""
@@ -145,7 +232,11 @@ def home():
         "message": "Artist Collaboration Matchmaker API is running 🚀",
         "endpoints": {
             "/matches": "POST - Find best artist matches for given tags",
-            "/health": "GET - Check API health"
+            "/artists": "POST - Add or update artists (searchable at once, saved in the background)",
+            "/artists/{artist_id}/matches": "GET - Precomputed best matches for a catalog artist",
+            "/health": "GET - Check API health",
+            "/ready": "GET - 200 once the catalog and OpenAI client are warmed up, 503 before",
+            "/metrics": "GET - Catalog freshness, embedding batching and write queue stats"
         }
     }
 
@@ -153,56 +244,179 @@ def home():
 def health_check():
     return {"status": "healthy", "service": "artist-matchmaker"}
 
-@app.post("/matches", response_model=MatchResponse)
-def find_matches(request: MatchRequest):
+@app.get("/ready")
+def readiness(response: Response):
+    if not startup["ready"]:
+        response.status_code = 503
+    return {"status": "ready" if startup["ready"] else "warming up", **startup}
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "startup": startup,
+        "catalog_feed": catalog_feed.metrics() if catalog_feed is not None else None,
+        "embeddings": embedder.metrics(),
+        "artist_writes": artist_writer.metrics(),
+        "match_cache": match_cache.metrics()
+    }
+
+@app.post("/artists", response_model=ArtistIngestResponse, status_code=202)
+def ingest_artists(request: ArtistIngestRequest):
     """
-    Find best artist matches based on user tags.
-    Combines semantic similarity with historical collaboration patterns.
+    Add or update artists by name.
+    Tags are embedded in one batched call, the artists are searchable in this worker
+    right away, and the upsert to Supabase is queued (write-behind).
     """
-    # Generate embedding for user tags
-    user_embedding = generate_embedding(request.tags)
+    # Last entry wins for repeated names
+    artists = {}
+    for artist in request.artists:
+        name, tags = artist.artist_name.strip(), artist.artist_tags.strip()
+        if not name or not tags:
+            raise HTTPException(status_code=422, detail="artist_name and artist_tags must not be empty")
+        artists[name] = tags
+    if not artists:
+        raise HTTPException(status_code=422, detail="No artists given")
+    
+    # Refuse before paying for embeddings when the write queue cannot take them
+    if artist_writer.free() < len(artists):
+        raise HTTPException(status_code=503, detail="Artist write queue is full, retry later")
+    
+    try:
+        embeddings = embedder.embed_many(list(artists.values()))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating embeddings: {str(e)}")
+    rows = [{"artist_name": name, "artist_tags": tags, "embedding": embedding}
+            for (name, tags), embedding in zip(artists.items(), embeddings)]
+    
+    # Make them searchable before queueing, so the flush callback always finds the provisional ids
+    provisional, created = [], []
+    if catalog_feed is not None:
+        load_catalog()
+        with _provisional_lock:
+            for row in rows:
+                pid = _provisional_ids.get(row["artist_name"])
+                if pid is None:
+                    pid = _provisional_ids[row["artist_name"]] = next(_next_provisional_id)
+                    created.append(pid)
+                provisional.append({**row, "id": pid})
+        catalog_feed.pin_artists(provisional)
     
-    # Fetch all artists with embeddings
-    artists = fetch_artists()
-    artists_with_embeddings = [a for a in artists if a.get('embedding')]
+    try:
+        artist_writer.put(rows)
+    except QueueFull:
+        # Only the artists this request added; names already queued keep their provisional rows
+        if created:
+            with _provisional_lock:
+                for r in provisional:
+                    if r["id"] in created:
+                        del _provisional_ids[r["artist_name"]]
+            catalog_feed.unpin_artists(created)
+        raise HTTPException(status_code=503, detail="Artist write queue is full, retry later")
     
-    if not artists_with_embeddings:
+    return ArtistIngestResponse(
+        accepted=len(rows),
+        searchable=bool(provisional),
+        queue_depth=artist_writer.metrics()["depth"]
+    )
+
+def rank_matches(request, catalog):
+    """(top matches, artists analyzed) for a match request against a catalog"""
+    if not len(catalog):
         raise HTTPException(status_code=404, detail="No artists with embeddings found")
     
-    # Fetch collaboration history
-    history_df = fetch_collaboration_history()
+    # Generate embedding for the canonical tags, so every spelling of a request ranks the same.
+    # A truncated catalog gets a query of its own size straight from the API.
+    user_embedding = generate_embedding(canonical_tags(request.tags), catalog.query_dimensions)
     
-    # Calculate scores for each artist
-    results = []
+    # Cheap tag-overlap pre-filter before embedding scoring
+    rows = catalog.candidates(request.tags, request.min_tag_overlap or 0)
+    
+    # Semantic similarity and historical success probability for every candidate at once
+    similarities = catalog.similarities(user_embedding, rows)
+    historical_scores = catalog.history_rates(request.tags, rows)
+    
+    # Combined score: 60% semantic similarity + 40% historical patterns
+    semantic_weight, history_weight = SCORE_WEIGHTS
+    combined_scores = (semantic_weight * similarities) + (history_weight * historical_scores)
     
-    for artist in artists_with_embeddings:
-        # Calculate embedding similarity (semantic similarity)
-        artist_embedding = artist['embedding']
-        similarity = cosine_similarity([user_embedding], [artist_embedding])[0][0]
-        
-        # Calculate historical success probability
-        historical_score = analyze_artist_pair_history(request.tags, artist['artist_tags'], history_df)
-        
-        # Combined score: 60% semantic similarity + 40% historical patterns
-        combined_score = (0.6 * similarity) + (0.4 * historical_score)
-        
+    # Sort by (rounded) combined score and keep the top N
+    order = np.argsort(-np.round(combined_scores, 3), kind="stable")[:request.top_n]
+    
+    results = []
+    for i in order.tolist():
+        row = int(rows[i])
         results.append(ArtistMatch(
-            artist_name=artist['artist_name'],
-            artist_tags=artist['artist_tags'],
-            semantic_similarity=round(float(similarity), 3),
-            historical_success_rate=round(float(historical_score), 3),
-            combined_score=round(float(combined_score), 3),
-            recommendation=get_recommendation_text(combined_score)
+            artist_name=catalog.names[row],
+            artist_tags=catalog.tags[row],
+            semantic_similarity=round(float(similarities[i]), 3),
+            historical_success_rate=round(float(historical_scores[i]), 3),
+            combined_score=round(float(combined_scores[i]), 3),
+            recommendation=get_recommendation_text(combined_scores[i])
         ))
+    return results, len(rows)
+
+@app.post("/matches", response_model=MatchResponse)
+def find_matches(request: MatchRequest, response: Response, if_none_match: Optional[str] = Header(None)):
+    """
+    Find best artist matches based on user tags.
+    Combines semantic similarity with historical collaboration patterns.
+    Results are cached per catalog version; the ETag lets clients revalidate with If-None-Match.
+    """
+    # Artists with embeddings, tag bitsets and history (shared snapshot or fresh from Supabase)
+    catalog = load_catalog()
     
-    # Sort by combined score
-    results.sort(key=lambda x: x.combined_score, reverse=True)
+    # The version keys this worker's cache only; a catalog built for one request has none and is not cached
+    version = catalog.version
+    key = MatchCache.key(request.tags, request.top_n, request.min_tag_overlap or 0, SCORE_WEIGHTS)
+    cached = match_cache.get(key, version)
+    if cached is None:
+        results, analyzed = rank_matches(request, catalog)
+        cached = (results, analyzed, result_digest([m.model_dump() for m in results], analyzed))
+        match_cache.put(key, version, cached)
+    results, analyzed, digest = cached
+    
+    # ETag from the response content, so any worker serving the same ranking agrees on it
+    etag = make_etag(request.tags, digest)
+    if etag_matches(if_none_match, etag):
+        match_cache.not_modified()
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     
-    # Return top N matches
     return MatchResponse(
         user_tags=request.tags,
-        matches=results[:request.top_n],
-        total_artists_analyzed=len(artists_with_embeddings)
+        matches=results,
+        total_artists_analyzed=analyzed
+    )
+
+@app.get("/artists/{artist_id}/matches", response_model=MatchResponse)
+def artist_matches(artist_id: int, top_n: int = 10):
+    """
+    Best matches for an artist already in the catalog, from the nightly precomputed table.
+    Artists added since the last run are not in it yet: use POST /matches with their tags.
+    """
+    table = top_matches.get()
+    if table is None:
+        raise HTTPException(status_code=503, detail="Precomputed matches not available (run precompute_matches.py)")
+    row = table.row(artist_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Artist {artist_id} not in the precomputed matches")
+    
+    results = []
+    for i, neighbor in enumerate(table.neighbors[row][:max(0, top_n)].tolist()):
+        combined = float(table.combined[row, i])
+        results.append(ArtistMatch(
+            artist_name=table.names[neighbor],
+            artist_tags=table.tags[neighbor],
+            semantic_similarity=round(float(table.similarity[row, i]), 3),
+            historical_success_rate=round(float(table.history[row, i]), 3),
+            combined_score=round(combined, 3),
+            recommendation=get_recommendation_text(combined)
+        ))
+    
+    return MatchResponse(
+        user_tags=table.tags[row],
+        matches=results,
+        total_artists_analyzed=len(table) - 1
     )
 
 # Run locally
@@ -4,7 +4,9 @@ import numpy as np
 from openai import OpenAI
 from dotenv import load_dotenv
 from sklearn.metrics.pairwise import cosine_similarity
-import requests
+
+from supabase_rest import SupabaseError, get_client
+from tag_bitsets import TagHistory, TagVocab, candidate_mask
 
 # Load environment variables
 load_dotenv()
@@ -16,19 +18,8 @@ if not api_key:
 
 client = OpenAI(api_key=api_key)
 
-# Supabase credentials
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env file")
-
-# Supabase API headers
-headers = {
-    "apikey": supabase_key,
-    "Authorization": f"Bearer {supabase_key}",
-    "Content-Type": "application/json"
-}
+# Supabase client (pooled session, retries; reads SUPABASE_URL / SUPABASE_SERVICE_KEY)
+db = get_client()
 
 def generate_embedding(tags):
     """Generate embedding for given tags using OpenAI"""
@@ -43,77 +34,39 @@ def generate_embedding(tags):
         return None
 
 def fetch_artists():
-    """Fetch all artists with embeddings from Supabase"""
-    url = f"{supabase_url}/rest/v1/artists?select=id,artist_name,artist_tags,embedding"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error fetching artists: {response.status_code}")
+    """Fetch all artists with embeddings from Supabase (paged, so tables over the max-rows limit are complete)"""
+    try:
+        return db.select_all("artists", "id,artist_name,artist_tags,embedding")
+    except (SupabaseError, OSError) as e:
+        print(f"Error fetching artists: {e}")
         return []
 
 def fetch_collaboration_history():
     """Fetch historical collaboration data from Supabase"""
-    url = f"{supabase_url}/rest/v1/maindb?select=*"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        return pd.DataFrame(response.json())
-    else:
-        print(f"Error fetching collaboration history: {response.status_code}")
+    try:
+        return pd.DataFrame(db.select_all("maindb", "*"))
+    except (SupabaseError, OSError) as e:
+        print(f"Error fetching collaboration history: {e}")
         return pd.DataFrame()
 
-def analyze_artist_pair_history(user_tags, artist_tags, history_df):
+def analyze_artist_pair_history(user_tags, artist_tags, history):
     """
     Analyze historical patterns for similar tag combinations
     Returns a success probability based on historical data
+
+    `history` is a TagHistory (see tag_bitsets.py) or the raw history DataFrame
     """
-    if history_df.empty:
-        return 0.5  # Neutral score if no history
-    
-    # Combine user tags and artist tags
-    combined_tags_set = set(user_tags.lower().split(', ')) | set(artist_tags.lower().split(', '))
-    
-    # Find relevant collaborations with similar genres
-    relevant_collabs = []
-    
-    for _, row in history_df.iterrows():
-        artist1_tags = set(str(row['artist_01_tags']).lower().split(', '))
-        artist2_tags = set(str(row['artist_02_tags']).lower().split(', '))
-        collab_tags = artist1_tags | artist2_tags
-        
-        # Calculate tag overlap
-        overlap = len(combined_tags_set & collab_tags)
-        if overlap > 0:
-            relevant_collabs.append({
-                'overlap': overlap,
-                'status': row['collaboration_status']
-            })
-    
-    if not relevant_collabs:
-        return 0.5  # Neutral score if no similar collaborations found
-    
-    # Weight by overlap - more similar collaborations have more influence
-    total_weight = 0
-    success_weight = 0
-    
-    for collab in relevant_collabs:
-        weight = collab['overlap']
-        total_weight += weight
-        if collab['status'] == 'Success':
-            success_weight += weight
-    
-    # Calculate weighted success probability
-    historical_score = success_weight / total_weight if total_weight > 0 else 0.5
-    
-    return historical_score
+    if not isinstance(history, TagHistory):
+        history = TagHistory.from_frame(history)
+    return float(history.success_rates(user_tags, [artist_tags])[0])
 
-def find_best_matches(user_tags, top_n=10):
+def find_best_matches(user_tags, top_n=10, min_tag_overlap=0):
     """
     Find best artist matches for the user based on:
     1. Embedding similarity (semantic matching)
     2. Historical collaboration patterns
+
+    With min_tag_overlap > 0 only artists sharing that many tags with the user are scored.
     """
     print(f"\n{'='*60}")
     print(f"Finding best artist matches for tags: {user_tags}")
@@ -140,21 +93,30 @@ def find_best_matches(user_tags, top_n=10):
     
     # Step 3: Fetch collaboration history
     print("Step 3: Fetching historical collaboration data...")
-    history_df = fetch_collaboration_history()
-    print(f"✅ Loaded {len(history_df)} historical collaborations\n")
+    history = TagHistory.from_frame(fetch_collaboration_history())
+    print(f"✅ Loaded {len(history)} historical collaborations ({len(history.vocab)} distinct tags)\n")
+    
+    if min_tag_overlap:
+        artist_tags = [a['artist_tags'] for a in artists_with_embeddings]
+        vocab = TagVocab.from_strings([user_tags], artist_tags)
+        query_bits, _ = vocab.encode(user_tags)
+        profiles = vocab.encode_many(artist_tags)
+        keep = candidate_mask(query_bits, profiles, min_tag_overlap)
+        artists_with_embeddings = [a for a, k in zip(artists_with_embeddings, keep) if k]
+        print(f"✅ {len(artists_with_embeddings)} artists share at least {min_tag_overlap} tag(s) with you\n")
     
     # Step 4: Calculate scores for each artist
     print("Step 4: Calculating compatibility scores...\n")
     results = []
     
-    for artist in artists_with_embeddings:
+    # Historical success probability for every artist at once
+    historical_scores = history.success_rates(user_tags, [a['artist_tags'] for a in artists_with_embeddings])
+    
+    for artist, historical_score in zip(artists_with_embeddings, historical_scores):
         # Calculate embedding similarity (semantic similarity)
         artist_embedding = artist['embedding']
         similarity = cosine_similarity([user_embedding], [artist_embedding])[0][0]
         
-        # Calculate historical success probability
-        historical_score = analyze_artist_pair_history(user_tags, artist['artist_tags'], history_df)
-        
         # Combined score: 60% semantic similarity + 40% historical patterns
         # You can adjust these weights based on preference
         combined_score = (0.6 * similarity) + (0.4 * historical_score)
@@ -0,0 +1,132 @@
+"""
+Startup benchmark for the matchmaker API (api_matchmaker.py).
+
+On a cold start (a Render deploy, a scaled-up or restarted instance), what counts is:
+- import time: `import api_matchmaker` in a fresh interpreter, and which heavy
+  packages it pulls in (none of pandas, pyarrow, scipy, sklearn or openai should
+  be needed to start serving)
+- first response: from spawning uvicorn to the first 200 from /health
+- ready: until /ready returns 200 (catalog loaded, OpenAI client created, one
+  query scored)
+- first match: the first POST /matches after ready, with --tags (makes one real
+  OpenAI call)
+
+Each STARTUP_WARMUP mode is started --runs times. The environment (OPENAI_API_KEY,
+SUPABASE_*, CATALOG_DIR) is passed through, so publish a snapshot first to
+measure the memory-mapped start:
+    python scripts/catalog_snapshot.py publish
+
+Usage:
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --modes background blocking off --runs 5 --tags "pop, dance-pop"
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ('pandas', 'pyarrow', 'scipy', 'sklearn', 'openai')
+
+IMPORT_PROBE = f"""
+import json, sys, time
+t0 = time.perf_counter()
+import api_matchmaker
+print(json.dumps({{'import_s': time.perf_counter() - t0,
+                  'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import():
+    """(seconds, heavy modules loaded) for importing the API in a fresh interpreter."""
+    env = {**os.environ, 'STARTUP_WARMUP': 'off'}
+    out = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=SCRIPTS_DIR, env=env, check=True,
+                         capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    return result['import_s'], result['heavy']
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _poll(url, deadline, status=200):
+    """Seconds until url answers with status, or None if the deadline passes first."""
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == status:
+                return time.perf_counter()
+        except requests.RequestException:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def measure_start(mode, tags=None, timeout=120.0):
+    """Seconds from spawning uvicorn to first /health, /ready and (with tags) first /matches."""
+    port = _free_port()
+    base = f'http://127.0.0.1:{port}'
+    env = {**os.environ, 'STARTUP_WARMUP': mode}
+    t0 = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'api_matchmaker:app', '--port', str(port),
+                               '--log-level', 'warning'], cwd=SCRIPTS_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = t0 + timeout
+        health = _poll(f'{base}/health', deadline)
+        ready = _poll(f'{base}/ready', deadline) if health is not None else None
+        first_match = None
+        if tags and ready is not None:
+            started = time.perf_counter()
+            response = requests.post(f'{base}/matches', json={'tags': tags}, timeout=timeout)
+            if response.ok:
+                first_match = time.perf_counter() - started
+        return {
+            'health_s': health - t0 if health is not None else None,
+            'ready_s': ready - t0 if ready is not None else None,
+            'first_match_s': first_match,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _summary(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return '      n/a'
+    return f"{statistics.median(values):>9.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time and time to first response of the matchmaker API.')
+    parser.add_argument('--modes', nargs='+', choices=['background', 'blocking', 'off'], default=['background', 'off'],
+                        help='STARTUP_WARMUP modes to start')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--tags', help='Also time the first POST /matches (one OpenAI call per run)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Seconds to wait for a server')
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    print(f"\nimport api_matchmaker: {_summary([s for s, _ in imports]).strip()} s (median of {args.runs})")
+    print(f"heavy modules loaded at import: {', '.join(imports[0][1]) or 'none'}")
+
+    print(f"\nMedian seconds from process start ({args.runs} runs per mode)\n")
+    print(f"{'mode':<11} {'/health':>9} {'/ready':>9} {'1st match':>9}")
+    for mode in args.modes:
+        runs = [measure_start(mode, args.tags, args.timeout) for _ in range(args.runs)]
+        print(f"{mode:<11} {_summary([r['health_s'] for r in runs])} {_summary([r['ready_s'] for r in runs])} "
+              f"{_summary([r['first_match_s'] for r in runs])}")
+    print("\n1st match is the first /matches request alone, after /ready.")
+
+
+if __name__ == '__main__':
+    main()
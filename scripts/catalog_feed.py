@@ -0,0 +1,626 @@
+"""
+Incremental change feed for the API's in-memory artist catalog.
+
+The catalog the API scores against is either a published snapshot or one built
+from Supabase on first use. Picking up new artists used to need a full reload,
+but the Node backend's persist_artist upserts artists all the time. CatalogFeed
+polls Supabase for rows changed since a watermark and applies them to a
+LiveCatalog:
+- the base catalog (usually the memory-mapped snapshot) is never written to
+- a new or changed artist is appended to a small per-worker overlay (embedding,
+  tag bitset, name and tags), and the row it replaces is tombstoned
+- changed collaborations go to a history overlay the same way, so success rates
+  follow them
+- deletions (the catalog_deletions log) only tombstone rows
+- new tags go into a copy of the vocabulary that then replaces it, so a view
+  keeps the vocabulary it captured unchanged; bitsets written earlier are
+  padded when compared, so they stay valid
+
+Rows a request can see are never modified in place. view() copies the tombstone
+masks and the overlay length under the lock, and later changes only append.
+When a newer snapshot generation is published, the overlay is dropped and
+polling restarts from that generation's watermarks.
+
+Watermarks (CATALOG_FEED_MODE):
+- updated_at (default, needs sql/2026-10-21_catalog_change_feed.sql): inserts,
+  tag and embedding updates, and deletions. Each poll re-reads lag_window
+  seconds before the watermark so rows from transactions that committed late
+  are not missed. Re-applying an unchanged row is a no-op.
+- id: inserts only (ids above the highest seen), for databases without the
+  migration. The feed switches to this mode if artists.updated_at is missing.
+
+Code in the same process (e.g. an ingest endpoint) can call apply_artists(),
+apply_history() or delete_artists() directly instead of waiting for the next poll.
+Artists that exist only in this process (ingested, not yet saved) go through
+CatalogFeed.pin_artists() instead, which re-applies them after a rebase to a new
+snapshot until unpin_artists().
+
+metrics() reports freshness and cost:
+- staleness_s: time since a poll last drained every change
+- last_change_lag_s: delay from commit to applied for the newest change
+- last_apply_ms: time to apply the last batch
+"""
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from catalog_snapshot import Catalog
+from supabase_rest import SupabaseError
+from tag_bitsets import TagHistory, TagVocab, candidate_mask, fit_width, split_tags
+
+ARTIST_COLUMNS = 'id,artist_name,artist_tags,embedding'
+HISTORY_COLUMNS = 'id,artist_01_tags,artist_02_tags,collaboration_status'
+DELETION_COLUMNS = 'seq,table_name,row_id,deleted_at'
+
+
+_serials = itertools.count(1)
+
+
+def _grow(array, rows):
+    """Copy of array with room for at least `rows` rows (capacity doubles)."""
+    capacity = max(64, len(array) * 2, rows)
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _lookup(ids, order, key):
+    """Index of key in ids (sorted through order), or None."""
+    if not len(order):
+        return None
+    pos = int(np.searchsorted(ids, key, sorter=order))
+    if pos < len(order) and ids[order[pos]] == key:
+        return int(order[pos])
+    return None
+
+
+class _Rows:
+    """Row -> string across the base column and the overlay list."""
+
+    def __init__(self, base, extra, base_rows):
+        self.base = base
+        self.extra = extra
+        self.base_rows = base_rows
+
+    def __getitem__(self, row):
+        return self.base[row] if row < self.base_rows else self.extra[row - self.base_rows]
+
+
+class LiveCatalog:
+    """A base Catalog plus an append-only overlay of changes and tombstones."""
+
+    def __init__(self, base, watermarks=None):
+        self.base = base
+        self.vocab = base.vocab
+        self.dim = int(base.embeddings.shape[1]) if len(base.ids) else 0
+        self.watermarks = dict(watermarks or {})
+        self._lock = threading.Lock()
+
+        self._base_order = np.argsort(base.ids, kind='stable')
+        self._base_active = np.ones(len(base.ids), dtype=bool)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._emb = np.zeros((0, self.dim), dtype=np.float32)
+        self._prof = np.zeros((0, self.vocab.words), dtype=np.uint64)
+        self._active = np.zeros(0, dtype=bool)
+        self._names, self._tags = [], []
+        self._n = 0
+        self._row = {}  # artist id -> overlay row
+
+        base_history_ids = base.history_ids if base.history_ids is not None else np.zeros(0, dtype=np.int64)
+        self._h_base_ids = base_history_ids
+        self._h_base_order = np.argsort(base_history_ids, kind='stable')
+        self._h_base_active = np.ones(len(base.history), dtype=bool)
+        self._h_prof = np.zeros((0, self.vocab.words), dtype=np.uint64)
+        self._h_success = np.zeros(0, dtype=bool)
+        self._h_active = np.zeros(0, dtype=bool)
+        self._hn = 0
+        self._h_row = {}  # maindb id -> overlay row
+
+        self.live_artists = len(base.ids)
+        self.tombstones = 0
+        self.changes = 0  # bumped by every applied change; part of view().version
+        self.serial = next(_serials)  # tells LiveCatalogs of this process apart (id() can be reused)
+
+    # ------------------------------------------------------------------
+    # Artists
+    # ------------------------------------------------------------------
+
+    def _find_artist(self, artist_id):
+        """('overlay' | 'base', row) of the live row for an artist id, or None."""
+        row = self._row.get(artist_id)
+        if row is not None:
+            return ('overlay', row) if self._active[row] else None
+        row = _lookup(self.base.ids, self._base_order, artist_id)
+        if row is not None and self._base_active[row]:
+            return 'base', row
+        return None
+
+    def _same_artist(self, where, name, tags, vector):
+        kind, row = where
+        if kind == 'base':
+            old = (self.base.names[row], self.base.tags[row], self.base.embeddings[row])
+        else:
+            old = (self._names[row], self._tags[row], self._emb[row])
+        return old[0] == name and old[1] == tags and np.allclose(old[2], vector, atol=1e-6)
+
+    def _tombstone_artist(self, where):
+        kind, row = where
+        if kind == 'base':
+            self._base_active[row] = False
+        else:
+            self._active[row] = False
+        self.live_artists -= 1
+        self.tombstones += 1
+
+    def _intern(self, tag_strings):
+        """Add unseen tags copy-on-write (call under the lock): views and requests still
+        encoding with the previous vocabulary never see it change."""
+        new = {tag for tags in tag_strings for tag in split_tags(tags)} - self.vocab.index.keys()
+        if new:
+            vocab = TagVocab(self.vocab.tags)
+            for tag in sorted(new):
+                vocab.intern(tag)
+            self.vocab = vocab
+
+    def _append_artist(self, artist_id, name, tags, vector):
+        bits, _ = self.vocab.encode(tags)
+        row = self._n
+        if row == len(self._ids):
+            self._ids, self._emb, self._active = _grow(self._ids, row + 1), _grow(self._emb, row + 1), _grow(self._active, row + 1)
+            self._prof = _grow(self._prof, row + 1)
+        if self._prof.shape[1] < len(bits):
+            self._prof = fit_width(self._prof, len(bits))
+        self._ids[row] = artist_id
+        self._emb[row] = vector
+        self._prof[row] = bits
+        self._names.append(name)
+        self._tags.append(tags)
+        self._active[row] = True
+        self._row[artist_id] = row
+        self._n += 1
+        self.live_artists += 1
+
+    def apply_artists(self, rows):
+        """Insert or update artists (dicts with id, artist_name, artist_tags, embedding).
+
+        An artist whose embedding was removed leaves the catalog. Returns the
+        number of artists that changed.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        from columnar import parse_embeddings
+        matrix, present = parse_embeddings([r.get('embedding') for r in rows])
+        if present.any() and self.base.reducer is not None and matrix.shape[1] != self.dim:
+            matrix = self.base.project(matrix)  # full-size rows from Supabase into a reduced catalog
+        changed = 0
+        with self._lock:
+            if present.any() and matrix.shape[1] != self.dim:
+                if self.dim:
+                    raise ValueError(f"embedding dimension {matrix.shape[1]} does not match the catalog ({self.dim})")
+                self.dim = matrix.shape[1]
+                self._emb = np.zeros((0, self.dim), dtype=np.float32)
+            self._intern(r.get('artist_tags') or '' for r, has_embedding in zip(rows, present) if has_embedding)
+            for r, vector, has_embedding in zip(rows, matrix, present):
+                artist_id = int(r['id'])
+                name, tags = r.get('artist_name') or '', r.get('artist_tags') or ''
+                where = self._find_artist(artist_id)
+                if not has_embedding:
+                    if where is not None:
+                        self._tombstone_artist(where)
+                        changed += 1
+                    continue
+                norm = np.linalg.norm(vector)
+                if norm > 0:
+                    vector = vector / norm
+                if where is not None:
+                    if self._same_artist(where, name, tags, vector):
+                        continue
+                    self._tombstone_artist(where)
+                self._append_artist(artist_id, name, tags, vector)
+                changed += 1
+            self.changes += changed
+        return changed
+
+    def delete_artists(self, ids):
+        """Remove artists by id; returns how many were in the catalog."""
+        removed = 0
+        with self._lock:
+            for artist_id in ids:
+                where = self._find_artist(int(artist_id))
+                if where is not None:
+                    self._tombstone_artist(where)
+                    removed += 1
+            self.changes += removed
+        return removed
+
+    # ------------------------------------------------------------------
+    # Collaboration history
+    # ------------------------------------------------------------------
+
+    def _find_history(self, history_id):
+        row = self._h_row.get(history_id)
+        if row is not None:
+            return ('overlay', row) if self._h_active[row] else None
+        row = _lookup(self._h_base_ids, self._h_base_order, history_id)
+        if row is not None and self._h_base_active[row]:
+            return 'base', row
+        return None
+
+    def _tombstone_history(self, where):
+        kind, row = where
+        if kind == 'base':
+            self._h_base_active[row] = False
+        else:
+            self._h_active[row] = False
+
+    def apply_history(self, rows):
+        """Insert or update collaborations (dicts with id, artist_01_tags, artist_02_tags, collaboration_status).
+
+        Rows of a base catalog published without maindb ids cannot be matched,
+        so their updates are added as new rows. Returns the number of rows that changed.
+        """
+        rows = list(rows)
+        changed = 0
+        with self._lock:
+            self._intern(r.get(column) or '' for r in rows for column in ('artist_01_tags', 'artist_02_tags'))
+            for r in rows:
+                tags1, tags2 = r.get('artist_01_tags') or '', r.get('artist_02_tags') or ''
+                bits = self.vocab.encode(tags1)[0] | self.vocab.encode(tags2)[0]
+                success = r.get('collaboration_status') == 'Success'
+                history_id = int(r['id']) if r.get('id') is not None else None
+                where = self._find_history(history_id) if history_id is not None else None
+                if where is not None:
+                    kind, row = where
+                    old_bits, old_success = ((self.base.history.profiles[row], self.base.history.success[row])
+                                             if kind == 'base' else (self._h_prof[row], self._h_success[row]))
+                    if old_success == success and np.array_equal(fit_width(np.asarray(old_bits), len(bits)), bits):
+                        continue
+                    self._tombstone_history(where)
+                row = self._hn
+                if row == len(self._h_success):
+                    self._h_prof, self._h_success = _grow(self._h_prof, row + 1), _grow(self._h_success, row + 1)
+                    self._h_active = _grow(self._h_active, row + 1)
+                if self._h_prof.shape[1] < len(bits):
+                    self._h_prof = fit_width(self._h_prof, len(bits))
+                self._h_prof[row] = bits
+                self._h_success[row] = success
+                self._h_active[row] = True
+                if history_id is not None:
+                    self._h_row[history_id] = row
+                self._hn += 1
+                changed += 1
+            self.changes += changed
+        return changed
+
+    def delete_history(self, ids):
+        removed = 0
+        with self._lock:
+            for history_id in ids:
+                where = self._find_history(int(history_id))
+                if where is not None:
+                    self._tombstone_history(where)
+                    removed += 1
+            self.changes += removed
+        return removed
+
+    # ------------------------------------------------------------------
+
+    def view(self):
+        """A consistent read-only view with the Catalog scoring interface.
+
+        Its version changes whenever the base generation or any artist or
+        collaboration row does, so results computed from it can be cached by version.
+        """
+        with self._lock:
+            n, hn = self._n, self._hn
+            version = f"{self.base.version or 'built'}#{self.serial}@{self.changes}"
+            return CatalogView(
+                self.base, self.vocab, self._base_active.copy(),
+                self._emb[:n], self._prof[:n], self._names, self._tags, self._active[:n].copy(),
+                self._h_base_active.copy(),
+                TagHistory(self.vocab, self._h_prof[:hn], self._h_success[:hn]), self._h_active[:hn].copy(),
+                self.live_artists, version,
+            )
+
+
+class CatalogView:
+    """Base rows 0..n0-1 followed by overlay rows; tombstoned rows are never returned by candidates()."""
+
+    def __init__(self, base, vocab, base_active, emb, prof, names, tags, active,
+                 history_base_active, history_overlay, history_overlay_active, live, version=None):
+        self.base = base
+        self.version = version
+        self.vocab = vocab
+        self.base_rows = len(base.ids)
+        self._base_active = base_active
+        self._emb = emb
+        self._prof = prof
+        self._active = active
+        self._h_base_active = None if history_base_active.all() else history_base_active
+        self._h_overlay = history_overlay
+        self._h_overlay_active = history_overlay_active
+        self._live = live
+        self.names = _Rows(base.names, names, self.base_rows)
+        self.tags = _Rows(base.tags, tags, self.base_rows)
+
+    def __len__(self):
+        return self._live
+
+    @property
+    def query_dimensions(self):
+        return self.base.query_dimensions
+
+    def candidates(self, user_tags, min_overlap=0):
+        base_keep, overlay_keep = self._base_active, self._active
+        if min_overlap:
+            query, _ = self.vocab.encode(user_tags)
+            base_keep = base_keep & candidate_mask(fit_width(query, self.base.profiles.shape[1]), self.base.profiles, min_overlap)
+            overlay_keep = overlay_keep & candidate_mask(fit_width(query, self._prof.shape[1]), self._prof, min_overlap)
+        return np.concatenate([np.flatnonzero(base_keep), self.base_rows + np.flatnonzero(overlay_keep)])
+
+    def similarities(self, query_embedding, rows):
+        query = self.base.project(query_embedding)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        in_base = rows < self.base_rows
+        scores = np.empty(len(rows))
+        base_rows = rows[in_base]
+        if len(base_rows):
+            scores[in_base] = self.base.similarities(query, base_rows)
+        if (~in_base).any():
+            scores[~in_base] = self._emb[rows[~in_base] - self.base_rows] @ query
+        return scores
+
+    def history_rates(self, user_tags, rows):
+        user_bits, _ = self.vocab.encode(user_tags)
+        width = len(user_bits)
+        in_base = rows < self.base_rows
+        profiles = np.zeros((len(rows), width), dtype=np.uint64)
+        profiles[in_base] = fit_width(np.asarray(self.base.profiles[rows[in_base]]), width)
+        profiles[~in_base] = fit_width(self._prof[rows[~in_base] - self.base_rows], width)
+
+        hits, total = self.base.history.success_counts(user_bits, profiles, row_mask=self._h_base_active)
+        if len(self._h_overlay):
+            more_hits, more_total = self._h_overlay.success_counts(user_bits, profiles, row_mask=self._h_overlay_active)
+            hits += more_hits
+            total += more_total
+        rates = np.full(len(rows), 0.5)
+        np.divide(hits, total, out=rates, where=total > 0)
+        return rates
+
+
+# ----------------------------------------------------------------------
+# Supabase side
+# ----------------------------------------------------------------------
+
+def _head(db, table, column):
+    rows = db.select(table, column, order=f'{column}.desc.nullslast', limit=1)
+    return rows[0][column] if rows else None
+
+
+def head_watermarks(db, mode):
+    """Current high-water marks, read before a full fetch so nothing committed during it is skipped."""
+    if mode == 'id':
+        return {'mode': 'id', 'artists': _head(db, 'artists', 'id'), 'maindb': _head(db, 'maindb', 'id')}
+    return {'mode': 'updated_at', 'artists': _head(db, 'artists', 'updated_at'),
+            'maindb': _head(db, 'maindb', 'updated_at'), 'catalog_deletions': _head(db, 'catalog_deletions', 'deleted_at')}
+
+
+def fetch_supabase(db, mode='updated_at'):
+    """(artists, history DataFrame, watermarks) for building a Catalog the feed can continue from."""
+    try:
+        watermarks = head_watermarks(db, mode)
+    except SupabaseError:
+        watermarks = {}  # change-feed migration not applied; the feed starts from the head later
+    import pandas as pd
+    artists = db.select_all('artists', ARTIST_COLUMNS)
+    history = pd.DataFrame(db.select_all('maindb', HISTORY_COLUMNS),
+                           columns=HISTORY_COLUMNS.split(','))
+    return artists, history, watermarks
+
+
+def _parse_ts(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+class CatalogFeed:
+    """Owns the worker's LiveCatalog and keeps it current by polling Supabase."""
+
+    def __init__(self, db, watcher=None, mode='updated_at', interval=5.0, lag_window=30.0, page_size=1000,
+                 dimensions=None, reduction='truncate'):
+        self.db = db
+        self.dimensions = dimensions  # reduction for a catalog built from Supabase (a snapshot brings its own)
+        self.reduction = reduction
+        self.watcher = watcher
+        self.mode = mode
+        self.interval = interval
+        self.lag_window = lag_window
+        self.page_size = page_size
+        self.live = None
+        self._pinned = {}  # artist id -> row this process applied that Supabase does not have yet
+        self._lock = threading.Lock()
+        self._thread = None
+        self._mode_checked = False
+        self.stats = {
+            'polls': 0, 'poll_errors': 0, 'last_error': None, 'rebases': 0,
+            'artists_changed': 0, 'collaborations_changed': 0, 'deleted': 0,
+            'last_poll_ms': None, 'last_apply_ms': None, 'last_change_lag_s': None, 'caught_up_at': None,
+        }
+
+    def _check_mode(self):
+        if self._mode_checked or self.mode != 'updated_at':
+            return
+        try:
+            self.db.select('artists', 'updated_at', limit=1)
+        except SupabaseError as e:
+            if 400 <= e.status < 500:
+                print("⚠️  artists.updated_at not found (apply sql/2026-10-21_catalog_change_feed.sql); "
+                      "catalog feed falls back to new ids only")
+                self.mode = 'id'
+        except OSError:
+            return  # Supabase unreachable right now; check again on the next poll
+        self._mode_checked = True
+
+    def _ensure_live(self):
+        self._check_mode()
+        base = self.watcher.get() if self.watcher is not None else None
+        if base is not None:
+            if self.live is None or self.live.base is not base:
+                watermarks = base.meta.get('watermarks') or {}
+                if watermarks.get('mode') != self.mode:
+                    # Snapshot without usable watermarks: follow changes from now on.
+                    # If Supabase is unreachable, serve the snapshot and let the poller retry.
+                    try:
+                        watermarks = head_watermarks(self.db, self.mode)
+                    except (SupabaseError, OSError):
+                        watermarks = {}
+                self.live = LiveCatalog(base, watermarks)
+                self.live.apply_artists(self._pinned.values())
+                self.stats['rebases'] += 1
+        elif self.live is None:
+            artists, history, watermarks = fetch_supabase(self.db, self.mode)
+            if watermarks.get('mode') != self.mode:
+                watermarks = head_watermarks(self.db, self.mode)
+            self.live = LiveCatalog(Catalog.build(artists, history, self.dimensions, self.reduction), watermarks)
+            self.live.apply_artists(self._pinned.values())
+        return self.live
+
+    def pin_artists(self, rows):
+        """Apply artists known only to this process and keep them across rebases until unpinned."""
+        rows = list(rows)
+        with self._lock:
+            live = self._ensure_live()
+            self._pinned.update((int(r['id']), r) for r in rows)
+        return live.apply_artists(rows)
+
+    def unpin_artists(self, ids):
+        """Remove pinned artists from the catalog (e.g. once they are saved under their real ids)."""
+        ids = [int(i) for i in ids]
+        with self._lock:
+            for artist_id in ids:
+                self._pinned.pop(artist_id, None)
+            live = self.live
+        return live.delete_artists(ids) if live is not None else 0
+
+    def view(self):
+        """Current catalog view for a request (starts the poller on first use)."""
+        with self._lock:
+            live = self._ensure_live()
+        self.start()
+        return live.view()
+
+    def _changes_since(self, table, columns, ts_column, key_column, watermark):
+        """Rows with ts_column >= watermark - lag_window, keyset-paged by (ts_column, key_column)."""
+        filters = {}
+        if watermark:
+            start = _parse_ts(watermark) - timedelta(seconds=self.lag_window)
+            filters[ts_column] = f'gte.{start.isoformat()}'
+        rows = []
+        while True:
+            page = self.db.select(table, f'{columns},{ts_column}', filters,
+                                  order=f'{ts_column}.asc,{key_column}.asc', limit=self.page_size)
+            rows.extend(page)
+            if len(page) < self.page_size:
+                break
+            last = page[-1]
+            filters['or'] = (f'({ts_column}.gt."{last[ts_column]}",'
+                             f'and({ts_column}.eq."{last[ts_column]}",{key_column}.gt.{last[key_column]}))')
+        newest = rows[-1][ts_column] if rows else None
+        if newest and (not watermark or _parse_ts(newest) > _parse_ts(watermark)):
+            watermark = newest
+        return rows, watermark
+
+    def _new_since(self, table, columns, watermark):
+        filters = {'id': f'gt.{watermark}'} if watermark is not None else None
+        rows = self.db.select_all(table, columns, filters, page_size=self.page_size)
+        return rows, (rows[-1]['id'] if rows else watermark)
+
+    def poll_once(self):
+        """Fetch and apply every change since the watermarks; returns the number of rows changed."""
+        with self._lock:
+            live = self._ensure_live()
+        started = time.time()
+        t0 = time.perf_counter()
+        if live.watermarks.get('mode') != self.mode:
+            live.watermarks = head_watermarks(self.db, self.mode)
+            self.stats['caught_up_at'] = started
+            return 0
+        marks = dict(live.watermarks)
+        deletions = []
+        if self.mode == 'id':
+            artists, marks['artists'] = self._new_since('artists', ARTIST_COLUMNS, marks.get('artists'))
+            history, marks['maindb'] = self._new_since('maindb', HISTORY_COLUMNS, marks.get('maindb'))
+        else:
+            artists, marks['artists'] = self._changes_since('artists', ARTIST_COLUMNS, 'updated_at', 'id',
+                                                            marks.get('artists'))
+            history, marks['maindb'] = self._changes_since('maindb', HISTORY_COLUMNS, 'updated_at', 'id',
+                                                           marks.get('maindb'))
+            deletions, marks['catalog_deletions'] = self._changes_since('catalog_deletions', DELETION_COLUMNS,
+                                                                        'deleted_at', 'seq',
+                                                                        marks.get('catalog_deletions'))
+
+        t_apply = time.perf_counter()
+        changed_artists = live.apply_artists(artists)
+        changed_history = live.apply_history(history)
+        deleted = live.delete_artists(d['row_id'] for d in deletions if d['table_name'] == 'artists')
+        deleted += live.delete_history(d['row_id'] for d in deletions if d['table_name'] == 'maindb')
+        applied_at = time.time()
+        live.watermarks = marks
+
+        stats = self.stats
+        stats['polls'] += 1
+        stats['artists_changed'] += changed_artists
+        stats['collaborations_changed'] += changed_history
+        stats['deleted'] += deleted
+        stats['last_apply_ms'] = round((time.perf_counter() - t_apply) * 1000, 2)
+        stats['last_poll_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+        stats['caught_up_at'] = started
+        changed = changed_artists + changed_history + deleted
+        if changed and self.mode == 'updated_at':
+            newest = max(_parse_ts(m) for m in (marks.get('artists'), marks.get('maindb'),
+                                                 marks.get('catalog_deletions')) if m)
+            stats['last_change_lag_s'] = round(applied_at - newest.timestamp(), 3)
+        return changed
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='catalog-feed', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll_once()
+            except Exception as e:  # keep polling; the error shows up in metrics()
+                self.stats['poll_errors'] += 1
+                self.stats['last_error'] = f"{type(e).__name__}: {str(e)[:300]}"
+
+    def metrics(self):
+        live = self.live
+        stats = dict(self.stats)
+        caught_up = stats.pop('caught_up_at')
+        stats['staleness_s'] = round(time.time() - caught_up, 3) if caught_up else None
+        if live is None:
+            return {'mode': self.mode, 'loaded': False, **stats}
+        return {
+            'mode': self.mode,
+            'loaded': True,
+            'generation': live.base.path,
+            'artists': live.live_artists,
+            'overlay_artists': live._n,
+            'overlay_collaborations': live._hn,
+            'pinned_artists': len(self._pinned),
+            'tombstones': live.tombstones,
+            'tags': len(live.vocab),
+            'watermarks': live.watermarks,
+            **stats,
+        }
@@ -0,0 +1,345 @@
+"""
+Read-only artist catalog snapshots shared by every API worker.
+
+Each uvicorn/gunicorn worker used to hold its own copy of the artist embeddings
+and the collaboration history, so RAM grew with the worker count. Instead, a
+loader publishes the catalog once as a directory of .npy files. Workers open it
+with np.load(mmap_mode='r'), so the pages live in the OS page cache and are
+shared by every process that maps them. Per-worker memory stays roughly
+constant however large the catalog is; only per-request score vectors are
+allocated.
+
+Layout under the root (CATALOG_DIR, default data/catalog):
+    CURRENT                       name of the live generation (replaced atomically)
+    gen-<timestamp>-<suffix>/     one immutable generation
+        meta.json                 counts, embedding dimension, creation time
+        vocab.json                tags, bit i = vocab[i] (artist and history tags)
+        ids.npy                   int64 artist ids
+        embeddings.npy            float32 (artists, dim), rows L2-normalized
+        artist_profiles.npy       uint64 (artists, words) tag bitsets
+        names.npy / names_offsets.npy, tags.npy / tags_offsets.npy
+                                  UTF-8 bytes plus offsets for names and tag strings
+        history_profiles.npy      uint64 (collaborations, words) both artists' tags
+        history_success.npy       bool (collaborations,)
+        history_ids.npy           int64 maindb ids (when the source has an id column)
+
+A generation is written to a temporary directory and renamed into place before
+CURRENT is switched, so a worker never sees a partial snapshot. Workers check
+CURRENT every few seconds (CatalogWatcher) and swap to the new generation.
+Requests already running keep the old one until they finish. Older generations
+beyond --keep are removed. On POSIX, unlinking a mapped file is safe. On Windows,
+a generation that is still mapped is skipped and removed by a later publish.
+
+Usage:
+    python scripts/catalog_snapshot.py publish          # artists + maindb from Supabase
+    python scripts/catalog_snapshot.py publish --artists data/artists.csv --history data/artist_collaborations_final.csv
+    python scripts/catalog_snapshot.py info
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from embedding_dims import METHODS, PCAProjection, Reducer, configured_dimensions, configured_reduction
+from tag_bitsets import TagHistory, TagVocab, candidate_mask, fit_width
+
+DEFAULT_ROOT = os.path.join('data', 'catalog')
+CURRENT_FILE = 'CURRENT'
+
+
+class StringColumn:
+    """Strings stored as one UTF-8 byte array plus (n + 1) int64 offsets; decoded on access."""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_values(cls, values):
+        import pandas as pd
+        encoded = [('' if v is None or v is pd.NA or (isinstance(v, float) and np.isnan(v)) else str(v)).encode('utf-8')
+                   for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def save(self, directory, name):
+        np.save(os.path.join(directory, f'{name}.npy'), self.data)
+        np.save(os.path.join(directory, f'{name}_offsets.npy'), self.offsets)
+
+    @classmethod
+    def load(cls, directory, name, mmap_mode='r'):
+        return cls(np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode),
+                   np.load(os.path.join(directory, f'{name}_offsets.npy'), mmap_mode=mmap_mode))
+
+
+class Catalog:
+    """Artists with embeddings, their tag bitsets, and the collaboration history.
+
+    Catalog.open() memory-maps a published generation; Catalog.build() makes an
+    in-memory one (e.g. straight from Supabase when no snapshot is published).
+    """
+
+    def __init__(self, ids, embeddings, names, tags, profiles, history, meta=None, path=None, history_ids=None,
+                 reducer=None):
+        self.ids = ids
+        self.embeddings = embeddings
+        self.names = names
+        self.tags = tags
+        self.profiles = profiles
+        self.history = history
+        self.meta = meta or {}
+        self.path = path
+        self.history_ids = history_ids
+        self.reducer = reducer  # embedding_dims.Reducer when embeddings are stored reduced
+
+    @property
+    def vocab(self):
+        return self.history.vocab
+
+    @property
+    def version(self):
+        """The generation directory for a published catalog (never modified), else None."""
+        return os.path.basename(os.path.normpath(self.path)) if self.path else None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def query_dimensions(self):
+        """`dimensions` to ask the embeddings API for when embedding a query (None: full size)."""
+        return self.reducer.query_dimensions if self.reducer is not None else None
+
+    def project(self, vectors):
+        """Full-size (or already reduced) embeddings in this catalog's dimension."""
+        return self.reducer(vectors) if self.reducer is not None else np.asarray(vectors, dtype=np.float32)
+
+    @classmethod
+    def build(cls, artists, history_df, dimensions=None, reduction='truncate'):
+        """From artist rows (id, artist_name, artist_tags, embedding) and history rows
+        (artist_01_tags, artist_02_tags, collaboration_status). Artists without an embedding are left out.
+
+        With dimensions, embeddings are reduced (embedding_dims.py); a PCA
+        reduction is fitted on these artists.
+        """
+        import pandas as pd
+        from columnar import parse_embeddings
+        artists = pd.DataFrame(artists, columns=['id', 'artist_name', 'artist_tags', 'embedding'])
+        matrix, present = parse_embeddings(artists['embedding'].tolist())
+        artists = artists[present]
+        matrix = matrix[present]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        reducer = None
+        if dimensions and len(matrix) and dimensions < matrix.shape[1]:
+            reducer = Reducer.fit(matrix, dimensions, reduction)
+            matrix = reducer(matrix)
+
+        if history_df is None or history_df.empty:
+            history_df = pd.DataFrame(columns=['artist_01_tags', 'artist_02_tags', 'collaboration_status'])
+        vocab = TagVocab.from_strings(artists['artist_tags'], history_df['artist_01_tags'], history_df['artist_02_tags'])
+        history = TagHistory.from_frame(history_df, vocab)
+        if not len(history):
+            history = TagHistory(vocab, np.zeros((0, vocab.words), dtype=np.uint64), np.zeros(0, dtype=bool))
+
+        history_ids = None
+        if 'id' in history_df and len(history):
+            history_ids = history_df['id'].to_numpy(dtype=np.int64, na_value=-1)
+
+        meta = {'artists': int(len(artists)), 'collaborations': int(len(history)),
+                'dim': int(matrix.shape[1]), 'tags': len(vocab)}
+        if reducer is not None:
+            meta['reduction'] = reducer.spec()
+        return cls(artists['id'].to_numpy(dtype=np.int64), matrix,
+                   StringColumn.from_values(artists['artist_name']), StringColumn.from_values(artists['artist_tags']),
+                   vocab.encode_many(artists['artist_tags']), history, meta, history_ids=history_ids, reducer=reducer)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'ids.npy'), self.ids)
+        np.save(os.path.join(directory, 'embeddings.npy'), self.embeddings)
+        np.save(os.path.join(directory, 'artist_profiles.npy'), self.profiles)
+        np.save(os.path.join(directory, 'history_profiles.npy'), self.history.profiles)
+        np.save(os.path.join(directory, 'history_success.npy'), self.history.success)
+        if self.history_ids is not None:
+            np.save(os.path.join(directory, 'history_ids.npy'), self.history_ids)
+        self.names.save(directory, 'names')
+        self.tags.save(directory, 'tags')
+        if self.reducer is not None and self.reducer.pca is not None:
+            self.reducer.pca.save(directory)
+        with open(os.path.join(directory, 'vocab.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.vocab.tags, f, ensure_ascii=False)
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({**self.meta, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')}, f, indent=2)
+
+    @classmethod
+    def open(cls, directory):
+        """Attach to a published generation read-only (arrays are np.memmap views of the files)."""
+        def load(name):
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+
+        with open(os.path.join(directory, 'vocab.json'), encoding='utf-8') as f:
+            vocab = TagVocab(json.load(f))
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        history = TagHistory(vocab, load('history_profiles'), load('history_success'))
+        history_ids = load('history_ids') if os.path.exists(os.path.join(directory, 'history_ids.npy')) else None
+        reducer = None
+        if meta.get('reduction'):
+            spec = meta['reduction']
+            pca = PCAProjection.load(directory) if spec['method'] == 'pca' else None
+            reducer = Reducer(spec['dimensions'], spec['method'], pca)
+        return cls(load('ids'), load('embeddings'), StringColumn.load(directory, 'names'),
+                   StringColumn.load(directory, 'tags'), load('artist_profiles'), history, meta, directory, history_ids,
+                   reducer)
+
+    def candidates(self, user_tags, min_overlap=0):
+        """Row indices of artists sharing at least min_overlap tags with user_tags (all rows for 0)."""
+        if not min_overlap:
+            return np.arange(len(self))
+        query, _ = self.vocab.encode(user_tags)
+        return np.flatnonzero(candidate_mask(fit_width(query, self.profiles.shape[1]), self.profiles, min_overlap))
+
+    def similarities(self, query_embedding, rows=None):
+        """Cosine similarity between the query (full size or reduced) and each artist (or the given rows)."""
+        query = self.project(query_embedding)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        if rows is None or len(rows) == len(self.ids):
+            return (self.embeddings @ query).astype(np.float64)
+        if len(rows) * 4 < len(self.ids):
+            return (self.embeddings[rows] @ query).astype(np.float64)
+        # Most rows: one pass over the (mapped) matrix beats copying the selected rows out
+        return (self.embeddings @ query)[rows].astype(np.float64)
+
+    def history_rates(self, user_tags, rows=None):
+        """Historical success rate (TagHistory.success_rates) for each artist (or the given rows)."""
+        profiles = self.profiles if rows is None or len(rows) == len(self.ids) else self.profiles[rows]
+        return self.history.success_rates_bits(self.vocab.encode(user_tags)[0], profiles)
+
+
+def read_current(root):
+    """Name of the live generation under root, or None if nothing is published."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish(catalog, root=DEFAULT_ROOT, keep=3):
+    """Write catalog as a new generation, switch CURRENT to it, and prune old generations."""
+    os.makedirs(root, exist_ok=True)
+    name = f"gen-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    staging = os.path.join(root, f'.{name}.tmp')
+    catalog.save(staging)
+    os.rename(staging, os.path.join(root, name))
+
+    pointer = os.path.join(root, f'.{CURRENT_FILE}.tmp')
+    with open(pointer, 'w', encoding='utf-8') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+
+    generations = sorted(d for d in os.listdir(root) if d.startswith('gen-'))
+    for old in generations[:-keep] if keep > 0 else []:
+        if old != name:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return name
+
+
+class CatalogWatcher:
+    """A worker's view of the published catalog.
+
+    get() re-reads CURRENT at most every check_interval seconds and opens the new
+    generation when it changed. Callers hold on to the Catalog they got for the
+    whole request, so a swap never changes data under a running request.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, check_interval=5.0):
+        self.root = root
+        self.check_interval = check_interval
+        self._name = None
+        self._catalog = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The live Catalog, or None when nothing has been published under root."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            with self._lock:
+                if now >= self._next_check:
+                    name = read_current(self.root)
+                    if name and name != self._name:
+                        self._catalog = Catalog.open(os.path.join(self.root, name))
+                        self._name = name
+                    self._next_check = now + self.check_interval
+        return self._catalog
+
+
+def _build_from_supabase(feed_mode, dimensions=None, reduction='truncate'):
+    from dotenv import load_dotenv
+    from catalog_feed import fetch_supabase
+    from supabase_rest import get_client
+
+    load_dotenv()
+    artists, history, watermarks = fetch_supabase(get_client(), feed_mode)
+    catalog = Catalog.build(artists, history, dimensions, reduction)
+    # Where the API's change feed (catalog_feed.py) starts polling after loading this generation
+    catalog.meta['watermarks'] = watermarks
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish or inspect shared artist catalog snapshots.')
+    parser.add_argument('command', choices=['publish', 'info'])
+    parser.add_argument('--root', default=os.getenv('CATALOG_DIR', DEFAULT_ROOT), help='Snapshot directory (CATALOG_DIR)')
+    parser.add_argument('--artists', help='Artist CSV/Parquet with id, artist_name, artist_tags, embedding (default: Supabase)')
+    parser.add_argument('--history', help='Collaboration CSV/Parquet (default: Supabase maindb)')
+    parser.add_argument('--keep', type=int, default=3, help='Generations to keep, including the new one')
+    parser.add_argument('--dimensions', type=int, default=configured_dimensions(),
+                        help='Store embeddings reduced to this many dimensions (EMBEDDING_DIMENSIONS; default full size)')
+    parser.add_argument('--reduction', choices=METHODS, default=configured_reduction(),
+                        help='How to reduce them (EMBEDDING_REDUCTION): truncate like the API, or PCA fitted on the catalog')
+    parser.add_argument('--feed-mode', default=os.getenv('CATALOG_FEED_MODE', 'updated_at'), choices=['updated_at', 'id'],
+                        help='Watermark column recorded for the change feed (CATALOG_FEED_MODE)')
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        t0 = time.perf_counter()
+        if args.artists:
+            from columnar import load_dataset
+            catalog = Catalog.build(load_dataset(args.artists), load_dataset(args.history) if args.history else None,
+                                    args.dimensions, args.reduction)
+        else:
+            catalog = _build_from_supabase(args.feed_mode, args.dimensions, args.reduction)
+        name = publish(catalog, args.root, args.keep)
+        print(f"Published {name}: {len(catalog)} artists, {len(catalog.history)} collaborations "
+              f"in {time.perf_counter() - t0:.1f} s")
+        return
+
+    name = read_current(args.root)
+    if not name:
+        print(f"No catalog published under {args.root}")
+        return
+    catalog = Catalog.open(os.path.join(args.root, name))
+    size = sum(os.path.getsize(os.path.join(catalog.path, f)) for f in os.listdir(catalog.path))
+    print(f"{name}: {json.dumps(catalog.meta)}, {size / 1024 / 1024:.1f} MB on disk")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,24 @@
-import pandas as pd
+import sys
 
-# Read the CSV file
-df = pd.read_csv('data/artist_collaborations_final.csv')
+from columnar import FINAL_COLUMNS, load_dataset, save_dataset
+
+# CSV or Parquet (see columnar.py); defaults to the final CSV
+DATASET_PATH = sys.argv[1] if len(sys.argv) > 1 else 'data/artist_collaborations_final.csv'
+
+# Read the dataset
+df = load_dataset(DATASET_PATH)
 
 print("Before cleanup:")
 print(f"Columns: {list(df.columns)}")
 print(f"Total: {len(df.columns)}")
 
 # Keep only the columns we want (up to and including 'embedding')
-columns_to_keep = ['id', 'artist_01', 'artist_01_tags', 'artist_02', 'artist_02_tags', 
-                   'song_title', 'collaboration_status', 'release_year', 'region', 
-                   'mb_rating_value', 'mb_rating_votes', 'peak_chart_position', 'embedding']
+columns_to_keep = FINAL_COLUMNS
 
 df = df[columns_to_keep]
 
 # Save back to the same file
-df.to_csv('data/artist_collaborations_final.csv', index=False)
+save_dataset(df, DATASET_PATH)
 
 print("\nAfter cleanup:")
 print(f"Columns: {list(df.columns)}")
@@ -0,0 +1,238 @@
+"""
+Columnar (Parquet) storage for the collaboration and artist datasets.
+
+CSV stays the interchange format, but the maintenance scripts and matchers can
+share these readers and writers instead of re-parsing text every time:
+- artist names, tag strings, regions and statuses are dictionary-encoded
+  (each distinct string is stored once per row group)
+- release year, ratings and chart position are typed (nullable) integer/float columns
+- embeddings live in a separate fixed-width float32 column instead of inline text
+
+Column names are normalized to lower case (the builder writes Title_Case headers,
+the final dataset uses lower case). load_dataset()/save_dataset() pick CSV or
+Parquet by file extension, so scripts work on either.
+
+Usage:
+    python scripts/columnar.py import data/artist_collaborations_final.csv data/artist_collaborations_final.parquet
+    python scripts/columnar.py export data/artist_collaborations_final.parquet data/artist_collaborations_final.csv
+    python scripts/columnar.py info data/artist_collaborations_final.csv data/artist_collaborations_final.parquet
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DICTIONARY_COLUMNS = [
+    'artist_01', 'artist_01_tags', 'artist_02', 'artist_02_tags',
+    'collaboration_status', 'region', 'artist_tags',
+]
+INT_COLUMNS = {
+    'id': 'Int32',
+    'release_year': 'Int16',
+    'mb_rating_votes': 'Int32',
+    'peak_chart_position': 'Int16',
+    'release_count': 'Int32',
+    'youtube_views': 'Int64',
+}
+FLOAT_COLUMNS = ['mb_rating_value']
+EMBEDDING_COLUMN = 'embedding'
+
+# Column layout of data/artist_collaborations_final.csv
+FINAL_COLUMNS = [
+    'id', 'artist_01', 'artist_01_tags', 'artist_02', 'artist_02_tags',
+    'song_title', 'collaboration_status', 'release_year', 'region',
+    'mb_rating_value', 'mb_rating_votes', 'peak_chart_position', 'embedding',
+]
+
+
+def parse_embeddings(values):
+    """Parse "[0.1, 0.2, ...]" strings (or lists) into a float32 matrix.
+
+    Returns (matrix, present) where rows without an embedding are zero and
+    present[i] is False for them.
+    """
+    present = np.zeros(len(values), dtype=bool)
+    parsed = []
+    for i, value in enumerate(values):
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+            value = json.loads(value)
+        if value is None or (isinstance(value, float) and np.isnan(value)) or len(value) == 0:
+            continue
+        present[i] = True
+        parsed.append(value)
+    dim = len(parsed[0]) if parsed else 0
+    matrix = np.zeros((len(values), dim), dtype=np.float32)
+    if parsed:
+        matrix[present] = np.asarray(parsed, dtype=np.float32)
+    return matrix, present
+
+
+def format_embedding(vector):
+    """Inverse of parse_embeddings for one row (same text form as pgvector; 9 significant digits round-trip float32)."""
+    if vector is None or isinstance(vector, str):
+        return vector or ''
+    if isinstance(vector, float):  # NaN from a merge/reindex
+        return ''
+    return '[' + ','.join(map('{:.9g}'.format, np.asarray(vector, dtype=np.float64).tolist())) + ']'
+
+
+def normalize_frame(df):
+    """Lower-case column names and apply the typed column dtypes (embedding column untouched)."""
+    df = df.copy()
+    df.columns = [c.strip().lower() for c in df.columns]
+    for col, dtype in INT_COLUMNS.items():
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors='coerce').round().astype(dtype)
+    for col in FLOAT_COLUMNS:
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+    for col in DICTIONARY_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype('string').astype('category')
+    return df
+
+
+def to_table(df):
+    """Arrow table with dictionary/typed columns and a fixed-size-list embedding column."""
+    df = normalize_frame(df)
+    embeddings = None
+    if EMBEDDING_COLUMN in df:
+        embeddings, present = parse_embeddings(df[EMBEDDING_COLUMN].tolist())
+        df = df.drop(columns=[EMBEDDING_COLUMN])
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Fixed index width, so tables built from different chunks share one schema
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.dictionary(pa.int32(), pa.string())))
+    if embeddings is not None:
+        dim = embeddings.shape[1]
+        if dim:
+            values = pa.array(embeddings.reshape(-1), type=pa.float32())
+            column = pa.FixedSizeListArray.from_arrays(values, dim, mask=pa.array(~present))
+        else:
+            column = pa.nulls(len(df), pa.list_(pa.float32()))  # no embeddings yet
+        table = table.append_column(EMBEDDING_COLUMN, column)
+    return table
+
+
+def write_parquet(df, path):
+    pq.write_table(to_table(df), path, compression='zstd')
+
+
+def read_parquet(path, columns=None, embedding_text=False):
+    """DataFrame from Parquet; dictionary columns come back as pandas categoricals.
+
+    The embedding column holds one float32 vector per row (None when missing),
+    or "[...]" strings with embedding_text=True. For the whole matrix at once use
+    read_embeddings().
+    """
+    table = pq.read_table(path, columns=columns)
+    embedding = None
+    if EMBEDDING_COLUMN in table.column_names:
+        embedding = table.column(EMBEDDING_COLUMN).combine_chunks()
+        table = table.drop([EMBEDDING_COLUMN])
+    df = table.to_pandas()
+    if embedding is not None:
+        rows = [None] * len(df)
+        present = np.asarray(embedding.is_valid())
+        if present.any():
+            dim = embedding.type.list_size
+            matrix = embedding.filter(pa.array(present)).flatten().to_numpy(zero_copy_only=False).reshape(-1, dim)
+            for i, vector in zip(np.flatnonzero(present).tolist(), matrix):
+                rows[i] = vector
+        if embedding_text:
+            rows = [format_embedding(v) for v in rows]
+        df[EMBEDDING_COLUMN] = rows
+    return df
+
+
+def read_embeddings(path, id_column='id'):
+    """Return (ids, float32 matrix) for rows that have an embedding (Parquet or CSV)."""
+    if path.endswith('.parquet'):
+        table = pq.read_table(path, columns=[id_column, EMBEDDING_COLUMN])
+        column = table.column(EMBEDDING_COLUMN).combine_chunks()
+        present = np.asarray(column.is_valid())
+        ids = table.column(id_column).to_numpy()[present]
+        if not len(ids):
+            return ids, np.zeros((0, 0), dtype=np.float32)
+        dim = column.type.list_size
+        flat = column.filter(pa.array(present)).flatten().to_numpy(zero_copy_only=False)
+        return ids, flat.reshape(-1, dim).astype(np.float32, copy=False)
+    df = pd.read_csv(path, usecols=[id_column, EMBEDDING_COLUMN], dtype={EMBEDDING_COLUMN: str}, keep_default_na=False)
+    matrix, present = parse_embeddings(df[EMBEDDING_COLUMN].tolist())
+    return df[id_column].to_numpy()[present], matrix[present]
+
+
+def load_dataset(path, columns=None):
+    """Load a CSV or Parquet dataset with normalized (lower-case, typed) columns."""
+    if path.endswith('.parquet'):
+        return read_parquet(path, columns)
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df = normalize_frame(df)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def save_dataset(df, path):
+    """Write df as Parquet or CSV depending on the extension (embedding as text in CSV)."""
+    if path.endswith('.parquet'):
+        write_parquet(df, path)
+        return
+    if EMBEDDING_COLUMN in df and not all(isinstance(v, str) for v in df[EMBEDDING_COLUMN]):
+        df = df.assign(**{EMBEDDING_COLUMN: [format_embedding(v) for v in df[EMBEDDING_COLUMN]]})
+    df.to_csv(path, index=False)
+
+
+def iter_chunks(path, chunk_rows=50000, columns=None):
+    """Yield normalized DataFrames of up to chunk_rows rows from a CSV or Parquet file."""
+    if path.endswith('.parquet'):
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()  # embeddings come back as one array per row (None if missing)
+        return
+    for df in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+        df = normalize_frame(df)
+        yield df[columns] if columns is not None else df
+
+
+def csv_to_parquet(csv_path, parquet_path):
+    df = load_dataset(csv_path)
+    write_parquet(df, parquet_path)
+    return len(df)
+
+
+def parquet_to_csv(parquet_path, csv_path):
+    df = read_parquet(parquet_path, embedding_text=True)
+    df.to_csv(csv_path, index=False)
+    return len(df)
+
+
+def _timed_load(path):
+    t0 = time.perf_counter()
+    df = load_dataset(path)
+    return df, time.perf_counter() - t0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in {'import', 'export', 'info'}:
+        print(__doc__)
+        sys.exit(1)
+    command = sys.argv[1]
+    if command == 'import':
+        n = csv_to_parquet(sys.argv[2], sys.argv[3])
+        print(f"Imported {n} rows into {sys.argv[3]}")
+    elif command == 'export':
+        n = parquet_to_csv(sys.argv[2], sys.argv[3])
+        print(f"Exported {n} rows to {sys.argv[3]}")
+    for path in sys.argv[2:]:
+        df, seconds = _timed_load(path)
+        print(f"{path}: {os.path.getsize(path) / 1024:.1f} KB, {len(df)} rows, loaded in {seconds * 1000:.1f} ms")
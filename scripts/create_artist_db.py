@@ -1,44 +1,30 @@
 import pandas as pd
+import sys
 
-# Read the final dataset
-df = pd.read_csv('data/artist_collaborations_final.csv')
+from columnar import load_dataset, save_dataset
 
-# Create a dictionary to store unique artists
-artists_dict = {}
+# CSV or Parquet (see columnar.py); defaults to the final CSV
+DATASET_PATH = sys.argv[1] if len(sys.argv) > 1 else 'data/artist_collaborations_final.csv'
+ARTISTS_PATH = sys.argv[2] if len(sys.argv) > 2 else 'data/artists.csv'
 
-# Extract artists from Artist_01 columns
-for _, row in df.iterrows():
-    artist_name = row['artist_01']
-    artist_tags = row['artist_01_tags']
-    
-    if artist_name not in artists_dict:
-        artists_dict[artist_name] = artist_tags
+# Read only the artist columns of the final dataset
+df = load_dataset(DATASET_PATH, columns=['artist_01', 'artist_01_tags', 'artist_02', 'artist_02_tags'])
 
-# Extract artists from Artist_02 columns
-for _, row in df.iterrows():
-    artist_name = row['artist_02']
-    artist_tags = row['artist_02_tags']
-    
-    if artist_name not in artists_dict:
-        artists_dict[artist_name] = artist_tags
+# Stack Artist_01 then Artist_02 columns; the first tags seen for an artist win
+pairs = pd.concat([
+    df[['artist_01', 'artist_01_tags']].set_axis(['artist_name', 'artist_tags'], axis=1).astype(str),
+    df[['artist_02', 'artist_02_tags']].set_axis(['artist_name', 'artist_tags'], axis=1).astype(str),
+], ignore_index=True)
+artists_df = pairs.drop_duplicates('artist_name').sort_values('artist_name').reset_index(drop=True)
 
-# Create DataFrame for artists
-artists_data = []
-for idx, (artist_name, artist_tags) in enumerate(sorted(artists_dict.items()), start=1):
-    artists_data.append({
-        'id': idx,
-        'artist_name': artist_name,
-        'artist_tags': artist_tags,
-        'embedding': ''  # Empty for now, will be populated later
-    })
+artists_df.insert(0, 'id', range(1, len(artists_df) + 1))
+artists_df['embedding'] = ''  # Empty for now, will be populated later
 
-artists_df = pd.DataFrame(artists_data)
-
-# Save to CSV
-artists_df.to_csv('data/artists.csv', index=False)
+# Save (CSV or Parquet by extension)
+save_dataset(artists_df, ARTISTS_PATH)
 
 print(f"✅ Artist database created!")
 print(f"Total unique artists: {len(artists_df)}")
-print(f"File saved to: data/artists.csv")
+print(f"File saved to: {ARTISTS_PATH}")
 print(f"\nFirst 5 artists:")
 print(artists_df.head())
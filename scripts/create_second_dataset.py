@@ -4,54 +4,44 @@ Create a second 500-row dataset excluding pairs used in the first dataset.
 import csv
 import sys
 
+from factual.pair_source import PairKeySet, PairSource, unique_pairs
+
 def extract_used_pairs(csv_file):
     """Extract unique artist pairs from existing dataset."""
-    used_pairs = set()
+    used_pairs = PairKeySet()
     
     with open(csv_file, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
-            # Sort artists to create canonical pair representation
-            artists = tuple(sorted([row['Artist_01'], row['Artist_02']]))
-            used_pairs.add(artists)
+            # Keys are order- and case-insensitive
+            used_pairs.add(row['Artist_01'], row['Artist_02'])
     
     return used_pairs
 
 def create_exclude_pairs_file(used_pairs, all_pairs_file, output_file):
-    """Create a new pairs file excluding already-used pairs."""
-    available_pairs = []
-    
-    with open(all_pairs_file, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) >= 2:
-                # Sort to match the canonical representation
-                pair = tuple(sorted([row[0], row[1]]))
-                if pair not in used_pairs:
-                    available_pairs.append(row)
-    
-    print(f"Total pairs in source file: {len(available_pairs) + len(used_pairs)}")
-    print(f"Used pairs (excluded): {len(used_pairs)}")
-    print(f"Available pairs: {len(available_pairs)}")
+    """Create a new pairs file excluding already-used pairs (streamed, one pass)."""
+    source = PairSource(all_pairs_file)
+    available = 0
     
-    # Write available pairs to new file
     with open(output_file, 'w', encoding='utf-8', newline='') as f:
         writer = csv.writer(f)
-        for pair in available_pairs:
+        writer.writerow(['Artist_01', 'Artist_02'])
+        for pair in unique_pairs(source, exclude=used_pairs):
             writer.writerow(pair)
+            available += 1
+    
+    print(f"Total pairs in source file: {source.rows_read}")
+    print(f"Used pairs (excluded): {len(used_pairs)}")
+    print(f"Available pairs: {available}")
     
     print(f"\nCreated new pairs file: {output_file}")
-    return len(available_pairs)
+    return available
 
 if __name__ == "__main__":
     print("Extracting used pairs from first dataset...")
     used_pairs = extract_used_pairs('data/artist_collaborations_500.csv')
     
     print(f"Found {len(used_pairs)} unique pairs in first dataset\n")
-    print("Sample used pairs:")
-    for i, pair in enumerate(list(used_pairs)[:5]):
-        print(f"  {pair[0]} + {pair[1]}")
-    
     print("\n" + "="*60)
     print("Creating new pairs file with unused pairs...")
     print("="*60 + "\n")
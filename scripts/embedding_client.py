@@ -0,0 +1,199 @@
+"""
+Micro-batched OpenAI embeddings for the API.
+
+An embeddings call costs one round trip, whether it carries 1 input or 100.
+Concurrent callers are therefore merged. embed() queues its text, and one
+background thread sends everything queued within max_wait_ms as a single
+request, up to max_batch inputs. A lone caller waits at most max_wait_ms
+extra. A burst of ingested artists or concurrent /matches requests shares
+one round trip.
+
+Identical requests are also coalesced (single flight). A text that is already
+queued or being sent, at the same `dimensions`, is not sent again: the new
+caller waits on that call and gets its result, or its error. A burst of users
+submitting the same popular tags costs one input of one call. Nothing is kept
+once the call completes; this is not a cache. Callers that want spellings of the
+same tags to share a call should canonicalize first (match_cache.canonical_tags).
+
+    embedder = EmbeddingBatcher(OpenAI(api_key=...))
+    embedder = EmbeddingBatcher(lambda: OpenAI(api_key=...))   # client created on first use
+    vector = embedder.embed('pop, dance-pop')
+    vectors = embedder.embed_many(['k-pop, pop', 'trap'])
+    short = embedder.embed('pop', dimensions=256)   # reduced catalogs (embedding_dims.py)
+
+Requests for different `dimensions` wait in the same window and are sent as
+one call per size.
+
+If a call is rejected for its content (e.g. one text over the token limit), the
+batch is split in halves and retried until only the offending inputs fail.
+Errors that no input could avoid (auth, rate limits, outages) fail the whole
+batch at once.
+"""
+import queue
+import threading
+import time
+
+DEFAULT_MODEL = 'text-embedding-3-small'
+
+
+def _fails_every_input(error):
+    """Auth, rate limit, outage and connection errors: retrying the inputs separately cannot help."""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in (401, 403, 404, 408, 429) or status >= 500
+    # openai's connection errors carry no status (and the package is not imported here)
+    return isinstance(error, (OSError, TimeoutError)) or type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+
+class _Pending:
+    __slots__ = ('text', 'dimensions', 'done', 'result', 'error')
+
+    def __init__(self, text, dimensions=None):
+        self.text = text
+        self.dimensions = dimensions
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    def __init__(self, client, model=DEFAULT_MODEL, max_batch=64, max_wait_ms=5.0, timeout=60.0):
+        # An OpenAI client, or a function making one: then neither the openai import nor the
+        # client is paid for until the first embedding (or an explicit warm-up) needs it
+        self._client = None if callable(client) else client
+        self._make_client = client if callable(client) else None
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._inflight = {}  # (text, dimensions) -> _Pending, from queueing until its call completes
+        self._inflight_lock = threading.Lock()
+        self.stats = {'requests': 0, 'inputs': 0, 'coalesced': 0, 'errors': 0, 'split_retries': 0, 'last_batch_size': 0,
+                      'last_call_ms': None}
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._start_lock:
+                if self._client is None:
+                    self._client = self._make_client()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def _start(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+                    self._thread.start()
+
+    def _submit(self, texts, dimensions=None):
+        keys = []
+        for text in texts:
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError("Cannot embed an empty text")
+            keys.append((text.strip(), dimensions))
+        pending, new = [], []
+        with self._inflight_lock:
+            for key in keys:
+                p = self._inflight.get(key)
+                if p is None:
+                    p = self._inflight[key] = _Pending(*key)
+                    new.append(p)
+                else:
+                    self.stats['coalesced'] += 1
+                pending.append(p)
+        self._start()
+        for p in new:
+            self._queue.put(p)
+        return pending
+
+    def _wait(self, pending):
+        deadline = time.monotonic() + self.timeout
+        for p in pending:
+            if not p.done.wait(max(0.0, deadline - time.monotonic())):
+                raise TimeoutError("Embedding request timed out")
+            if p.error is not None:
+                raise p.error
+        return [p.result for p in pending]
+
+    def embed(self, text, dimensions=None):
+        """Embedding for one text (batched with whatever else is queued); dimensions=None is full size."""
+        return self._wait(self._submit([text], dimensions))[0]
+
+    def embed_many(self, texts, dimensions=None):
+        """Embeddings for several texts, in order."""
+        return self._wait(self._submit(list(texts), dimensions))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    # Take what is already queued at once; otherwise wait out the window
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            by_size = {}
+            for p in batch:
+                by_size.setdefault(p.dimensions, []).append(p)
+            for dimensions, group in by_size.items():
+                self._send(group, dimensions)
+
+    def _send(self, batch, dimensions=None):
+        self._call(batch, dimensions)
+        self.stats['inputs'] += len(batch)
+        self.stats['last_batch_size'] = len(batch)
+        # Callers arriving from now on start a new call; everyone already waiting shares this one
+        with self._inflight_lock:
+            for p in batch:
+                del self._inflight[(p.text, p.dimensions)]
+        for p in batch:
+            p.done.set()
+
+    def _call(self, batch, dimensions=None):
+        """One embeddings request; a batch rejected for its content is split until only bad inputs fail."""
+        t0 = time.perf_counter()
+        options = {'dimensions': dimensions} if dimensions else {}
+        self.stats['requests'] += 1
+        try:
+            response = self.client.embeddings.create(model=self.model, input=[p.text for p in batch], **options)
+            for item in response.data:
+                batch[item.index].result = item.embedding
+        except Exception as e:
+            self.stats['errors'] += 1
+            if len(batch) > 1 and not _fails_every_input(e):
+                # e.g. one over-long text: the unrelated callers sharing the window still get results
+                self.stats['split_retries'] += 1
+                middle = len(batch) // 2
+                self._call(batch[:middle], dimensions)
+                self._call(batch[middle:], dimensions)
+                return
+            for p in batch:
+                p.error = e
+        finally:
+            self.stats['last_call_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+
+    def metrics(self):
+        stats = dict(self.stats)
+        stats['queued'] = self._queue.qsize()
+        stats['in_flight'] = len(self._inflight)
+        waited = stats['inputs'] + stats['coalesced']
+        stats['coalesced_ratio'] = round(stats['coalesced'] / waited, 4) if waited else None
+        stats['avg_batch_size'] = round(stats['inputs'] / stats['requests'], 2) if stats['requests'] else None
+        return stats
@@ -0,0 +1,238 @@
+"""
+Reduced-dimension artist embeddings.
+
+text-embedding-3-small returns 1536 floats. Transfer, snapshot size and every
+dot product scale with that, so catalogs can keep fewer dimensions:
+- truncate (default): keep the first N dimensions and re-normalize. This is what
+  the embeddings API does with `dimensions=N` (text-embedding-3 vectors are
+  trained so that prefixes work on their own). Stored 1536-d vectors can be
+  reduced without re-embedding, and queries can ask the API for N dimensions.
+- pca: project onto the top N principal components of our own catalog. The
+  projection is fitted when the catalog is built and published with the
+  snapshot. Queries are embedded at full size and projected locally. A
+  catalog of n artists supports at most n components.
+
+EMBEDDING_DIMENSIONS (unset = full size) and EMBEDDING_REDUCTION (truncate | pca)
+configure catalogs built by the API and by catalog_snapshot.py. A published
+snapshot records its reduction, and the API follows the snapshot.
+sql/2026-10-22_reduced_embeddings.sql is the database side: an embedding_256
+column kept in sync by a trigger, with its own HNSW index and ranking functions.
+
+The report command measures what a reduction costs in ranking quality. Each
+sampled artist is used as a query, and its top-k at N dimensions is compared
+with its top-k at full size: first by cosine alone, then by the 60/40 combined
+score with the historical component.
+
+Usage:
+    python scripts/embedding_dims.py report                       # snapshot (full-size) or Supabase
+    python scripts/embedding_dims.py report --dims 256 512 1536 --k 10 --queries 500 --artists data/artists.parquet
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+FULL_DIMENSIONS = 1536
+METHODS = ('truncate', 'pca')
+
+
+def configured_dimensions():
+    """EMBEDDING_DIMENSIONS as an int, or None for full-size embeddings."""
+    value = os.getenv('EMBEDDING_DIMENSIONS', '').strip()
+    if not value:
+        return None
+    dims = int(value)
+    return None if dims >= FULL_DIMENSIONS else dims
+
+
+def configured_reduction():
+    method = os.getenv('EMBEDDING_REDUCTION', 'truncate').strip().lower()
+    if method not in METHODS:
+        raise ValueError(f"EMBEDDING_REDUCTION must be one of {', '.join(METHODS)}, not {method!r}")
+    return method
+
+
+def normalize_rows(matrix):
+    """Unit-length rows (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+class PCAProjection:
+    """Mean and top principal components of a set of embeddings."""
+
+    def __init__(self, mean, components):
+        self.mean = mean
+        self.components = components
+
+    @property
+    def dims(self):
+        return len(self.components)
+
+    @classmethod
+    def fit(cls, matrix, dims, sample=50000, seed=0):
+        """Fit on (up to `sample` random rows of) matrix; needs at least `dims` rows."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if len(matrix) > sample:
+            matrix = matrix[np.random.default_rng(seed).choice(len(matrix), sample, replace=False)]
+        if dims > min(matrix.shape):
+            raise ValueError(f"PCA to {dims} dimensions needs at least {dims} embeddings, got {len(matrix)}")
+        mean = matrix.mean(axis=0)
+        _, _, vt = np.linalg.svd(matrix - mean, full_matrices=False)
+        return cls(mean.astype(np.float32), np.ascontiguousarray(vt[:dims], dtype=np.float32))
+
+    def project(self, matrix):
+        return normalize_rows((np.asarray(matrix, dtype=np.float32) - self.mean) @ self.components.T)
+
+    def save(self, directory):
+        np.save(os.path.join(directory, 'pca_mean.npy'), self.mean)
+        np.save(os.path.join(directory, 'pca_components.npy'), self.components)
+
+    @classmethod
+    def load(cls, directory):
+        return cls(np.load(os.path.join(directory, 'pca_mean.npy')),
+                   np.load(os.path.join(directory, 'pca_components.npy')))
+
+
+class Reducer:
+    """Maps full-size embeddings (or already reduced ones) to the catalog's dimension."""
+
+    def __init__(self, dims, method='truncate', pca=None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown reduction {method!r}")
+        if method == 'pca' and pca is None:
+            raise ValueError("PCA reduction needs a fitted PCAProjection")
+        self.dims = dims
+        self.method = method
+        self.pca = pca
+
+    @classmethod
+    def fit(cls, matrix, dims, method='truncate'):
+        return cls(dims, method, PCAProjection.fit(matrix, dims) if method == 'pca' else None)
+
+    @property
+    def query_dimensions(self):
+        """`dimensions` to request from the embeddings API for queries (None: full size)."""
+        return self.dims if self.method == 'truncate' else None
+
+    def spec(self):
+        return {'dimensions': self.dims, 'method': self.method}
+
+    def __call__(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        width = matrix.shape[-1]
+        if width == self.dims:
+            return normalize_rows(matrix)
+        if width < self.dims:
+            raise ValueError(f"embedding has {width} dimensions, the catalog uses {self.dims}")
+        if self.method == 'pca':
+            return self.pca.project(matrix)
+        return normalize_rows(matrix[..., :self.dims])
+
+
+# ----------------------------------------------------------------------
+# Quality report
+# ----------------------------------------------------------------------
+
+def _top_k(scores, k, exclude):
+    scores = scores.copy()
+    scores[exclude] = -np.inf
+    top = np.argpartition(-scores, k)[:k]
+    return set(top.tolist())
+
+
+def ranking_overlap(embeddings, reduced, history_rates, queries, k=10, weights=(0.6, 0.4)):
+    """Mean and minimum overlap@k between full-size and reduced rankings: (cosine, combined)."""
+    cosine, combined = [], []
+    for q, rates in zip(queries, history_rates):
+        full = embeddings @ embeddings[q]
+        small = reduced @ reduced[q]
+        cosine.append(len(_top_k(full, k, q) & _top_k(small, k, q)) / k)
+        full_combined = weights[0] * full + weights[1] * rates
+        small_combined = weights[0] * small + weights[1] * rates
+        combined.append(len(_top_k(full_combined, k, q) & _top_k(small_combined, k, q)) / k)
+    return (float(np.mean(cosine)), float(np.min(cosine))), (float(np.mean(combined)), float(np.min(combined)))
+
+
+def quality_report(catalog, dims_list=(256, 512, FULL_DIMENSIONS), methods=METHODS, k=10, queries=200, seed=0):
+    """One row per (dims, method): ranking overlap with full size, bytes per artist, scoring time."""
+    embeddings = np.asarray(catalog.embeddings, dtype=np.float32)
+    count, full_dims = embeddings.shape
+    if count <= k:
+        raise ValueError(f"Need more than k={k} artists, got {count}")
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(count, min(queries, count), replace=False))
+    rates = [catalog.history_rates(catalog.tags[q]) for q in sample]
+    rows = []
+    for dims in dims_list:
+        for method in methods:
+            if dims >= full_dims and method != methods[0]:
+                continue  # full size is the same for every method
+            row = {'dims': min(dims, full_dims), 'method': method if dims < full_dims else 'full'}
+            try:
+                reducer = Reducer.fit(embeddings, dims, method) if dims < full_dims else None
+            except ValueError as e:
+                rows.append({**row, 'error': str(e)})
+                continue
+            reduced = reducer(embeddings) if reducer is not None else embeddings
+            t0 = time.perf_counter()
+            for q in sample[:50]:
+                reduced @ reduced[q]
+            per_query_ms = (time.perf_counter() - t0) * 1000 / min(50, len(sample))
+            (cos_mean, cos_min), (comb_mean, comb_min) = ranking_overlap(embeddings, reduced, rates, sample, k)
+            rows.append({**row, 'cosine_overlap': cos_mean, 'cosine_min': cos_min, 'combined_overlap': comb_mean,
+                         'combined_min': comb_min, 'bytes_per_artist': reduced.shape[1] * 4,
+                         'score_ms_per_query': per_query_ms})
+    return {'artists': count, 'queries': len(sample), 'k': k, 'rows': rows}
+
+
+def print_report(report):
+    print(f"\nRanking overlap@{report['k']} with full size, {report['queries']} query artists "
+          f"against {report['artists']} artists\n")
+    print(f"{'dims':>6} {'method':<9} {'cosine':>8} {'(min)':>7} {'combined':>9} {'(min)':>7} "
+          f"{'bytes':>7} {'ms/query':>9}")
+    for r in report['rows']:
+        if 'error' in r:
+            print(f"{r['dims']:>6} {r['method']:<9} n/a: {r['error']}")
+            continue
+        print(f"{r['dims']:>6} {r['method']:<9} {r['cosine_overlap']:>8.3f} {r['cosine_min']:>7.2f} "
+              f"{r['combined_overlap']:>9.3f} {r['combined_min']:>7.2f} {r['bytes_per_artist']:>7} "
+              f"{r['score_ms_per_query']:>9.3f}")
+
+
+def _load_full_catalog(args):
+    from catalog_snapshot import DEFAULT_ROOT, Catalog, read_current
+    if args.artists:
+        from columnar import load_dataset
+        return Catalog.build(load_dataset(args.artists), load_dataset(args.history) if args.history else None)
+    root = args.root or os.getenv('CATALOG_DIR', DEFAULT_ROOT)
+    name = read_current(root)
+    if name:
+        catalog = Catalog.open(os.path.join(root, name))
+        if catalog.reducer is None:
+            return catalog
+        print(f"Snapshot {name} is already reduced ({catalog.reducer.spec()}); reading Supabase")
+    from catalog_snapshot import _build_from_supabase
+    return _build_from_supabase('id', dimensions=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reduced-dimension embeddings: ranking quality report.')
+    parser.add_argument('command', choices=['report'])
+    parser.add_argument('--dims', type=int, nargs='+', default=[256, 512, FULL_DIMENSIONS])
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200, help='Artists sampled as queries')
+    parser.add_argument('--root', help='Snapshot directory (CATALOG_DIR)')
+    parser.add_argument('--artists', help='Artist CSV/Parquet with full-size embeddings (default: snapshot or Supabase)')
+    parser.add_argument('--history', help='Collaboration CSV/Parquet (with --artists)')
+    args = parser.parse_args()
+
+    catalog = _load_full_catalog(args)
+    print_report(quality_report(catalog, args.dims, args.methods, args.k, args.queries))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,9 @@ from openai import OpenAI
 from dotenv import load_dotenv
 import os
 
+from embedding_client import EmbeddingBatcher
+from match_cache import canonical_tags
+
 # Load .env
 load_dotenv()
 
@@ -16,6 +19,9 @@ if not api_key:
 
 client = OpenAI(api_key=api_key)
 
+# Concurrent /predict calls share embedding calls, and identical tags in flight are embedded once
+embedder = EmbeddingBatcher(client)
+
 # Initialize FastAPI app
 app = FastAPI(title="Artist Collaboration Match API")
 
@@ -28,6 +34,10 @@ class ArtistPair(BaseModel):
 def home():
     return {"message": "Artist Matchmaking API is running 🚀"}
 
+@app.get("/metrics")
+def metrics():
+    return {"embeddings": embedder.metrics()}
+
 @app.post("/predict")
 def predict(pair: ArtistPair):
     """
@@ -35,16 +45,8 @@ def predict(pair: ArtistPair):
     Returns a similarity score between 0 and 1.
     """
 
-    # Generate embeddings
-    emb1 = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=pair.artist1_tags
-    ).data[0].embedding
-
-    emb2 = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=pair.artist2_tags
-    ).data[0].embedding
+    # Generate embeddings (canonical tags, so every spelling of a popular pair shares one call)
+    emb1, emb2 = embedder.embed_many([canonical_tags(pair.artist1_tags), canonical_tags(pair.artist2_tags)])
 
     # Compute similarity
     similarity = cosine_similarity([emb1], [emb2])[0][0]
@@ -0,0 +1,209 @@
+"""
+Export cosine compatibility scores for every artist pair (the /predict score of
+embedding_function.py), computed from the stored embeddings.
+
+Calling /predict per pair costs two OpenAI calls per pair. This job reads the
+catalog's normalized float32 embeddings once and splits the N x N matrix into
+block x block tiles. A tile is one small matmul whose operands stay in cache
+(512 x 1536 float32 is 3 MB). Worker processes memory-map the same .npy file.
+The parent keeps at most 2 tiles per worker in flight and streams each finished
+tile to the output, so memory does not grow with N.
+
+Options:
+- --upper: only pairs i < j (each unordered pair once)
+- --threshold 0.5: only pairs scoring at least 0.5 (the output stays sparse)
+An artist is never paired with itself.
+
+Output formats:
+- parquet (default): artist_id_1, artist_id_2, score (float32); one row group
+  per few tiles
+- coo: raw little-endian records (uint32 row, uint32 col, float32 score) in
+  <out>, plus <out>.ids.npy (catalog row -> artist id) and <out>.json (meta).
+  Read with np.fromfile(out, dtype=COO_DTYPE) or np.memmap.
+
+    python scripts/export_pair_scores.py data/pair_scores.parquet --upper --threshold 0.4
+    python scripts/export_pair_scores.py data/pair_scores.coo --format coo --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from catalog_snapshot import DEFAULT_ROOT, Catalog, read_current
+
+COO_DTYPE = np.dtype([('row', '<u4'), ('col', '<u4'), ('score', '<f4')])
+PARQUET_SCHEMA = pa.schema([('artist_id_1', pa.int64()), ('artist_id_2', pa.int64()), ('score', pa.float32())])
+
+_embeddings = None  # per worker process: the memory-mapped embedding matrix
+
+
+def _init_worker(path):
+    global _embeddings
+    _embeddings = np.load(path, mmap_mode='r')
+
+
+def score_tile(tile):
+    """(rows, cols, scores) of one tile: (row start, row end, col start, col end, upper, threshold)."""
+    r0, r1, c0, c1, upper, threshold = tile
+    scores = np.asarray(_embeddings[r0:r1]) @ np.asarray(_embeddings[c0:c1]).T
+    keep = np.ones(scores.shape, dtype=bool) if threshold is None else scores >= threshold
+    # Diagonal tiles: drop self pairs, and the lower half with --upper
+    if r0 < c1 and c0 < r1:
+        rows = np.arange(r0, r1)[:, None]
+        cols = np.arange(c0, c1)[None, :]
+        keep &= (cols > rows) if upper else (cols != rows)
+    rows, cols = np.nonzero(keep)
+    return (rows + r0).astype(np.uint32), (cols + c0).astype(np.uint32), scores[rows, cols].astype(np.float32)
+
+
+def tiles(count, block, upper, threshold):
+    for r0 in range(0, count, block):
+        for c0 in range(r0 if upper else 0, count, block):
+            yield r0, min(count, r0 + block), c0, min(count, c0 + block), upper, threshold
+
+
+class ParquetSink:
+    def __init__(self, path, ids, row_group_rows=1 << 20):
+        self.ids = ids
+        self.writer = pq.ParquetWriter(path, PARQUET_SCHEMA)
+        self.row_group_rows = row_group_rows
+        self._parts = []
+        self._buffered = 0
+
+    def write(self, rows, cols, scores):
+        self._parts.append((self.ids[rows], self.ids[cols], scores))
+        self._buffered += len(scores)
+        if self._buffered >= self.row_group_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._parts:
+            return
+        columns = [np.concatenate(part) for part in zip(*self._parts)]
+        self.writer.write_table(pa.Table.from_arrays([pa.array(c) for c in columns], schema=PARQUET_SCHEMA))
+        self._parts, self._buffered = [], 0
+
+    def close(self, meta):
+        self._flush()
+        self.writer.add_key_value_metadata({'pair_scores': json.dumps(meta)})
+        self.writer.close()
+
+
+class CooSink:
+    def __init__(self, path, ids):
+        self.path = path
+        np.save(f'{path}.ids.npy', ids)
+        self.file = open(path, 'wb')
+
+    def write(self, rows, cols, scores):
+        records = np.empty(len(scores), dtype=COO_DTYPE)
+        records['row'], records['col'], records['score'] = rows, cols, scores
+        records.tofile(self.file)
+
+    def close(self, meta):
+        self.file.close()
+        with open(f'{self.path}.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+
+def export_pair_scores(embeddings_path, ids, out, fmt='parquet', block=512, workers=None, upper=False,
+                       threshold=None, progress=None):
+    """Score every pair of rows of the (normalized) embedding .npy and stream them to out; returns meta."""
+    started = time.perf_counter()
+    count = len(ids)
+    workers = workers or os.cpu_count() or 1
+    sink = CooSink(out, ids) if fmt == 'coo' else ParquetSink(out, ids)
+    total_tiles = sum(1 for _ in tiles(count, block, upper, threshold))
+    pairs = done = 0
+
+    def collect(futures):
+        nonlocal pairs, done
+        for future in futures:
+            rows, cols, scores = future.result()
+            sink.write(rows, cols, scores)
+            pairs += len(scores)
+            done += 1
+        if progress is not None:
+            progress(done, total_tiles, pairs)
+
+    # spawn: fresh interpreters that pick up the single-threaded BLAS settings from main()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(embeddings_path,)) as pool:
+        pending = set()
+        for tile in tiles(count, block, upper, threshold):
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending.add(pool.submit(score_tile, tile))
+        collect(pending)
+    meta = {
+        'artists': count,
+        'pairs': pairs,
+        'upper': upper,
+        'threshold': threshold,
+        'block': block,
+        'workers': workers,
+        'tiles': total_tiles,
+        'runtime_s': round(time.perf_counter() - started, 2),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    sink.close(meta)
+    return meta
+
+
+def _load_catalog(args):
+    if args.artists:
+        from columnar import load_dataset
+        return Catalog.build(load_dataset(args.artists), None)
+    name = read_current(args.root)
+    if name:
+        return Catalog.open(os.path.join(args.root, name))
+    from catalog_snapshot import _build_from_supabase
+    print(f"No snapshot published under {args.root}; reading Supabase")
+    return _build_from_supabase('id')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export cosine compatibility scores for every artist pair.')
+    parser.add_argument('out', help='Output file (.parquet, or raw records with --format coo)')
+    parser.add_argument('--format', choices=['parquet', 'coo'], default='parquet')
+    parser.add_argument('--root', default=os.getenv('CATALOG_DIR', DEFAULT_ROOT), help='Snapshot directory (CATALOG_DIR)')
+    parser.add_argument('--artists', help='Artist CSV/Parquet with id and embedding (default: snapshot, else Supabase)')
+    parser.add_argument('--upper', action='store_true', help='Each unordered pair once (i < j)')
+    parser.add_argument('--threshold', type=float, help='Only pairs scoring at least this')
+    parser.add_argument('--block', type=int, default=512, help='Tile size in artists')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    # One BLAS thread per worker process; the pool provides the parallelism
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(var, '1')
+
+    catalog = _load_catalog(args)
+    ids = np.asarray(catalog.ids, dtype=np.int64)
+    print(f"Scoring {len(ids)} artists ({len(ids) * (len(ids) - 1) // (2 if args.upper else 1)} pairs before threshold)")
+
+    def progress(done, total, pairs):
+        print(f"  {done}/{total} tiles, {pairs} pairs written", end='\r', flush=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(catalog.path, 'embeddings.npy') if catalog.path else os.path.join(tmp, 'embeddings.npy')
+        if not catalog.path:
+            np.save(path, np.ascontiguousarray(catalog.embeddings, dtype=np.float32))
+        meta = export_pair_scores(path, ids, args.out, args.format, args.block, args.workers, args.upper,
+                                  args.threshold, progress)
+    size = os.path.getsize(args.out) / 1024 / 1024
+    print(f"\n✅ {meta['pairs']} pairs in {meta['runtime_s']:.1f} s with {meta['workers']} workers "
+          f"-> {args.out} ({size:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,21 @@
 import pandas as pd
+import sys
 
-# Read the final dataset
-df = pd.read_csv('data/artist_collaborations_final.csv')
+from columnar import load_dataset
+from tag_bitsets import TagVocab
 
-# Collect all tags from both Artist_01_Tags and Artist_02_Tags columns
-all_tags = set()
+# CSV or Parquet (see columnar.py); defaults to the final CSV
+DATASET_PATH = sys.argv[1] if len(sys.argv) > 1 else 'data/artist_collaborations_final.csv'
 
-# Process Artist_01_Tags
-for tags in df['Artist_01_Tags'].dropna():
-    # Split by comma and strip whitespace
-    tag_list = [tag.strip() for tag in str(tags).split(',')]
-    all_tags.update(tag_list)
+# Read only the tag columns (column names are normalized to lower case)
+df = load_dataset(DATASET_PATH, columns=['artist_01_tags', 'artist_02_tags'])
 
-# Process Artist_02_Tags
-for tags in df['Artist_02_Tags'].dropna():
-    # Split by comma and strip whitespace
-    tag_list = [tag.strip() for tag in str(tags).split(',')]
-    all_tags.update(tag_list)
+# Intern every tag from both tag columns. The columns are dictionary-encoded,
+# so each distinct tag string is split only once.
+vocab = TagVocab.from_strings(df['artist_01_tags'].dropna(), df['artist_02_tags'].dropna())
 
-# Convert to sorted list
-unique_tags = sorted(list(all_tags))
+# Already sorted
+unique_tags = vocab.tags
 
 # Create DataFrame
 tags_df = pd.DataFrame({'Tag': unique_tags})
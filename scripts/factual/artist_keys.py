@@ -0,0 +1,40 @@
+"""
+Canonical artist keys shared by the curation, build and dedupe code.
+
+Names were compared with name.lower().strip(), so accent and spacing variants
+("Beyoncé" / "Beyonce", "Tiësto" / "Tiesto", "Jhené  Aiko") were treated as
+different artists. artist_key() folds them together:
+- Unicode NFKD, with combining marks removed
+- a few letters NFKD cannot decompose are mapped as Postgres unaccent does
+  (ø -> o, ł -> l, ß -> ss, æ -> ae, ...), and typographic quotes become '
+- case-folded, trimmed, internal whitespace collapsed to single spaces
+
+The SQL function public.artist_key() in sql/2026-10-20_artist_keys.sql computes
+the same key (unaccent + lower + whitespace collapse), so the Python keys and the
+artist_key column in the database agree.
+"""
+import unicodedata
+from functools import lru_cache
+from typing import Tuple
+
+_FOLD = str.maketrans({
+    "ø": "o", "Ø": "O", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D", "ð": "d", "Ð": "D",
+    "ß": "ss", "æ": "ae", "Æ": "AE", "œ": "oe", "Œ": "OE", "þ": "th", "Þ": "TH",
+    "ı": "i", "’": "'", "‘": "'", "‐": "-", "‑": "-", "–": "-", "—": "-",
+})
+
+
+@lru_cache(maxsize=1 << 16)
+def artist_key(name: str) -> str:
+    """Accent-, case- and whitespace-insensitive key for an artist name."""
+    if name.isascii():
+        return " ".join(name.lower().split())
+    decomposed = unicodedata.normalize("NFKD", name.translate(_FOLD))
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(folded.casefold().split())
+
+
+def pair_key(a1: str, a2: str) -> Tuple[str, str]:
+    """Canonical (order-insensitive) key for a pair of artists."""
+    k1, k2 = artist_key(a1), artist_key(a2)
+    return (k1, k2) if k1 <= k2 else (k2, k1)
@@ -3,10 +3,10 @@ import os
 import random
 import argparse
 import re
-import json
 import signal
 import sys
-from typing import List, Dict, Tuple
+import time
+from typing import List, Dict, Iterable, Iterator, Tuple
 
 from tqdm import tqdm
 
@@ -17,13 +17,25 @@ from .config import (
     ARTISTS_PER_TAG,
     MAX_RECORDINGS_PER_PAIR,
     MAX_CANDIDATE_PAIRS,
+    SEARCH_WORKERS,
+    RELEASE_GROUP_WORKERS,
+    ENRICH_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    MB_BACKEND,
+    YOUTUBE_SEARCH_FALLBACK,
 )
-from .musicbrainz_client import (
-    search_recordings_by_two_artists,
-    get_artist_info,
-    search_artists_by_tag,
-)
+from . import musicbrainz_client, youtube_client
+from .artist_keys import artist_key, pair_key
 from .labeler import label_success
+from .pipeline import Pipeline, Stage
+from .journal import Journal
+from .pair_scheduler import record_outcomes, schedule_pairs
+from .pair_source import PairKeySet, PairSource, unique_pairs
+
+# MusicBrainz backend module: live web service by default, or the local dump store (see use_local_backend)
+mb = musicbrainz_client
+if MB_BACKEND == "local":
+    from . import musicbrainz_local as mb
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
 OUT_DIR = os.path.join(os.path.dirname(PROJECT_ROOT), "data")
@@ -116,6 +128,25 @@ ARTIST_TAGS = {
 
 REGION_DEFAULT = "Global"
 
+HEADER = [
+    "Artist_01",
+    "Artist_01_Tags",
+    "Artist_02",
+    "Artist_02_Tags",
+    "Song_Title",
+    "Collaboration_Status",
+    "Release_Year",
+    "Region",
+    "MB_Rating_Value",
+    "MB_Rating_Votes",
+    "Peak_Chart_Position",
+    # Raw labeling signals, so relabel.py can recompute Collaboration_Status offline
+    "Release_Count",
+    "Has_YouTube",
+    "YouTube_Views",
+    "Recording_MBID",
+]
+
 
 def map_country_to_region(country: str) -> str:
     if not country:
@@ -145,16 +176,16 @@ def discover_artists() -> List[str]:
     seen = set()
     tags = [t.strip() for t in DISCOVERY_TAGS.split(",") if t.strip()]
     for tag in tags:
-        arts = search_artists_by_tag(tag, limit=ARTISTS_PER_TAG)
+        arts = mb.search_artists_by_tag(tag, limit=ARTISTS_PER_TAG)
         for a in arts:
             name = a.get("name")
-            if name and name.lower() not in seen:
-                seen.add(name.lower())
+            if name and artist_key(name) not in seen:
+                seen.add(artist_key(name))
                 discovered.append(name)
     # Always include curated fallback set
     for name in CURATED_ARTISTS:
-        if name.lower() not in seen:
-            seen.add(name.lower())
+        if artist_key(name) not in seen:
+            seen.add(artist_key(name))
             discovered.append(name)
     return discovered
 
@@ -181,36 +212,13 @@ def write_pairs_file(pairs: List[Tuple[str, str]], path: str) -> None:
             writer.writerow([a1, a2])
 
 
-def read_pairs_file(path: str) -> List[Tuple[str, str]]:
-    pairs: List[Tuple[str, str]] = []
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Pairs file not found: {path}")
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.reader(f)
-        rows = list(reader)
-        if not rows:
-            return pairs
-        # Detect header optionally
-        start_idx = 0
-        header = [c.strip().lower() for c in rows[0]]
-        if len(header) >= 2 and ("artist_01" in header[0] and "artist_02" in header[1] or "artist1" in header[0] and "artist2" in header[1]):
-            start_idx = 1
-        for r in rows[start_idx:]:
-            if len(r) < 2:
-                continue
-            a1 = r[0].strip()
-            a2 = r[1].strip()
-            if a1 and a2 and a1.lower() != a2.lower():
-                key = tuple(sorted([a1, a2]))
-                pairs.append(key)
-    # Deduplicate while preserving order
-    seen = set()
-    unique_pairs: List[Tuple[str, str]] = []
-    for p in pairs:
-        if p not in seen:
-            seen.add(p)
-            unique_pairs.append(p)
-    return unique_pairs
+def read_pairs_file(path: str, start_offset: int = 0) -> Iterator[Tuple[str, str]]:
+    """Lazily yield unique pairs (each sorted) from a pairs CSV with an optional header.
+
+    A missing file raises here, before any output is written, not on first iteration.
+    """
+    source = PairSource(path, start_offset)
+    return (tuple(sorted([a1, a2])) for a1, a2 in unique_pairs(source))
 
 
 def normalize_title(title: str) -> str:
@@ -272,6 +280,154 @@ def deduplicate_recordings(recs: List[Dict]) -> List[Dict]:
     return best_recs
 
 
+def song_key(row: List[str]) -> Tuple[str, Tuple[str, str]]:
+    """Row-level dedupe key: normalized title + sorted artist pair."""
+    title_norm = normalize_title(row[4])  # Song_Title is at index 4
+    return (title_norm, pair_key(row[0], row[2]))  # Artist_01, Artist_02
+
+
+def is_better_row(row: List[str], existing: List[str]) -> bool:
+    """Prefer Success status, then the row with more metadata (year, region, ratings)."""
+    if row[5] == "Success" and existing[5] != "Success":
+        return True
+    if row[5] == existing[5]:
+        existing_data_count = sum(1 for x in existing[6:10] if x)
+        new_data_count = sum(1 for x in row[6:10] if x)
+        return new_data_count > existing_data_count
+    return False
+
+
+def dedupe_song_rows(rows: List[List[str]]) -> List[List[str]]:
+    """Keep only the best variant of each song (see song_key / is_better_row)."""
+    song_map: Dict[Tuple[str, Tuple[str, str]], List[str]] = {}  # (normalized_title, artist_pair) -> best_row
+    for row in rows:
+        key = song_key(row)
+        existing = song_map.get(key)
+        if existing is None or is_better_row(row, existing):
+            song_map[key] = row
+    return list(song_map.values())
+
+
+def search_stage(job: Dict) -> Dict:
+    """Search collaboration recordings for the pair and drop title variants."""
+    recs = mb.search_recordings_by_two_artists(job["a1"], job["a2"], limit=MAX_RECORDINGS_PER_PAIR, rg_fallback=False)
+    # Deduplicate recordings by normalized title (remove instrumental/remix/etc variants)
+    job["recs"] = deduplicate_recordings(recs) if recs else []
+    return job
+
+
+def release_group_stage(job: Dict) -> Dict:
+    """Fill YouTube ids / ratings from release groups for the surviving recordings."""
+    for rec in job["recs"]:
+        mb.apply_release_group_fallback(rec)
+    return job
+
+
+def youtube_stage(jobs: List[Dict]) -> List[Dict]:
+    """Attach view counts to a micro-batch of pairs' recordings.
+
+    Known video ids from all pairs in the batch share videos calls (50 ids each);
+    a search is only spent on recordings without any id.
+    """
+    client = youtube_client.get_client()
+    recs = [(job, rec) for job in jobs for rec in job["recs"]]
+    views = client.get_view_counts(vid for _, rec in recs for vid in rec.get("youtube_video_ids") or [])
+    searched: Dict[int, str] = {}  # id(rec) -> video id found by search
+    if YOUTUBE_SEARCH_FALLBACK:
+        for job, rec in recs:
+            if not rec.get("youtube_video_ids"):
+                vid = client.search_video_id(f"{job['a1']} {job['a2']} {rec['title']}")
+                if vid:
+                    searched[id(rec)] = vid
+        views.update(client.get_view_counts(searched.values()))
+    for _, rec in recs:
+        ids = rec.get("youtube_video_ids") or ([searched[id(rec)]] if id(rec) in searched else [])
+        counts = [views[vid] for vid in ids if views.get(vid) is not None]
+        rec["yt_views"] = max(counts) if counts else None
+    return jobs
+
+
+def enrich_stage(job: Dict) -> Dict:
+    """Look up artist info only when the pair has at least one recording."""
+    if job["recs"]:
+        job["info1"] = mb.get_artist_info(job["a1"])
+        job["info2"] = mb.get_artist_info(job["a2"])
+    return job
+
+
+def label_stage(job: Dict) -> Dict:
+    """Label each recording and turn the pair's recordings into CSV rows."""
+    job["rows"] = []
+    if not job["recs"]:
+        return job
+    a1, a2 = job["a1"], job["a2"]
+    info1, info2 = job["info1"], job["info2"]
+    tags1 = (info1.get("tags") or ARTIST_TAGS.get(a1, "pop")).split(", ")
+    tags2 = (info2.get("tags") or ARTIST_TAGS.get(a2, "pop")).split(", ")
+    tags1 = tags1[:6]
+    tags2 = tags2[:6]
+    region = map_country_to_region(info1.get("country") or info2.get("country"))
+
+    for rec in job["recs"]:
+        # Views when fetched, otherwise MusicBrainz signals (ratings, YouTube links, release count)
+        status = label_success(
+            rec.get("yt_views"),
+            rating_value=rec.get("rating_value"),
+            rating_votes=rec.get("rating_votes"),
+            has_youtube=bool(rec.get("youtube_video_ids")),
+            release_count=rec.get("release_count", 0),
+        )
+
+        job["rows"].append([
+            a1, ", ".join(tags1),
+            a2, ", ".join(tags2),
+            rec["title"],
+            status,
+            str(rec["year"]) if rec["year"] else "",
+            region,
+            str(rec.get("rating_value")) if rec.get("rating_value") is not None else "",
+            str(rec.get("rating_votes")) if rec.get("rating_votes") is not None else "",
+            "",  # peak unknown in this pass
+            str(rec.get("release_count", 0)),
+            "1" if rec.get("youtube_video_ids") else "0",
+            str(rec["yt_views"]) if rec.get("yt_views") is not None else "",
+            rec.get("recording_mbid") or "",
+        ])
+    return job
+
+
+def use_local_backend(db_path: str) -> None:
+    """Query a local MusicBrainz dump store instead of the live API.
+
+    Also exported through the environment so spawned shard workers pick it up.
+    """
+    global mb
+    from . import musicbrainz_local
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Local MusicBrainz store not found: {db_path} (build it with mb_dump_ingest)")
+    os.environ["MB_BACKEND"] = "local"
+    os.environ["MB_LOCAL_DB"] = db_path
+    musicbrainz_local.set_db_path(db_path)
+    mb = musicbrainz_local
+
+
+def build_pipeline() -> Pipeline:
+    """pair source -> recording search -> release-group fallback -> [YouTube views] -> artist enrichment -> labeling -> writer"""
+    stages = [
+        Stage("search", search_stage, workers=SEARCH_WORKERS, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage("rg", release_group_stage, workers=RELEASE_GROUP_WORKERS, queue_size=PIPELINE_QUEUE_SIZE),
+    ]
+    if youtube_client.get_client().enabled:
+        # One worker so that queued pairs accumulate into full videos batches
+        stages.append(Stage("youtube", youtube_stage, workers=1, queue_size=PIPELINE_QUEUE_SIZE,
+                            batch_size=PIPELINE_QUEUE_SIZE))
+    stages += [
+        Stage("enrich", enrich_stage, workers=ENRICH_WORKERS, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage("label", label_stage, workers=1, queue_size=PIPELINE_QUEUE_SIZE),
+    ]
+    return Pipeline(stages, queue_size=PIPELINE_QUEUE_SIZE)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Build factual artist collaboration dataset from MusicBrainz")
     parser.add_argument("--pairs-file", type=str, default=None, help="Path to CSV file with columns: Artist_01,Artist_02 to use as input pairs")
@@ -279,55 +435,35 @@ def main():
     parser.add_argument("--dump-pairs", type=str, default=None, help="If set, write the generated candidate pairs to this CSV path before building")
     parser.add_argument("--only-dump-pairs", action="store_true", help="Only generate and write pairs, then exit without building the dataset")
     parser.add_argument("--out", type=str, default=OUT_PATH, help="Output CSV path for the resulting dataset")
-    parser.add_argument("--checkpoint", type=str, default=None, help="Path to checkpoint file for resume capability (default: auto-generated)")
-    parser.add_argument("--resume", action="store_true", help="Resume from checkpoint if it exists")
+    parser.add_argument("--checkpoint", type=str, default=None, help="Path to the append-only build journal for resume capability (default: auto-generated)")
+    parser.add_argument("--resume", action="store_true", help="Resume by replaying the journal if it exists")
+    parser.add_argument("--mb-db", type=str, default=None, help="Query this local MusicBrainz store (built by mb_dump_ingest) instead of the live API")
+    parser.add_argument("--schedule", action="store_true", help="Search pairs in descending predicted hit probability (learned from past outcomes)")
+    parser.add_argument("--history", nargs="*", default=[], help="Extra journals / dataset CSVs for the scheduler (the pair outcome log is always used)")
+    parser.add_argument("--shards", type=int, default=1, help="Split the pairs across this many worker processes (shared rate limit), then merge")
     args = parser.parse_args()
 
     os.makedirs(OUT_DIR, exist_ok=True)
+    if args.mb_db:
+        use_local_backend(args.mb_db)
     
-    # Setup checkpoint file
+    # Setup journal file
     out_path = args.out or OUT_PATH
     if args.checkpoint:
         checkpoint_path = args.checkpoint
     else:
-        # Auto-generate checkpoint name based on output file
-        checkpoint_path = out_path.replace(".csv", "_checkpoint.json")
-    
-    # Load checkpoint if resuming
-    checkpoint_data = {}
-    if args.resume and os.path.exists(checkpoint_path):
-        try:
-            with open(checkpoint_path, "r", encoding="utf-8") as f:
-                checkpoint_data = json.load(f)
-            print(f"Resuming from checkpoint: {checkpoint_path}")
-            print(f"  Pairs processed: {checkpoint_data.get('pairs_processed', 0)}")
-            print(f"  Rows collected: {len(checkpoint_data.get('rows', []))}")
-        except Exception as e:
-            print(f"Warning: Could not load checkpoint ({e}), starting fresh")
-            checkpoint_data = {}
-
-    header = [
-        "Artist_01",
-        "Artist_01_Tags",
-        "Artist_02",
-        "Artist_02_Tags",
-        "Song_Title",
-        "Collaboration_Status",
-        "Release_Year",
-        "Region",
-        "MB_Rating_Value",
-        "MB_Rating_Votes",
-        "Peak_Chart_Position",
-    ]
+        # Auto-generate journal name based on output file
+        checkpoint_path = out_path.replace(".csv", "_journal.jsonl")
 
-    rows: List[List[str]] = checkpoint_data.get("rows", [])
-    used_pairs = set(tuple(p) for p in checkpoint_data.get("used_pairs", []))
     # Determine target pairs: either read from file or discover+sample
     if args.pairs_file:
         target_pairs = read_pairs_file(args.pairs_file)
-        if not target_pairs:
-            print(f"No pairs loaded from {args.pairs_file}")
-            return
+        # Dumping, scheduling and sharding need the whole list; a plain build streams the file
+        if args.dump_pairs or args.schedule or args.shards > 1:
+            target_pairs = list(target_pairs)
+            if not target_pairs:
+                print(f"No pairs loaded from {args.pairs_file}")
+                return
     else:
         all_artists = discover_artists()
         # Target pairs; either explicit or heuristic scaling
@@ -344,156 +480,178 @@ def main():
         if args.only_dump_pairs:
             return
 
-    # Setup checkpoint save function
-    def save_checkpoint():
+    if args.schedule:
+        target_pairs = schedule_pairs(target_pairs, args.history)
+
+    if args.shards > 1:
+        from .shards import run_sharded
+        rows_written = run_sharded(target_pairs, args.shards, out_path, args.resume)
+        print("Wrote factual CSV:", out_path)
+        print("Rows:", rows_written)
+        return
+
+    rows_written = build_dataset(target_pairs, out_path, checkpoint_path, args.resume)
+
+    print("Wrote factual CSV:", out_path)
+    print("Rows:", rows_written)
+
+    # Keep pair outcomes for the scheduler, then clean up journal file on successful completion
+    if os.path.exists(checkpoint_path):
+        record_outcomes(checkpoint_path)
         try:
-            with open(checkpoint_path, "w", encoding="utf-8") as f:
-                json.dump({
-                    "rows": rows,
-                    "used_pairs": [list(p) for p in used_pairs],
-                    "pairs_processed": len(used_pairs),
-                    "target_rows": TARGET_ROWS,
-                }, f, ensure_ascii=False)
-        except Exception as e:
-            print(f"\nWarning: Could not save checkpoint: {e}")
-    
+            os.remove(checkpoint_path)
+            print(f"Journal file removed: {checkpoint_path}")
+        except Exception:
+            pass
+
+
+def build_dataset(
+    target_pairs: Iterable[Tuple[str, str]],
+    out_path: str,
+    journal_path: str,
+    resume: bool = False,
+    target_rows: int = TARGET_ROWS,
+    row_counter=None,
+    bar_position: int = 0,
+) -> int:
+    """Run the pipeline over target_pairs (a list or a lazy iterator), streaming rows into out_path.
+    Returns rows written.
+
+    Every processed pair is journaled before its rows reach the CSV. On resume the
+    journal is replayed to rebuild the CSV and the set of finished pairs.
+    Sharded builds pass a shared multiprocessing.Value as row_counter so that
+    target_rows applies to the total across all shards.
+    """
+    journal = Journal(journal_path)
+    used_pairs = PairKeySet()
+    rows_written = 0
+
+    # (Re)write the CSV header plus any journaled rows; afterwards rows are appended per pair
+    out_file = open(out_path, "w", encoding="utf-8", newline="")
+    writer = csv.writer(out_file, quoting=csv.QUOTE_ALL)
+    writer.writerow(HEADER)
+    if resume:
+        for entry in journal.replay():
+            used_pairs.add(*entry["pair"])
+            # Journals from before the raw-signal columns hold shorter rows
+            writer.writerows(row + [""] * (len(HEADER) - len(row)) for row in entry["rows"])
+            rows_written += len(entry["rows"])
+        if used_pairs:
+            print(f"Resuming from journal: {journal_path}")
+            print(f"  Pairs processed: {len(used_pairs)}")
+            print(f"  Rows collected: {rows_written}")
+    out_file.flush()
+    journal.open(resume)
+
+    def add_rows(n: int) -> int:
+        """Record n new rows (already counted in rows_written) and return the build-wide total."""
+        if row_counter is None:
+            return rows_written
+        with row_counter.get_lock():
+            row_counter.value += n
+            return row_counter.value
+
+    total_rows = add_rows(rows_written)
+
     # Setup graceful interrupt handler
     interrupted = False
     def signal_handler(sig, frame):
         nonlocal interrupted
         interrupted = True
-        print("\n\nInterrupted! Saving checkpoint...")
-        save_checkpoint()
-        print(f"Checkpoint saved to: {checkpoint_path}")
-        print(f"Resume with: --resume --checkpoint {checkpoint_path}")
+        print("\n\nInterrupted! Syncing journal...")
+        journal.close()
+        out_file.close()
+        print(f"Journal saved to: {journal_path}")
+        print(f"Resume with: --resume --checkpoint {journal_path}")
         sys.exit(0)
     
     signal.signal(signal.SIGINT, signal_handler)
     
-    # Skip already processed pairs if resuming
-    start_idx = checkpoint_data.get("pairs_processed", 0)
-    if start_idx > 0:
-        print(f"Skipping first {start_idx} pairs (already processed)")
-    
     # Progress bars: pairs scanned and rows produced
-    pairs_bar = tqdm(total=len(target_pairs), desc="Pairs", unit="pair", initial=start_idx)
-    rows_bar = tqdm(total=TARGET_ROWS, desc="Rows", unit="row", initial=len(rows))
-
-    pairs_processed = start_idx
-    for (a1, a2) in target_pairs[start_idx:]:
-        if interrupted:
-            break
-            
-        key = tuple(sorted([a1.lower(), a2.lower()]))
-        if key in used_pairs:
-            pairs_bar.update(1)
-            pairs_processed += 1
-            continue
-        # First, search for actual collaboration recordings (saves extra artist lookups when none found)
-        recs = search_recordings_by_two_artists(a1, a2, limit=MAX_RECORDINGS_PER_PAIR)
-        if not recs:
+    # A streamed pairs file has no length up front; its skipped pairs are reported after the run
+    total_pairs = len(target_pairs) if isinstance(target_pairs, list) else None
+    already_done = 0
+    if total_pairs is not None and used_pairs:
+        already_done = sum(1 for pair in target_pairs if pair in used_pairs)
+        if already_done:
+            print(f"Skipping {already_done} pairs (already processed)")
+    pairs_bar = tqdm(total=total_pairs, desc="Pairs", unit="pair", initial=already_done, position=bar_position)
+    skipped = 0
+    rows_bar = tqdm(total=target_rows, desc="Rows", unit="row", initial=total_rows, position=bar_position + 1)
+
+    def pair_source():
+        nonlocal skipped
+        for (a1, a2) in target_pairs:
+            key = pair_key(a1, a2)
+            if key in used_pairs:
+                skipped += 1
+                continue
+            yield {"a1": a1, "a2": a2, "key": key}
+
+    pipeline = build_pipeline()
+    if total_rows >= target_rows:
+        pipeline.stop()
+    last_stats = 0.0
+    searched = hits = 0
+    # Writer: runs in the main thread and consumes finished jobs in completion order
+    try:
+        for job in pipeline.run(pair_source()):
+            if interrupted or pipeline.stop_event.is_set():
+                continue  # draining after stop
+            if job.get("error"):
+                # Leave the pair unjournaled so a resumed run retries it
+                tqdm.write(f"Warning: {job['a1']} + {job['a2']} failed ({job['error']})")
+                pairs_bar.update(1)
+                continue
+            # Song-level dedupe keys include the artist pair, so each pair can be deduped on its own
+            if row_counter is not None:
+                total_rows = row_counter.value
+            searched += 1
+            hits += bool(job["rows"])
+            pair_rows = dedupe_song_rows(job["rows"])[:max(0, target_rows - total_rows)]
+            journal.append(job["key"], pair_rows)
+            writer.writerows(pair_rows)
+            out_file.flush()
+            rows_written += len(pair_rows)
+            new_total = add_rows(len(pair_rows))
+            rows_bar.update(new_total - total_rows)
+            total_rows = new_total
+            used_pairs.add(*job["key"])
             pairs_bar.update(1)
-            pairs_processed += 1
-            continue
-        
-        # Deduplicate recordings by normalized title (remove instrumental/remix/etc variants)
-        recs = deduplicate_recordings(recs)
-        
-        # Enrich artist info only when we have at least one recording
-        info1 = get_artist_info(a1)
-        info2 = get_artist_info(a2)
-        tags1 = (info1.get("tags") or ARTIST_TAGS.get(a1, "pop")).split(", ")
-        tags2 = (info2.get("tags") or ARTIST_TAGS.get(a2, "pop")).split(", ")
-        tags1 = tags1[:6]
-        tags2 = tags2[:6]
-        region = map_country_to_region(info1.get("country") or info2.get("country"))
-
-        for rec in recs:
-            # Use only MusicBrainz signals (ratings, YouTube links, release count) for Success/Failure
-            status = label_success(
-                None,
-                rating_value=rec.get("rating_value"),
-                rating_votes=rec.get("rating_votes"),
-                has_youtube=bool(rec.get("youtube_video_ids")),
-                release_count=rec.get("release_count", 0),
-            )
 
-            rows.append([
-                a1, ", ".join(tags1),
-                a2, ", ".join(tags2),
-                rec["title"],
-                status,
-                str(rec["year"]) if rec["year"] else "",
-                region,
-                str(rec.get("rating_value")) if rec.get("rating_value") is not None else "",
-                str(rec.get("rating_votes")) if rec.get("rating_votes") is not None else "",
-                "",  # peak unknown in this pass
-            ])
-            rows_bar.update(1)
-            if len(rows) >= TARGET_ROWS:
-                break
-        used_pairs.add(key)
-        pairs_bar.update(1)
-        pairs_processed += 1
-        
-        # Save checkpoint every 10 pairs
-        if pairs_processed % 10 == 0:
-            save_checkpoint()
-        
-        if len(rows) >= TARGET_ROWS:
-            break
-
-    # Final deduplication at row level by normalized title + artist pair
-    # Keep only the best variant of each song (prefer Success status, then most complete metadata)
-    song_map: Dict[Tuple[str, Tuple[str, str]], List[str]] = {}  # (normalized_title, artist_pair) -> best_row
-    
-    for row in rows:
-        # Create a key from normalized title and sorted artist names
-        title_norm = normalize_title(row[4])  # Song_Title is at index 4
-        artist_key = tuple(sorted([row[0].lower(), row[2].lower()]))  # Artist_01, Artist_02
-        song_key = (title_norm, artist_key)
-        
-        if song_key in song_map:
-            # Compare with existing entry - keep better one
-            existing = song_map[song_key]
-            
-            # Prefer Success over Failure
-            if row[5] == "Success" and existing[5] != "Success":
-                song_map[song_key] = row
-            elif row[5] == existing[5]:
-                # If same status, prefer one with more metadata (year, ratings, etc.)
-                existing_data_count = sum(1 for x in existing[6:10] if x)
-                new_data_count = sum(1 for x in row[6:10] if x)
-                if new_data_count > existing_data_count:
-                    song_map[song_key] = row
-        else:
-            # New song - add it
-            song_map[song_key] = row
-    
-    # Convert back to list
-    final_rows = list(song_map.values())
-    
-    # Write CSV (quote all fields)
-    out_path = args.out or OUT_PATH
-    with open(out_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-        writer.writerow(header)
-        writer.writerows(final_rows[:TARGET_ROWS])  # Ensure we don't exceed target
+            now = time.monotonic()
+            if now - last_stats >= 1.0:
+                pairs_bar.set_postfix_str(pipeline.stats_line(), refresh=False)
+                last_stats = now
+
+            if total_rows >= target_rows:
+                pipeline.stop()
+    except Exception:
+        # e.g. a bad line in the pairs file: the pairs before it are written and journaled,
+        # so keep the journal for --resume instead of letting the caller record and delete it
+        journal.close()
+        out_file.close()
+        pairs_bar.close()
+        rows_bar.close()
+        tqdm.write(f"Build failed; journal kept at {journal_path} (rerun with --resume --checkpoint {journal_path})")
+        raise
+
+    tqdm.write(f"Pipeline: {pipeline.stats_line()}")
+    yt = youtube_client.get_client()
+    if yt.enabled:
+        yt.save_cache()
+        tqdm.write(yt.stats_line())
+    if total_pairs is None and skipped:
+        tqdm.write(f"Skipped {skipped} pairs (already processed)")
+    if searched:
+        tqdm.write(f"Hit rate: {hits}/{searched} searched pairs had recordings ({hits / searched:.1%})")
+    journal.close()
+    out_file.close()
 
     # Close progress bars cleanly
     pairs_bar.close()
     rows_bar.close()
-
-    print("Wrote factual CSV:", out_path)
-    print("Rows:", len(final_rows[:TARGET_ROWS]))
-    
-    # Clean up checkpoint file on successful completion
-    if os.path.exists(checkpoint_path):
-        try:
-            os.remove(checkpoint_path)
-            print(f"Checkpoint file removed: {checkpoint_path}")
-        except Exception:
-            pass
+    return rows_written
 
 
 if __name__ == "__main__":
@@ -42,3 +42,37 @@ DISCOVERY_TAGS = os.getenv(
 ARTISTS_PER_TAG = int(os.getenv("ARTISTS_PER_TAG", "40"))
 MAX_RECORDINGS_PER_PAIR = int(os.getenv("MAX_RECORDINGS_PER_PAIR", "12"))
 MAX_CANDIDATE_PAIRS = int(os.getenv("MAX_CANDIDATE_PAIRS", "2000"))
+
+# Staged build pipeline: worker threads per network stage and bounded queue size between stages.
+# All MusicBrainz stages share one rate limiter, so extra workers overlap latency rather than raise the request rate.
+SEARCH_WORKERS = int(os.getenv("FACTUAL_SEARCH_WORKERS", "2"))
+RELEASE_GROUP_WORKERS = int(os.getenv("FACTUAL_RELEASE_GROUP_WORKERS", "2"))
+ENRICH_WORKERS = int(os.getenv("FACTUAL_ENRICH_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("FACTUAL_PIPELINE_QUEUE_SIZE", "32"))
+
+# Build journal: fsync after this many journaled pairs (a crash loses at most this many)
+JOURNAL_FSYNC_EVERY = int(os.getenv("FACTUAL_JOURNAL_FSYNC_EVERY", "5"))
+
+# MusicBrainz backend: "api" (live web service, rate limited) or "local" (SQLite store built by mb_dump_ingest)
+MB_BACKEND = os.getenv("MB_BACKEND", "api").lower()
+MB_LOCAL_DB = os.getenv(
+	"MB_LOCAL_DB",
+	os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "musicbrainz.sqlite"),
+)
+
+# Log of every searched pair and how many rows it produced; feeds the hit-rate pair scheduler
+PAIR_OUTCOMES_PATH = os.getenv(
+	"PAIR_OUTCOMES_PATH",
+	os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "pair_outcomes.csv"),
+)
+
+# YouTube statistics: quota units one build may spend (the API's default daily quota is 10,000;
+# a videos call for up to 50 ids costs 1 unit, a search 100), cache lifetime and location,
+# and whether recordings without a MusicBrainz YouTube link fall back to a search
+YOUTUBE_QUOTA_UNITS = int(os.getenv("YOUTUBE_QUOTA_UNITS", "9000"))
+YOUTUBE_CACHE_TTL_SECONDS = float(os.getenv("YOUTUBE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+YOUTUBE_CACHE_PATH = os.getenv(
+	"YOUTUBE_CACHE_PATH",
+	os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "youtube_stats_cache.json"),
+)
+YOUTUBE_SEARCH_FALLBACK = os.getenv("YOUTUBE_SEARCH_FALLBACK", "true").lower() in {"1", "true", "yes"}
@@ -3,8 +3,12 @@ Curate high-probability collaboration pairs from a large pairs file.
 Filters for popular/mainstream artists more likely to have MusicBrainz recordings together.
 """
 import csv
+import os
 import sys
-from typing import List, Tuple, Set
+from typing import Iterator, List, Optional, Tuple
+
+from .artist_keys import artist_key
+from .pair_source import PairSource, select_by_priority, unique_pairs
 
 # High-collaboration-probability artists (mainstream, active 2000+, cross-genre appeal)
 POPULAR_ARTISTS = {
@@ -48,6 +52,7 @@ POPULAR_ARTISTS = {
     "elton john", "paul mccartney", "stevie wonder", "sting", "rod stewart",
     "santana", "andrea bocelli", "céline dion", "mariah carey",
 }
+_POPULAR_KEYS = frozenset(artist_key(name) for name in POPULAR_ARTISTS)
 
 # Genre combos that are collab-friendly
 COLLAB_FRIENDLY_COMBOS = [
@@ -58,26 +63,18 @@ COLLAB_FRIENDLY_COMBOS = [
 
 
 def normalize_name(name: str) -> str:
-    """Normalize artist name for comparison."""
-    return name.lower().strip()
+    """Normalize artist name for comparison (accent-, case- and whitespace-insensitive)."""
+    return artist_key(name)
 
 
 def is_popular_artist(name: str) -> bool:
     """Check if artist is in the popular list."""
-    norm = normalize_name(name)
-    return norm in POPULAR_ARTISTS
+    return normalize_name(name) in _POPULAR_KEYS
 
 
-def read_pairs(path: str) -> List[Tuple[str, str]]:
-    """Read pairs CSV and return list of (artist1, artist2) tuples."""
-    pairs: List[Tuple[str, str]] = []
-    with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.reader(f)
-        header = next(reader, None)
-        for row in reader:
-            if len(row) >= 2:
-                pairs.append((row[0].strip(), row[1].strip()))
-    return pairs
+def read_pairs(path: str) -> Iterator[Tuple[str, str]]:
+    """Lazily yield (artist1, artist2) tuples from a pairs CSV."""
+    return iter(PairSource(path))
 
 
 def write_pairs(pairs: List[Tuple[str, str]], path: str) -> None:
@@ -88,51 +85,37 @@ def write_pairs(pairs: List[Tuple[str, str]], path: str) -> None:
         writer.writerows(pairs)
 
 
-def curate_pairs(input_path: str, output_path: str, min_pairs: int = 200, max_pairs: int = 500) -> None:
+def pair_priority(a1: str, a2: str) -> Optional[int]:
+    """0 = both artists popular, 1 = one popular, None = skip."""
+    popular = int(is_popular_artist(a1)) + int(is_popular_artist(a2))
+    return 2 - popular if popular else None
+
+
+def curate_pairs(input_path: str, output_path: str, min_pairs: int = 200, max_pairs: int = 500,
+                 start_offset: int = 0) -> int:
     """
     Filter pairs to keep only those with at least one popular artist.
-    Stop when we have min_pairs, cap at max_pairs.
+    Pairs with both artists popular come first; one-popular pairs are only added
+    while fewer than min_pairs are selected. Capped at max_pairs.
+    The input is streamed once; returns the byte offset where reading stopped.
     """
-    all_pairs = read_pairs(input_path)
-    print(f"Loaded {len(all_pairs)} pairs from {input_path}")
-    
-    curated: List[Tuple[str, str]] = []
-    seen: Set[Tuple[str, str]] = set()
-    
-    # Priority 1: Both artists popular
-    for a1, a2 in all_pairs:
-        if len(curated) >= max_pairs:
-            break
-        key = tuple(sorted([normalize_name(a1), normalize_name(a2)]))
-        if key in seen:
-            continue
-        if is_popular_artist(a1) and is_popular_artist(a2):
-            curated.append((a1, a2))
-            seen.add(key)
-    
-    print(f"Found {len(curated)} pairs with both artists popular")
-    
-    # Priority 2: At least one artist popular
-    if len(curated) < min_pairs:
-        for a1, a2 in all_pairs:
-            if len(curated) >= max_pairs:
-                break
-            key = tuple(sorted([normalize_name(a1), normalize_name(a2)]))
-            if key in seen:
-                continue
-            if is_popular_artist(a1) or is_popular_artist(a2):
-                curated.append((a1, a2))
-                seen.add(key)
+    source = PairSource(input_path, start_offset)
+    curated, taken = select_by_priority(unique_pairs(source), pair_priority, max_pairs, min_pairs)
+    print(f"Scanned {source.rows_read} pairs from {input_path}")
+    print(f"Found {taken.get(0, 0)} pairs with both artists popular")
+    if 1 in taken:
         print(f"After adding at-least-one-popular: {len(curated)} pairs")
     
     write_pairs(curated, output_path)
     print(f"Wrote {len(curated)} curated pairs to {output_path}")
     
     # Stats
-    both_popular = sum(1 for a1, a2 in curated if is_popular_artist(a1) and is_popular_artist(a2))
     print(f"\nStats:")
-    print(f"  Both popular: {both_popular}")
-    print(f"  One popular: {len(curated) - both_popular}")
+    print(f"  Both popular: {taken.get(0, 0)}")
+    print(f"  One popular: {taken.get(1, 0)}")
+    if source.offset < os.path.getsize(input_path):
+        print(f"  Stopped at byte offset {source.offset}; pass it as a third argument to continue from there")
+    return source.offset
 
 
 if __name__ == "__main__":
@@ -143,5 +126,6 @@ if __name__ == "__main__":
         input_file = sys.argv[1]
     if len(sys.argv) > 2:
         output_file = sys.argv[2]
+    start_offset = int(sys.argv[3]) if len(sys.argv) > 3 else 0
     
-    curate_pairs(input_file, output_file, min_pairs=200, max_pairs=500)
+    curate_pairs(input_file, output_file, min_pairs=200, max_pairs=500, start_offset=start_offset)
@@ -0,0 +1,69 @@
+"""
+Append-only journal for resumable dataset builds.
+
+Every processed pair is recorded as one JSON line: {"pair": [a, b], "rows": [...]}.
+Lines are flushed immediately and fsync'd in batches, so checkpoint cost stays
+constant per pair and a crash loses at most the last unsynced batch. A torn
+final line (crash mid-write) is ignored on replay and truncated before appending.
+"""
+import json
+import os
+from typing import Dict, Iterator, List, Tuple
+
+from .config import JOURNAL_FSYNC_EVERY
+
+
+class Journal:
+    def __init__(self, path: str, fsync_every: int = JOURNAL_FSYNC_EVERY):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self._valid_bytes = 0
+        self._pending = 0
+        self._f = None
+
+    def replay(self) -> Iterator[Dict]:
+        """Yield journaled entries in write order, stopping at the first torn line."""
+        self._valid_bytes = 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self._valid_bytes += len(line)
+                yield entry
+
+    def open(self, resume: bool) -> None:
+        """Open for appending. When resuming, drop anything after the last valid entry."""
+        if resume and os.path.exists(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(self._valid_bytes)
+            self._f = open(self.path, "a", encoding="utf-8", newline="\n")
+        else:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._f = open(self.path, "w", encoding="utf-8", newline="\n")
+
+    def append(self, pair: Tuple[str, str], rows: List[List[str]]) -> None:
+        self._f.write(json.dumps({"pair": list(pair), "rows": rows}, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        if self._f and self._pending:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._f:
+            self.sync()
+            self._f.close()
+            self._f = None
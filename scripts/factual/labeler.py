@@ -16,12 +16,13 @@ def label_success(
     has_youtube: bool = False,
     release_count: int = 0,
 ) -> str:
-    """Label Success using only MusicBrainz-sourced signals (no external views):
+    """Label Success from the strongest signal available:
     - Prefer MusicBrainz recording ratings when enabled and present.
+    - If YouTube views were fetched (yt_views not None), Success means YOUTUBE_SUCCESS_VIEWS+ views;
+      below that the YouTube link alone no longer counts.
     - Otherwise, treat presence of a YouTube relation in MusicBrainz as Success (proxy for official video/cultural impact).
     - Otherwise, if recording has many releases (MIN_RELEASES_FOR_SUCCESS+), label Success (popular songs get many pressings).
     - Else Failure.
-    Note: yt_views is ignored in this MB-only mode; kept for signature compatibility.
     """
     if USE_MB_RATINGS and rating_value is not None and rating_votes is not None:
         try:
@@ -29,7 +30,10 @@ def label_success(
                 return "Success"
         except Exception:
             pass
-    if has_youtube:
+    if yt_views is not None:
+        if yt_views >= YOUTUBE_SUCCESS_VIEWS:
+            return "Success"
+    elif has_youtube:
         return "Success"
     if release_count >= MIN_RELEASES_FOR_SUCCESS:
         return "Success"
@@ -0,0 +1,237 @@
+"""
+Load MusicBrainz JSON data dumps into the local SQLite store used by musicbrainz_local.
+
+The JSON dumps (https://metabrainz.org/datasets) ship one archive per entity type,
+e.g. artist.tar.xz containing mbdump/artist with one JSON document per line in the
+same shape as the web service. Each --dump argument may be such an archive, an
+extracted mbdump directory, or a single (optionally .gz/.xz/.bz2) JSON-lines file
+named after its entity. Everything is streamed and inserted in batches; indexes
+are built once at the end. Rows are upserted on their natural keys (unique
+indexes on the child tables, see UNIQUE_KEYS), so loading into an existing
+store, e.g. a full run after a --limit test run, does not duplicate rows.
+
+Usage:
+    python -m scripts.factual.mb_dump_ingest --dump dumps/artist.tar.xz --dump dumps/recording.tar.xz \
+        --dump dumps/release.tar.xz --dump dumps/release-group.tar.xz --db data/musicbrainz.sqlite
+"""
+import argparse
+import bz2
+import gzip
+import json
+import lzma
+import os
+import sqlite3
+import tarfile
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from .config import MB_LOCAL_DB
+from .musicbrainz_local import INDEXES, SCHEMA, UNIQUE_KEYS
+
+ENTITIES = ("artist", "recording", "release-group", "release")
+BATCH_SIZE = 5000
+
+
+def _open_lines(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".xz"):
+        return lzma.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _entity_of(name: str) -> Optional[str]:
+    base = os.path.basename(name)
+    for suffix in (".gz", ".xz", ".bz2", ".jsonl", ".json"):
+        if base.endswith(suffix):
+            base = base[: -len(suffix)]
+    return base if base in ENTITIES else None
+
+
+def iter_dump(path: str) -> Iterator[Tuple[str, Dict]]:
+    """Yield (entity_type, document) from an archive, mbdump directory or JSON-lines file."""
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if _entity_of(name):
+                yield from iter_dump(os.path.join(path, name))
+        return
+    if ".tar" in os.path.basename(path):
+        with tarfile.open(path, "r|*") as tar:
+            for member in tar:
+                entity = _entity_of(member.name) if member.isfile() and "/mbdump/" in f"/{member.name}" else None
+                if not entity:
+                    continue
+                # Streamed tar members are not seekable, so read raw byte lines
+                for line in tar.extractfile(member):
+                    if line.strip():
+                        yield entity, json.loads(line)
+        return
+    entity = _entity_of(path)
+    if not entity:
+        raise ValueError(f"Cannot infer entity type from file name: {path}")
+    with _open_lines(path) as f:
+        for line in f:
+            if line.strip():
+                yield entity, json.loads(line)
+
+
+def _rating(doc: Dict) -> Tuple[Optional[float], Optional[int]]:
+    rating = doc.get("rating") or {}
+    return rating.get("value"), rating.get("votes-count") or rating.get("count")
+
+
+def _url_rows(entity: str, doc: Dict) -> List[Tuple]:
+    rows = []
+    for rel in doc.get("relations", []) or []:
+        url = (rel.get("url") or {}).get("resource")
+        if url:
+            rows.append((entity, doc["id"], url))
+    return rows
+
+
+def _named(items) -> str:
+    return json.dumps(
+        [{"name": i.get("name"), "count": i.get("count", 0)} for i in items or [] if i.get("name")],
+        ensure_ascii=False,
+    )
+
+
+class Loader:
+    """Buffers rows per table and flushes them with executemany."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.buffers: Dict[str, List[Tuple]] = {}
+        self.sql = {
+            "artist": "INSERT OR REPLACE INTO artist VALUES (?,?,?,?,?,?,?,?,?,?)",
+            "artist_tag": "INSERT OR REPLACE INTO artist_tag VALUES (?,?,?)",
+            "recording": "INSERT OR REPLACE INTO recording VALUES (?,?,?,?,?)",
+            "artist_credit": "INSERT OR REPLACE INTO artist_credit VALUES (?,?,?,?,?)",
+            "release_group": "INSERT OR REPLACE INTO release_group VALUES (?,?,?,?,?)",
+            "recording_release": "INSERT OR REPLACE INTO recording_release VALUES (?,?,?,?)",
+            "url_relation": "INSERT OR REPLACE INTO url_relation VALUES (?,?,?)",
+        }
+
+    def add(self, table: str, rows: List[Tuple]) -> None:
+        buf = self.buffers.setdefault(table, [])
+        buf.extend(rows)
+        if len(buf) >= BATCH_SIZE:
+            self.flush(table)
+
+    def flush(self, table: Optional[str] = None) -> None:
+        for name in [table] if table else list(self.buffers):
+            buf = self.buffers.get(name)
+            if buf:
+                self.conn.executemany(self.sql[name], buf)
+                buf.clear()
+
+    def load(self, entity: str, doc: Dict) -> None:
+        mbid = doc.get("id")
+        if not mbid:
+            return
+        if entity == "artist":
+            name = doc.get("name") or ""
+            value, votes = _rating(doc)
+            self.add("artist", [(
+                mbid, name, name.lower(), doc.get("sort-name"), doc.get("type"), doc.get("country"),
+                _named(doc.get("tags")), _named(doc.get("genres")), value, votes,
+            )])
+            tags = {t["name"].lower(): t.get("count", 0) for t in (doc.get("tags") or []) + (doc.get("genres") or []) if t.get("name")}
+            self.add("artist_tag", [(tag, mbid, count) for tag, count in tags.items()])
+            self.add("url_relation", _url_rows("artist", doc))
+        elif entity == "recording":
+            value, votes = _rating(doc)
+            self.add("recording", [(mbid, doc.get("title") or "", doc.get("first-release-date"), value, votes)])
+            credits = []
+            for pos, ac in enumerate(doc.get("artist-credit", []) or []):
+                name = ac.get("name") or (ac.get("artist") or {}).get("name")
+                if name:
+                    credits.append((mbid, pos, name, name.lower(), (ac.get("artist") or {}).get("id")))
+            self.add("artist_credit", credits)
+            self.add("url_relation", _url_rows("recording", doc))
+        elif entity == "release-group":
+            value, votes = _rating(doc)
+            self.add("release_group", [(mbid, doc.get("title"), doc.get("first-release-date"), value, votes)])
+            self.add("url_relation", _url_rows("release-group", doc))
+        elif entity == "release":
+            rg_mbid = (doc.get("release-group") or {}).get("id")
+            date = doc.get("date") or ""
+            seen = set()
+            rows = []
+            for medium in doc.get("media", []) or []:
+                for track in medium.get("tracks", []) or []:
+                    rec_mbid = (track.get("recording") or {}).get("id")
+                    if rec_mbid and rec_mbid not in seen:
+                        seen.add(rec_mbid)
+                        rows.append((rec_mbid, mbid, rg_mbid, date))
+            self.add("recording_release", rows)
+
+
+def ensure_unique_keys(conn: sqlite3.Connection) -> None:
+    """Create the child tables' unique indexes, first removing duplicates an older load left behind."""
+    for table, columns in UNIQUE_KEYS.items():
+        index = f"{table}_key_idx"
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,)).fetchone():
+            continue
+        cols = ", ".join(columns)
+        removed = conn.execute(
+            f"DELETE FROM {table} WHERE rowid NOT IN (SELECT MAX(rowid) FROM {table} GROUP BY {cols})"
+        ).rowcount
+        if removed:
+            print(f"Removed {removed} duplicate {table} rows")
+        conn.execute(f"CREATE UNIQUE INDEX {index} ON {table} ({cols})")
+    conn.commit()
+
+
+def ingest(dumps: List[str], db_path: str = MB_LOCAL_DB, limit: Optional[int] = None) -> Dict[str, int]:
+    """Stream every dump into db_path and build indexes. Returns documents loaded per entity."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    # Bulk-load settings: the store can always be rebuilt from the dumps
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    for stmt in SCHEMA:
+        conn.execute(stmt)
+    ensure_unique_keys(conn)
+    loader = Loader(conn)
+    counts: Dict[str, int] = {}
+    for dump in dumps:
+        bar = tqdm(desc=os.path.basename(dump), unit="doc")
+        for entity, doc in iter_dump(dump):
+            loader.load(entity, doc)
+            counts[entity] = counts.get(entity, 0) + 1
+            bar.update(1)
+            if limit and counts[entity] >= limit:
+                break
+        bar.close()
+        loader.flush()
+        conn.commit()
+    t0 = time.time()
+    for stmt in INDEXES:
+        conn.execute(stmt)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    print(f"Indexes built in {time.time() - t0:.1f}s")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load MusicBrainz JSON dumps into a local SQLite store")
+    parser.add_argument("--dump", action="append", required=True, help="Dump archive, mbdump directory or JSON-lines file (repeatable)")
+    parser.add_argument("--db", default=MB_LOCAL_DB, help="SQLite output path")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many documents per dump (for testing)")
+    args = parser.parse_args()
+
+    counts = ingest(args.dump, args.db, args.limit)
+    for entity, n in counts.items():
+        print(f"  {entity}: {n}")
+    print(f"Local MusicBrainz store: {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import threading
 import time
 import requests
 from typing import Dict, List, Optional
@@ -9,6 +10,58 @@ BASE = "https://musicbrainz.org/ws/2"
 HEADERS = {"User-Agent": MB_USER_AGENT}
 
 
+class RateLimiter:
+    """Thread-safe fixed-interval pacer shared by every caller of _get.
+
+    Each wait() reserves the next free slot and sleeps until it arrives, so
+    concurrent workers together never exceed one request per interval.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class SharedRateLimiter:
+    """Cross-process variant of RateLimiter for sharded builds.
+
+    The next free slot (wall-clock seconds) lives in a multiprocessing.Value created
+    by the parent, so every worker process draws from the same global request budget.
+    """
+
+    def __init__(self, next_slot, interval: float):
+        self.interval = interval
+        self._next_slot = next_slot
+
+    def wait(self) -> None:
+        with self._next_slot.get_lock():
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limiter = RateLimiter(MB_RATE_LIMIT_SECONDS)
+
+
+def set_rate_limiter(limiter) -> None:
+    """Replace the module-wide limiter (anything with a wait() method)."""
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
 def _get(url: str, params: Dict[str, str]) -> Dict:
     """GET helper with polite pacing and basic retry. Respects MB_RATE_LIMIT_SECONDS."""
     params = dict(params)
@@ -16,8 +69,8 @@ def _get(url: str, params: Dict[str, str]) -> Dict:
     last_exc = None
     for attempt in range(4):
         try:
-            # fixed-rate pacing: ~1 req/sec by default
-            time.sleep(MB_RATE_LIMIT_SECONDS)
+            # fixed-rate pacing: ~1 req/sec by default, shared across threads
+            _rate_limiter.wait()
             r = requests.get(url, params=params, headers=HEADERS, timeout=30)
             r.raise_for_status()
             return r.json()
@@ -104,11 +157,15 @@ def _extract_youtube_id(url: str) -> Optional[str]:
     return None
 
 
-def search_recordings_by_two_artists(artist1: str, artist2: str, limit: int = 10) -> List[Dict]:
+def search_recordings_by_two_artists(
+    artist1: str, artist2: str, limit: int = 10, rg_fallback: bool = True
+) -> List[Dict]:
     """
     Find recordings that credit BOTH artists.
     Uses MusicBrainz Lucene query: artist:"A" AND artist:"B"
     Returns list of recordings with title, artist-credit names, first release year if available.
+    With rg_fallback=False the release-group lookups are skipped so a caller can
+    run apply_release_group_fallback() separately (e.g. in its own pipeline stage).
     """
     q = f'artist:"{artist1}" AND artist:"{artist2}"'
     data = _get(
@@ -159,30 +216,6 @@ def search_recordings_by_two_artists(artist1: str, artist2: str, limit: int = 10
                 vid = _extract_youtube_id(target)
                 if vid:
                     yt_ids.append(vid)
-        # If no recording-level YouTube URL, try release-group level
-        if not yt_ids and rg_mbid:
-            try:
-                rg_full = get_release_group_by_mbid(rg_mbid, inc="url-rels+ratings")
-                for rel in rg_full.get("relations", []) or []:
-                    target = rel.get("url", {}).get("resource") or rel.get("target") or ""
-                    if any(h in target for h in YOUTUBE_HOSTS):
-                        vid = _extract_youtube_id(target)
-                        if vid:
-                            yt_ids.append(vid)
-                # if recording rating missing, consider release-group rating as fallback
-                if rating_value is None:
-                    rg_rating = rg_full.get("rating") or {}
-                    rv = rg_rating.get("value")
-                    if rv is not None:
-                        rating_value = rv
-                if rating_votes is None:
-                    rg_rating = rg_full.get("rating") or {}
-                    rc = rg_rating.get("votes-count") or rg_rating.get("count")
-                    if rc is not None:
-                        rating_votes = rc
-            except Exception:
-                pass
-
         out.append({
             "title": title,
             "artists": names,
@@ -192,5 +225,42 @@ def search_recordings_by_two_artists(artist1: str, artist2: str, limit: int = 10
             "rating_votes": rating_votes,
             "youtube_video_ids": yt_ids,
             "release_count": release_count,
+            "release_group_mbid": rg_mbid,
         })
+    if rg_fallback:
+        for rec in out:
+            apply_release_group_fallback(rec)
     return out
+
+
+def apply_release_group_fallback(rec: Dict) -> Dict:
+    """Fill YouTube ids and missing ratings from the recording's release group.
+
+    Only hits the network when the recording itself has no YouTube relation.
+    """
+    rg_mbid = rec.get("release_group_mbid")
+    if rec.get("youtube_video_ids") or not rg_mbid:
+        return rec
+    try:
+        rg_full = get_release_group_by_mbid(rg_mbid, inc="url-rels+ratings")
+        yt_ids: List[str] = []
+        for rel in rg_full.get("relations", []) or []:
+            target = rel.get("url", {}).get("resource") or rel.get("target") or ""
+            if any(h in target for h in YOUTUBE_HOSTS):
+                vid = _extract_youtube_id(target)
+                if vid:
+                    yt_ids.append(vid)
+        rec["youtube_video_ids"] = yt_ids
+        # if recording rating missing, consider release-group rating as fallback
+        rg_rating = rg_full.get("rating") or {}
+        if rec.get("rating_value") is None:
+            rv = rg_rating.get("value")
+            if rv is not None:
+                rec["rating_value"] = rv
+        if rec.get("rating_votes") is None:
+            rc = rg_rating.get("votes-count") or rg_rating.get("count")
+            if rc is not None:
+                rec["rating_votes"] = rc
+    except Exception:
+        pass
+    return rec
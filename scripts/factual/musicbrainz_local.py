@@ -0,0 +1,265 @@
+"""
+Local MusicBrainz backend backed by an SQLite store built from the JSON data dumps
+(see mb_dump_ingest.py). Implements the same functions and return shapes as
+musicbrainz_client, without network access or rate limiting.
+
+Artist matching is exact on the lower-cased (credited) name with a prefix fallback
+for search_artist, which is stricter than the live Lucene search.
+"""
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from .config import MB_LOCAL_DB
+from .musicbrainz_client import YOUTUBE_HOSTS, _extract_youtube_id
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS artist (
+        mbid TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        name_lower TEXT NOT NULL,
+        sort_name TEXT,
+        type TEXT,
+        country TEXT,
+        tags TEXT,
+        genres TEXT,
+        rating_value REAL,
+        rating_votes INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS artist_tag (
+        tag TEXT NOT NULL,
+        artist_mbid TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS recording (
+        mbid TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        first_release_date TEXT,
+        rating_value REAL,
+        rating_votes INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS artist_credit (
+        recording_mbid TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        name_lower TEXT NOT NULL,
+        artist_mbid TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS release_group (
+        mbid TEXT PRIMARY KEY,
+        title TEXT,
+        first_release_date TEXT,
+        rating_value REAL,
+        rating_votes INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS recording_release (
+        recording_mbid TEXT NOT NULL,
+        release_mbid TEXT NOT NULL,
+        release_group_mbid TEXT,
+        date TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS url_relation (
+        entity_type TEXT NOT NULL,
+        entity_mbid TEXT NOT NULL,
+        url TEXT NOT NULL
+    )""",
+]
+
+# Natural key of each child table. mb_dump_ingest keeps a unique index on these during loading
+# and upserts, so reloading a dump (or a full run after a --limit test run) into the same store
+# replaces rows instead of duplicating credits and releases.
+UNIQUE_KEYS = {
+    "artist_tag": ("artist_mbid", "tag"),
+    "artist_credit": ("recording_mbid", "position"),
+    "recording_release": ("recording_mbid", "release_mbid"),
+    "url_relation": ("entity_type", "entity_mbid", "url"),
+}
+
+# Created after bulk loading (much faster than maintaining them during inserts)
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS artist_name_lower_idx ON artist (name_lower)",
+    "CREATE INDEX IF NOT EXISTS artist_tag_tag_idx ON artist_tag (tag, count DESC)",
+    "CREATE INDEX IF NOT EXISTS artist_credit_name_idx ON artist_credit (name_lower, recording_mbid)",
+    "CREATE INDEX IF NOT EXISTS artist_credit_recording_idx ON artist_credit (recording_mbid)",
+    "CREATE INDEX IF NOT EXISTS recording_release_recording_idx ON recording_release (recording_mbid)",
+    "CREATE INDEX IF NOT EXISTS url_relation_entity_idx ON url_relation (entity_mbid, entity_type)",
+]
+
+_db_path = MB_LOCAL_DB
+_local = threading.local()
+
+
+def set_db_path(path: str) -> None:
+    """Point the backend at another store (takes effect for threads that have not connected yet)."""
+    global _db_path
+    _db_path = path
+
+
+def _conn() -> sqlite3.Connection:
+    """One read-only connection per thread (pipeline stages run in worker threads)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(f"file:{_db_path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
+    return conn
+
+
+def _rating(value, votes) -> Dict:
+    return {"value": value, "votes-count": votes} if value is not None or votes is not None else {}
+
+
+def _artist_dict(row: sqlite3.Row) -> Dict:
+    return {
+        "id": row["mbid"],
+        "name": row["name"],
+        "sort-name": row["sort_name"],
+        "type": row["type"],
+        "country": row["country"],
+        "rating": _rating(row["rating_value"], row["rating_votes"]),
+    }
+
+
+def search_artist(name: str, limit: int = 1) -> List[Dict]:
+    key = name.lower().strip()
+    rows = _conn().execute(
+        "SELECT * FROM artist WHERE name_lower = ? ORDER BY coalesce(rating_votes, 0) DESC LIMIT ?",
+        (key, limit),
+    ).fetchall()
+    if not rows:
+        rows = _conn().execute(
+            "SELECT * FROM artist WHERE name_lower >= ? AND name_lower < ? "
+            "ORDER BY coalesce(rating_votes, 0) DESC LIMIT ?",
+            (key, key + "\uffff", limit),
+        ).fetchall()
+    return [_artist_dict(r) for r in rows]
+
+
+def search_artists_by_tag(tag: str, limit: int = 25) -> List[Dict]:
+    """Return a list of artist dicts for a given MusicBrainz tag (genre)."""
+    rows = _conn().execute(
+        "SELECT a.* FROM artist_tag t JOIN artist a ON a.mbid = t.artist_mbid "
+        "WHERE t.tag = ? ORDER BY t.count DESC LIMIT ?",
+        (tag.lower().strip(), limit),
+    ).fetchall()
+    return [_artist_dict(r) for r in rows]
+
+
+def get_artist_by_mbid(mbid: str, inc: str = "") -> Dict:
+    row = _conn().execute("SELECT * FROM artist WHERE mbid = ?", (mbid,)).fetchone()
+    if row is None:
+        return {}
+    out = _artist_dict(row)
+    out["tags"] = json.loads(row["tags"] or "[]")
+    out["genres"] = json.loads(row["genres"] or "[]")
+    return out
+
+
+def get_release_group_by_mbid(mbid: str, inc: str = "") -> Dict:
+    row = _conn().execute("SELECT * FROM release_group WHERE mbid = ?", (mbid,)).fetchone()
+    if row is None:
+        return {}
+    return {
+        "id": row["mbid"],
+        "title": row["title"],
+        "first-release-date": row["first_release_date"],
+        "rating": _rating(row["rating_value"], row["rating_votes"]),
+        "relations": [{"url": {"resource": url}} for url in _urls("release-group", mbid)],
+    }
+
+
+def _urls(entity_type: str, mbid: str) -> List[str]:
+    rows = _conn().execute(
+        "SELECT url FROM url_relation WHERE entity_mbid = ? AND entity_type = ?", (mbid, entity_type)
+    ).fetchall()
+    return [r["url"] for r in rows]
+
+
+def get_artist_info(name: str) -> Dict[str, Optional[str]]:
+    """Return canonical name, country, and up to 6 tags/genres for the artist."""
+    arts = search_artist(name, limit=1)
+    if not arts:
+        return {"name": name, "country": None, "tags": None}
+    full = get_artist_by_mbid(arts[0]["id"])
+    tags_out = [g["name"] for g in full.get("genres", []) if g.get("name")]
+    if not tags_out:
+        tags_out = [t["name"] for t in full.get("tags", []) if t.get("name")]
+    tags_str = ", ".join(tags_out[:6]) if tags_out else None
+    return {"name": arts[0]["name"] or name, "country": arts[0]["country"], "tags": tags_str}
+
+
+def search_recordings_by_two_artists(
+    artist1: str, artist2: str, limit: int = 10, rg_fallback: bool = True
+) -> List[Dict]:
+    """Recordings whose artist credit names both artists (same shape as the live client)."""
+    conn = _conn()
+    recs = conn.execute(
+        "SELECT r.* FROM artist_credit c1 "
+        "JOIN artist_credit c2 ON c2.recording_mbid = c1.recording_mbid "
+        "JOIN recording r ON r.mbid = c1.recording_mbid "
+        "WHERE c1.name_lower = ? AND c2.name_lower = ? LIMIT ?",
+        (artist1.lower(), artist2.lower(), limit),
+    ).fetchall()
+    out: List[Dict] = []
+    for rec in recs:
+        mbid = rec["mbid"]
+        names = [r["name"] for r in conn.execute(
+            "SELECT name FROM artist_credit WHERE recording_mbid = ? ORDER BY position", (mbid,)
+        )]
+        releases = conn.execute(
+            "SELECT release_group_mbid, date FROM recording_release WHERE recording_mbid = ? "
+            "ORDER BY coalesce(nullif(date, ''), '9999')", (mbid,)
+        ).fetchall()
+        year: Optional[str] = None
+        rg_mbid = releases[0]["release_group_mbid"] if releases else None
+        dates = [r["date"][:4] for r in releases if r["date"] and len(r["date"]) >= 4]
+        if dates:
+            year = dates[0]
+        elif rec["first_release_date"] and len(rec["first_release_date"]) >= 4:
+            year = rec["first_release_date"][:4]
+        yt_ids: List[str] = []
+        for url in _urls("recording", mbid):
+            if any(h in url for h in YOUTUBE_HOSTS):
+                vid = _extract_youtube_id(url)
+                if vid:
+                    yt_ids.append(vid)
+        out.append({
+            "title": rec["title"],
+            "artists": names,
+            "year": year or "",
+            "recording_mbid": mbid,
+            "rating_value": rec["rating_value"],
+            "rating_votes": rec["rating_votes"],
+            "youtube_video_ids": yt_ids,
+            "release_count": len(releases),
+            "release_group_mbid": rg_mbid,
+        })
+    if rg_fallback:
+        for rec in out:
+            apply_release_group_fallback(rec)
+    return out
+
+
+def apply_release_group_fallback(rec: Dict) -> Dict:
+    """Fill YouTube ids and missing ratings from the recording's release group."""
+    rg_mbid = rec.get("release_group_mbid")
+    if rec.get("youtube_video_ids") or not rg_mbid:
+        return rec
+    rg_full = get_release_group_by_mbid(rg_mbid)
+    if not rg_full:
+        return rec
+    yt_ids: List[str] = []
+    for rel in rg_full["relations"]:
+        target = rel["url"]["resource"]
+        if any(h in target for h in YOUTUBE_HOSTS):
+            vid = _extract_youtube_id(target)
+            if vid:
+                yt_ids.append(vid)
+    rec["youtube_video_ids"] = yt_ids
+    rg_rating = rg_full.get("rating") or {}
+    if rec.get("rating_value") is None and rg_rating.get("value") is not None:
+        rec["rating_value"] = rg_rating["value"]
+    if rec.get("rating_votes") is None and rg_rating.get("votes-count") is not None:
+        rec["rating_votes"] = rg_rating["votes-count"]
+    return rec
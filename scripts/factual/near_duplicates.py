@@ -0,0 +1,221 @@
+"""
+Near-duplicate song detection across whole collaboration datasets.
+
+Exact dedupe (normalize_title within one pair) misses variants such as
+"Creepin'" vs "Creepin’", "Un Día" vs "Un Dia" or "Song - Remix". This module
+clusters them with character-shingle MinHash signatures and LSH banding: rows
+only become candidates when they share an artist pair and at least one band
+bucket, so the work is roughly linear in the number of rows (no pairwise scan).
+Candidates are verified by estimated Jaccard similarity, clustered with
+union-find, and a keep/drop plan is written as CSV.
+
+Usage:
+    python -m scripts.factual.near_duplicates data/artist_collaborations_500_batch1.csv data/artist_collaborations_500_batch2.csv --out data/near_duplicate_plan.csv
+"""
+import argparse
+import csv
+import re
+import unicodedata
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .artist_keys import pair_key
+from .build_factual_dataset import normalize_title
+
+# Prime just above 2**32 for the universal hash family h(x) = (a*x + b) mod P
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Trailing variant markers that normalize_title does not strip (it only handles (), [], :, |, en/em dashes)
+_VARIANT_TAIL = re.compile(r"\s+-\s+.*$|\s+(feat|ft|featuring)\.?\s.*$")
+
+
+def canonical_title(title: str) -> str:
+    """normalize_title plus accent folding, variant tails and punctuation removal."""
+    t = normalize_title(title or "")
+    t = unicodedata.normalize("NFKD", t)
+    t = "".join(c for c in t if not unicodedata.combining(c))
+    t = _VARIANT_TAIL.sub("", t)
+    t = re.sub(r"[^\w\s]", "", t)
+    return re.sub(r"\s+", " ", t).strip()
+
+
+def shingle_hashes(text: str, k: int = 3) -> List[int]:
+    """crc32 of every k-character shingle of the padded text (deduplicated)."""
+    padded = f" {text} "
+    if len(padded) <= k:
+        return [zlib.crc32(padded.encode("utf-8"))]
+    return list({zlib.crc32(padded[i:i + k].encode("utf-8")) for i in range(len(padded) - k + 1)})
+
+
+def minhash_signatures(shingles: List[List[int]], num_perm: int, seed: int = 1, chunk_shingles: int = 1 << 20) -> np.ndarray:
+    """Return a (rows, num_perm) uint32 MinHash matrix.
+
+    Rows are hashed in chunks of about chunk_shingles shingles, one permutation at a
+    time, so the working set is a few chunk-sized vectors however many rows there are.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_MAX_HASH), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_MAX_HASH), size=num_perm, dtype=np.uint64)
+    sigs = np.empty((len(shingles), num_perm), dtype=np.uint32)
+    ends = np.cumsum(np.fromiter((len(s) for s in shingles), dtype=np.int64, count=len(shingles)))
+    start = 0
+    while start < len(shingles):
+        done = ends[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(ends, done + chunk_shingles, side="right")))
+        chunk = shingles[start:stop]
+        flat = np.fromiter((h for s in chunk for h in s), dtype=np.uint64, count=int(ends[stop - 1] - done))
+        offsets = np.concatenate(([0], ends[start:stop - 1] - done))
+        hashed = np.empty_like(flat)
+        for p in range(num_perm):
+            np.multiply(flat, a[p], out=hashed)
+            hashed += b[p]
+            hashed %= _PRIME
+            sigs[start:stop, p] = np.minimum.reduceat(hashed, offsets)
+        start = stop
+    return sigs
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, x: int, y: int) -> None:
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+
+def lsh_clusters(sigs: np.ndarray, group_ids: np.ndarray, bands: int, threshold: float) -> List[int]:
+    """Cluster rows whose signatures collide in any band within the same group (artist pair).
+
+    Returns a root index per row. Each bucket is verified against its first member
+    by estimated Jaccard (fraction of equal MinHash values) before merging.
+    """
+    n, num_perm = sigs.shape
+    rows_per_band = num_perm // bands
+    uf = _UnionFind(n)
+    for band in range(bands):
+        cols = sigs[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        # Fold the band's values into one 64-bit bucket id (FNV-style mixing)
+        bucket = np.full(n, np.uint64(14695981039346656037))
+        for c in range(rows_per_band):
+            bucket = (bucket ^ cols[:, c]) * np.uint64(1099511628211)
+        order = np.lexsort((bucket, group_ids))
+        b_sorted, g_sorted = bucket[order], group_ids[order]
+        new_run = np.ones(n, dtype=bool)
+        new_run[1:] = (b_sorted[1:] != b_sorted[:-1]) | (g_sorted[1:] != g_sorted[:-1])
+        # Anchor every row on the first member of its bucket run
+        anchors = order[np.flatnonzero(new_run)][np.cumsum(new_run) - 1]
+        members = order[~new_run]
+        anchors = anchors[~new_run]
+        if not len(members):
+            continue
+        similar = (sigs[members] == sigs[anchors]).mean(axis=1) >= threshold
+        for m, anchor in zip(members[similar].tolist(), anchors[similar].tolist()):
+            uf.union(m, anchor)
+    return [uf.find(i) for i in range(n)]
+
+
+def _col(row: Dict[str, str], name: str) -> str:
+    return row.get(name) or ""
+
+
+def load_rows(paths: List[str]) -> List[Dict[str, str]]:
+    """Read datasets with either header style (Artist_01 / artist_01); keys are lower-cased."""
+    rows: List[Dict[str, str]] = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                norm = {k.strip().lower(): (v or "") for k, v in row.items() if k}
+                norm["_source"] = path
+                norm["_line"] = str(line_no)
+                rows.append(norm)
+    return rows
+
+
+def _keep_rank(row: Dict[str, str]) -> Tuple:
+    """Same preference as the builder's song dedupe: Success, more metadata, then shortest title."""
+    meta = sum(1 for c in ("release_year", "region", "mb_rating_value", "mb_rating_votes") if _col(row, c))
+    return (_col(row, "collaboration_status") != "Success", -meta, len(_col(row, "song_title")))
+
+
+def build_plan(rows: List[Dict[str, str]], threshold: float = 0.6, bands: int = 16, rows_per_band: int = 4,
+               shingle_size: int = 3) -> List[Dict[str, str]]:
+    """Return plan entries (one per row in a multi-row cluster) with action keep/drop."""
+    pair_ids: Dict[Tuple[str, str], int] = {}
+    group_ids = np.empty(len(rows), dtype=np.int64)
+    shingles: List[List[int]] = []
+    for i, row in enumerate(rows):
+        pair = pair_key(_col(row, "artist_01"), _col(row, "artist_02"))
+        group_ids[i] = pair_ids.setdefault(pair, len(pair_ids))
+        shingles.append(shingle_hashes(canonical_title(_col(row, "song_title")), shingle_size))
+
+    sigs = minhash_signatures(shingles, bands * rows_per_band)
+    roots = lsh_clusters(sigs, group_ids, bands, threshold)
+
+    clusters: Dict[int, List[int]] = {}
+    for i, root in enumerate(roots):
+        clusters.setdefault(root, []).append(i)
+
+    plan: List[Dict[str, str]] = []
+    cluster_no = 0
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        cluster_no += 1
+        keeper = min(members, key=lambda m: _keep_rank(rows[m]))
+        for m in members:
+            similarity = float(np.mean(sigs[m] == sigs[keeper]))
+            plan.append({
+                "cluster_id": str(cluster_no),
+                "action": "keep" if m == keeper else "drop",
+                "source_file": rows[m]["_source"],
+                "line": rows[m]["_line"],
+                "artist_01": _col(rows[m], "artist_01"),
+                "artist_02": _col(rows[m], "artist_02"),
+                "song_title": _col(rows[m], "song_title"),
+                "keeper_title": _col(rows[keeper], "song_title"),
+                "similarity": f"{similarity:.2f}",
+            })
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate songs with MinHash/LSH and write a keep/drop plan")
+    parser.add_argument("datasets", nargs="+", help="Collaboration dataset CSVs (merged view across all files)")
+    parser.add_argument("--out", default="data/near_duplicate_plan.csv", help="Output plan CSV")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Minimum estimated Jaccard similarity to merge")
+    parser.add_argument("--bands", type=int, default=16, help="LSH bands")
+    parser.add_argument("--rows-per-band", type=int, default=4, help="MinHash values per band")
+    parser.add_argument("--shingle-size", type=int, default=3, help="Character shingle length")
+    args = parser.parse_args()
+
+    rows = load_rows(args.datasets)
+    plan = build_plan(rows, args.threshold, args.bands, args.rows_per_band, args.shingle_size)
+    with open(args.out, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=[
+            "cluster_id", "action", "source_file", "line", "artist_01", "artist_02",
+            "song_title", "keeper_title", "similarity",
+        ], quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(plan)
+
+    drops = sum(1 for p in plan if p["action"] == "drop")
+    clusters = len({p["cluster_id"] for p in plan})
+    print(f"Rows scanned: {len(rows)}")
+    print(f"Near-duplicate clusters: {clusters}")
+    print(f"Rows to drop: {drops}")
+    print(f"Plan written to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
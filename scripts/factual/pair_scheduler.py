@@ -0,0 +1,222 @@
+"""
+Hit-rate-driven ordering of candidate pairs.
+
+Most rate-limited recording searches return nothing. This module learns from
+past outcomes which pairs are likely to have collaboration recordings and lets
+the builder search them in descending predicted hit probability.
+
+History sources:
+- build journals (*.jsonl): every processed pair, with or without rows
+- the pair outcome log (PAIR_OUTCOMES_PATH), appended from journals when a build finishes
+- collaboration dataset CSVs: every pair present is a hit; also provides artist tags and region
+
+The model is a small logistic regression over cheap pair features (shared tags,
+same region, popularity, each artist's past hit rate), trained with numpy.
+Pairs already searched get their known outcome instead of a prediction and are
+scheduled after every unsearched pair: their rows are in an earlier journal or
+dataset, so requests go to new data first.
+"""
+import csv
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .config import PAIR_OUTCOMES_PATH
+from .curate_pairs import is_popular_artist
+from .artist_keys import artist_key, pair_key
+
+PairKey = Tuple[str, str]
+
+FEATURES = ["bias", "tag_jaccard", "shared_tags", "same_region", "popular", "artist_hit_rate", "artist_hits"]
+
+# Used until there is history with both hits and misses to train on
+PRIOR_WEIGHTS = np.array([-2.0, 2.0, 0.5, 0.3, 1.0, 2.5, 0.4])
+
+
+def _split_tags(tags: str) -> Set[str]:
+    return {t.strip().lower() for t in (tags or "").split(",") if t.strip()}
+
+
+class PairHistory:
+    """Past outcomes per pair plus per-artist tags, region and hit/try counts."""
+
+    def __init__(self):
+        self.outcomes: Dict[PairKey, bool] = {}
+        self.artist_tags: Dict[str, Set[str]] = {}
+        self.artist_region: Dict[str, str] = {}
+
+    def add_outcome(self, a1: str, a2: str, hit: bool) -> None:
+        key = pair_key(a1, a2)
+        self.outcomes[key] = self.outcomes.get(key, False) or hit
+
+    def add_artist(self, name: str, tags: str, region: str = "") -> None:
+        name = artist_key(name)
+        if tags and name not in self.artist_tags:
+            self.artist_tags[name] = _split_tags(tags)
+        if region and region != "Global" and name not in self.artist_region:
+            self.artist_region[name] = region
+
+    def load_journal(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn final line
+                a1, a2 = entry["pair"]
+                self.add_outcome(a1, a2, bool(entry["rows"]))
+                for row in entry["rows"][:1]:
+                    self.add_artist(row[0], row[1], row[7])
+                    self.add_artist(row[2], row[3], row[7])
+
+    def load_outcomes(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                self.add_outcome(row["Artist_01"], row["Artist_02"], int(row["Rows"] or 0) > 0)
+
+    def load_dataset(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for raw in csv.DictReader(f):
+                row = {k.lower(): v for k, v in raw.items() if k}
+                a1, a2 = row.get("artist_01"), row.get("artist_02")
+                if not a1 or not a2:
+                    continue
+                self.add_outcome(a1, a2, True)
+                self.add_artist(a1, row.get("artist_01_tags", ""), row.get("region", ""))
+                self.add_artist(a2, row.get("artist_02_tags", ""), row.get("region", ""))
+
+    def load(self, paths: Iterable[str]) -> "PairHistory":
+        """Load each existing path by type: .jsonl journal, outcome log or dataset CSV."""
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            if path.endswith(".jsonl"):
+                self.load_journal(path)
+                continue
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                header = next(csv.reader(f), [])
+            if "Rows" in header:
+                self.load_outcomes(path)
+            else:
+                self.load_dataset(path)
+        return self
+
+    def artist_counts(self) -> Dict[str, Tuple[int, int]]:
+        """artist -> (hits, tries) over all recorded pair outcomes."""
+        counts: Dict[str, List[int]] = {}
+        for (a, b), hit in self.outcomes.items():
+            for name in (a, b):
+                c = counts.setdefault(name, [0, 0])
+                c[0] += int(hit)
+                c[1] += 1
+        return {k: (v[0], v[1]) for k, v in counts.items()}
+
+
+class PairScheduler:
+    def __init__(self, history: PairHistory):
+        self.history = history
+        self.counts = history.artist_counts()
+        self.weights = PRIOR_WEIGHTS.copy()
+        self.trained = False
+
+    def features(self, a1: str, a2: str, exclude_self: bool = False) -> np.ndarray:
+        """Feature vector for a pair. exclude_self removes the pair's own outcome (for training)."""
+        k1, k2 = artist_key(a1), artist_key(a2)
+        t1 = self.history.artist_tags.get(k1, set())
+        t2 = self.history.artist_tags.get(k2, set())
+        shared = len(t1 & t2)
+        union = len(t1 | t2)
+        r1, r2 = self.history.artist_region.get(k1), self.history.artist_region.get(k2)
+        own_hit = self.history.outcomes.get(pair_key(a1, a2)) if exclude_self else None
+        rates, hits = [], 0
+        for name in (k1, k2):
+            h, n = self.counts.get(name, (0, 0))
+            if own_hit is not None:
+                h, n = h - int(own_hit), n - 1
+            rates.append((h + 1) / (n + 2))  # Laplace-smoothed hit rate
+            hits += h
+        return np.array([
+            1.0,
+            shared / union if union else 0.0,
+            min(shared, 6) / 6,
+            1.0 if r1 and r1 == r2 else 0.0,
+            int(is_popular_artist(a1)) + int(is_popular_artist(a2)),
+            sum(rates) / 2,
+            math.log1p(hits),
+        ])
+
+    def fit(self, epochs: int = 300, lr: float = 0.5, l2: float = 1e-3) -> "PairScheduler":
+        """Train logistic regression on recorded outcomes (needs both hits and misses)."""
+        pairs = list(self.history.outcomes.items())
+        labels = np.array([float(hit) for _, hit in pairs])
+        if not len(pairs) or labels.min() == labels.max():
+            return self
+        X = np.stack([self.features(a, b, exclude_self=True) for (a, b), _ in pairs])
+        w = np.zeros(X.shape[1])
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(X @ w)))
+            grad = X.T @ (p - labels) / len(labels) + l2 * w
+            w -= lr * grad
+        self.weights = w
+        self.trained = True
+        return self
+
+    def predict(self, a1: str, a2: str) -> float:
+        known = self.history.outcomes.get(pair_key(a1, a2))
+        if known is not None:
+            return 1.0 if known else 0.0
+        return float(1.0 / (1.0 + np.exp(-(self.features(a1, a2) @ self.weights))))
+
+    def is_known(self, a1: str, a2: str) -> bool:
+        return pair_key(a1, a2) in self.history.outcomes
+
+    def rank(self, pairs: List[Tuple[str, str]]) -> List[Tuple[Tuple[str, str], float]]:
+        """Pairs with their predicted hit probability, most promising first (stable for ties).
+
+        Already searched pairs come after all unsearched ones.
+        """
+        scored = [(p, self.predict(*p)) for p in pairs]
+        scored.sort(key=lambda x: (self.is_known(*x[0]), -x[1]))
+        return scored
+
+
+def schedule_pairs(pairs: List[Tuple[str, str]], history_paths: List[str]) -> List[Tuple[str, str]]:
+    """Reorder pairs by predicted hit probability and print a short summary."""
+    history = PairHistory().load(list(history_paths) + [PAIR_OUTCOMES_PATH])
+    scheduler = PairScheduler(history).fit()
+    ranked = scheduler.rank(pairs)
+    if ranked:
+        unknown = [(p, prob) for p, prob in ranked if not scheduler.is_known(*p)]
+        print(f"Scheduler: {len(history.outcomes)} past pair outcomes, "
+              f"{'trained model' if scheduler.trained else 'prior weights'}; "
+              f"{len(ranked) - len(unknown)} already searched pairs scheduled last")
+        if unknown:
+            top = unknown[:max(1, len(unknown) // 10)]
+            print(f"  Predicted hit rate of unsearched pairs: top 10% {sum(p for _, p in top) / len(top):.1%}, "
+                  f"all {sum(p for _, p in unknown) / len(unknown):.1%}")
+    return [p for p, _ in ranked]
+
+
+def record_outcomes(journal_path: str, outcomes_path: Optional[str] = None) -> int:
+    """Append each journaled pair and its row count to the outcome log. Returns pairs recorded."""
+    outcomes_path = outcomes_path or PAIR_OUTCOMES_PATH
+    if not os.path.exists(journal_path):
+        return 0
+    new_file = not os.path.exists(outcomes_path)
+    n = 0
+    with open(journal_path, "r", encoding="utf-8") as src, \
+            open(outcomes_path, "a", encoding="utf-8", newline="") as dst:
+        writer = csv.writer(dst, quoting=csv.QUOTE_ALL)
+        if new_file:
+            writer.writerow(["Artist_01", "Artist_02", "Rows"])
+        for line in src:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            writer.writerow([entry["pair"][0], entry["pair"][1], len(entry["rows"])])
+            n += 1
+    return n
@@ -0,0 +1,182 @@
+"""
+Streaming pair-file reading for the curation and build scripts.
+
+Pairs files can hold millions of rows, so nothing here loads a whole file:
+- PairSource reads a pairs CSV lazily, detects an optional header and records the
+  byte offset after every row, so a later run can seek straight back to it.
+- PairKeySet de-duplicates canonical pair keys with 64-bit blake2b fingerprints in
+  an open-addressing array('Q') table (8 bytes per slot instead of a tuple of two
+  strings per pair).
+- select_by_priority picks pairs by priority level in a single pass, holding at
+  most max_pairs pairs per level.
+
+Rows are parsed one physical line at a time, so quoted fields must not contain
+newlines (artist names never do).
+"""
+import csv
+import os
+from array import array
+from hashlib import blake2b
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .artist_keys import artist_key, pair_key  # noqa: F401  (pair_key re-exported)
+
+Pair = Tuple[str, str]
+
+_HEADER_NAMES = (("artist_01", "artist_02"), ("artist1", "artist2"))
+
+
+def _is_header(row: List[str]) -> bool:
+    if len(row) < 2:
+        return False
+    first, second = row[0].strip().lower(), row[1].strip().lower()
+    return any(h1 in first and h2 in second for h1, h2 in _HEADER_NAMES)
+
+
+class PairSource:
+    """Iterate (artist1, artist2) from a pairs CSV, optionally starting at a byte offset.
+
+    After each yielded pair, `offset` is the byte position of the next row; passing
+    it back as start_offset resumes right after that pair. Rows with fewer than two
+    non-empty columns are skipped.
+    """
+
+    def __init__(self, path: str, start_offset: int = 0):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Pairs file not found: {path}")
+        self.path = path
+        self.start_offset = start_offset
+        self.offset = start_offset
+        self.rows_read = 0
+
+    def __iter__(self) -> Iterator[Pair]:
+        with open(self.path, "rb") as f:
+            f.seek(self.start_offset)
+            self.offset = self.start_offset
+            first = self.start_offset == 0
+            for raw in iter(f.readline, b""):
+                self.offset += len(raw)
+                line = raw.decode("utf-8-sig" if first else "utf-8")
+                row = next(csv.reader([line]), [])
+                if first:
+                    first = False
+                    if _is_header(row):
+                        continue
+                self.rows_read += 1
+                if len(row) < 2:
+                    continue
+                a1, a2 = row[0].strip(), row[1].strip()
+                if a1 and a2:
+                    yield a1, a2
+
+
+class PairKeySet:
+    """Compact set of canonical pair keys (open addressing over 64-bit fingerprints).
+
+    Two different pairs collide only if their 64-bit blake2b digests are equal,
+    which is negligible even for hundreds of millions of pairs.
+    """
+
+    MAX_LOAD = 0.7
+
+    def __init__(self, capacity: int = 1024):
+        size = 16
+        while size * self.MAX_LOAD < capacity:
+            size *= 2
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._len = 0
+
+    @staticmethod
+    def fingerprint(a1: str, a2: str) -> int:
+        k1, k2 = artist_key(a1), artist_key(a2)
+        if k2 < k1:
+            k1, k2 = k2, k1
+        digest = blake2b(f"{k1}\x1f{k2}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1  # 0 marks an empty slot
+
+    def _slot(self, fp: int) -> int:
+        slots, mask = self._slots, self._mask
+        i = fp & mask
+        while slots[i] and slots[i] != fp:
+            i = (i + 1) & mask
+        return i
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        for fp in old:
+            if fp:
+                self._slots[self._slot(fp)] = fp
+
+    def add(self, a1: str, a2: str) -> bool:
+        """Add a pair; returns False if it (or its reverse) was already present."""
+        fp = self.fingerprint(a1, a2)
+        i = self._slot(fp)
+        if self._slots[i]:
+            return False
+        self._slots[i] = fp
+        self._len += 1
+        if self._len > self.MAX_LOAD * len(self._slots):
+            self._grow()
+        return True
+
+    def __contains__(self, pair: Pair) -> bool:
+        fp = self.fingerprint(*pair)
+        return bool(self._slots[self._slot(fp)])
+
+    def __len__(self) -> int:
+        return self._len
+
+
+def unique_pairs(
+    pairs: Iterable[Pair],
+    seen: Optional[PairKeySet] = None,
+    exclude: Optional[PairKeySet] = None,
+) -> Iterator[Pair]:
+    """Drop self-pairs, repeats (in either order) and pairs in `exclude`, lazily."""
+    seen = seen if seen is not None else PairKeySet()
+    for a1, a2 in pairs:
+        if artist_key(a1) == artist_key(a2):
+            continue
+        if exclude is not None and (a1, a2) in exclude:
+            continue
+        if seen.add(a1, a2):
+            yield a1, a2
+
+
+def select_by_priority(
+    pairs: Iterable[Pair],
+    priority: Callable[[str, str], Optional[int]],
+    max_pairs: int,
+    min_pairs: int = 0,
+) -> Tuple[List[Pair], Dict[int, int]]:
+    """Single-pass selection by priority level (0 = best; None = never select).
+
+    Level 0 pairs are always taken; each further level is only used while fewer
+    than min_pairs are selected, and the result is capped at max_pairs. Reading
+    stops as soon as level 0 alone fills max_pairs. Returns the selected pairs and
+    how many were taken from each level.
+    """
+    buckets: Dict[int, List[Pair]] = {}
+    for a1, a2 in pairs:
+        level = priority(a1, a2)
+        if level is None:
+            continue
+        bucket = buckets.setdefault(level, [])
+        if len(bucket) < max_pairs:
+            bucket.append((a1, a2))
+        if level == 0 and len(bucket) >= max_pairs:
+            break
+
+    selected: List[Pair] = []
+    taken: Dict[int, int] = {}
+    for level in sorted(buckets):
+        if level > 0 and len(selected) >= min_pairs:
+            break
+        room = max_pairs - len(selected)
+        chosen = buckets[level][:room]
+        selected.extend(chosen)
+        taken[level] = len(chosen)
+    return selected, taken
@@ -0,0 +1,152 @@
+"""
+Staged producer/consumer pipeline for the factual dataset builder.
+
+Each stage runs its function in one or more worker threads and hands jobs to the
+next stage through a bounded queue, so CPU work and file writes overlap with the
+network requests in flight. Jobs are plain dicts that flow through every stage;
+a stage function mutates the job in place and returns it.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: `workers` threads applying `func` to jobs from `in_q`.
+
+    With batch_size > 1, `func` receives a list of jobs instead: each worker takes
+    one job (blocking) plus whatever else is already queued, up to batch_size.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, queue_size: int = 32, batch_size: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.in_q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.out_q: Optional["queue.Queue"] = None
+        self.downstream_workers = 1
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self._alive = self.workers
+        self._lock = threading.Lock()
+        self._stop: Optional[threading.Event] = None
+
+    def start(self, stop: threading.Event) -> None:
+        self._stop = stop
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+
+    def _take(self) -> Tuple[List[Dict], bool]:
+        """Next jobs to process and whether the end-of-input sentinel was reached."""
+        job = self.in_q.get()
+        if job is _DONE:
+            return [], True
+        jobs = [job]
+        while len(jobs) < self.batch_size:
+            try:
+                job = self.in_q.get_nowait()
+            except queue.Empty:
+                break
+            if job is _DONE:
+                return jobs, True
+            jobs.append(job)
+        return jobs, False
+
+    def _apply(self, jobs: List[Dict]) -> List[Dict]:
+        # Once stopped, keep draining so upstream puts never block, but skip the work
+        todo = [j for j in jobs if not j.get("error")]
+        if self._stop.is_set() or not todo:
+            return jobs
+        t0 = time.monotonic()
+        try:
+            if self.batch_size > 1:
+                self.func(todo)  # batch functions mutate the jobs in place
+            else:
+                jobs = [self.func(jobs[0])]
+        except Exception as e:
+            for j in todo:
+                j["error"] = f"{self.name}: {e}"
+        with self._lock:
+            self.processed += len(todo)
+            self.busy_seconds += time.monotonic() - t0
+        return jobs
+
+    def _run(self) -> None:
+        done = False
+        while not done:
+            jobs, done = self._take()
+            for job in self._apply(jobs):
+                self.out_q.put(job)
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last:
+            for _ in range(self.downstream_workers):
+                self.out_q.put(_DONE)
+
+
+class Pipeline:
+    """Chain of stages fed by a source iterable; results are consumed via run()."""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 32):
+        self.stages = stages
+        self.output: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.out_q = downstream.in_q
+            upstream.downstream_workers = downstream.workers
+        stages[-1].out_q = self.output
+        stages[-1].downstream_workers = 1
+        self.stop_event = threading.Event()
+        self.emitted = 0
+        self.started_at = 0.0
+        self.source_error: Optional[BaseException] = None
+
+    def stop(self) -> None:
+        """Stop feeding new jobs; in-flight jobs drain through without doing work."""
+        self.stop_event.set()
+
+    def _feed(self, source: Iterable[Dict]) -> None:
+        first = self.stages[0]
+        try:
+            for job in source:
+                if self.stop_event.is_set():
+                    break
+                first.in_q.put(job)
+                self.emitted += 1
+        except BaseException as e:  # re-raised by run() once the jobs already fed have drained
+            self.source_error = e
+        finally:
+            for _ in range(first.workers):
+                first.in_q.put(_DONE)
+
+    def run(self, source: Iterable[Dict]) -> Iterator[Dict]:
+        """Start all stages and yield finished jobs (in completion order).
+
+        If the source raises, the jobs it produced first are still yielded, then
+        run() raises the source's exception.
+        """
+        self.started_at = time.monotonic()
+        for stage in self.stages:
+            stage.start(self.stop_event)
+        threading.Thread(target=self._feed, args=(source,), name="source", daemon=True).start()
+        while True:
+            job = self.output.get()
+            if job is _DONE:
+                if self.source_error is not None:
+                    raise self.source_error
+                return
+            yield job
+
+    def stats_line(self) -> str:
+        """Compact per-stage throughput (jobs/s) and input queue depth."""
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        parts = [f"src {self.emitted}"]
+        for stage in self.stages:
+            parts.append(f"{stage.name} {stage.processed/elapsed:.2f}/s q={stage.in_q.qsize()}")
+        parts.append(f"out q={self.output.qsize()}")
+        return " | ".join(parts)
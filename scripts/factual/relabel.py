@@ -0,0 +1,161 @@
+"""
+Recompute Collaboration_Status offline from the raw signals stored by the builder.
+
+Datasets built with the raw-signal columns (Release_Count, Has_YouTube,
+YouTube_Views, plus MB_Rating_Value / MB_Rating_Votes) can be relabeled under any
+threshold configuration without touching the network. The rules are the same as
+labeler.label_success, evaluated as column operations over the whole dataset.
+Rows from older builds without raw signals keep their existing status.
+
+A sweep evaluates every combination of the given threshold values at once
+(configurations x rows boolean matrix) and reports the Success rate of each.
+
+Usage:
+    python -m scripts.factual.relabel data/artist_collaborations_final.csv --min-releases 3 --out data/relabeled.csv
+    python -m scripts.factual.relabel data/artist_collaborations_final.csv --sweep rating_min=3.5,3.8,4.2 min_releases=3,5,8
+"""
+import argparse
+import csv
+import itertools
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .config import (
+    MB_RATING_MIN,
+    MB_RATING_VOTES_MIN,
+    MIN_RELEASES_FOR_SUCCESS,
+    USE_MB_RATINGS,
+    YOUTUBE_SUCCESS_VIEWS,
+)
+
+THRESHOLDS = {
+    "use_ratings": USE_MB_RATINGS,
+    "rating_min": MB_RATING_MIN,
+    "votes_min": MB_RATING_VOTES_MIN,
+    "min_releases": MIN_RELEASES_FOR_SUCCESS,
+    "success_views": YOUTUBE_SUCCESS_VIEWS,
+}
+
+
+def _num(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
+
+def signal_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Raw signals as float arrays (NaN = unknown) plus a mask of rows that have them."""
+    has_youtube = _num(df, "Has_YouTube")
+    release_count = _num(df, "Release_Count")
+    return {
+        "rating_value": _num(df, "MB_Rating_Value"),
+        "rating_votes": _num(df, "MB_Rating_Votes"),
+        "views": _num(df, "YouTube_Views"),
+        "has_youtube": np.nan_to_num(has_youtube) > 0,
+        "release_count": release_count,
+        "has_signals": ~np.isnan(release_count),
+    }
+
+
+def label_matrix(signals: Dict[str, np.ndarray], configs: List[Dict]) -> np.ndarray:
+    """Success flags as a (len(configs), rows) boolean matrix, mirroring label_success."""
+    col = lambda key: np.array([float(c[key]) for c in configs])[:, None]
+    # NaN comparisons are False, so missing signals never produce Success
+    with np.errstate(invalid="ignore"):
+        rating_ok = (
+            (col("use_ratings") > 0)
+            & (signals["rating_value"][None, :] >= col("rating_min"))
+            & (signals["rating_votes"][None, :] >= col("votes_min"))
+        )
+        views = signals["views"][None, :]
+        youtube_ok = np.where(np.isnan(views), signals["has_youtube"][None, :], views >= col("success_views"))
+        releases_ok = signals["release_count"][None, :] >= col("min_releases")
+    return rating_ok | youtube_ok | releases_ok
+
+
+def relabel(df: pd.DataFrame, thresholds: Dict) -> pd.Series:
+    """New Collaboration_Status column (rows without raw signals are left unchanged)."""
+    signals = signal_arrays(df)
+    success = label_matrix(signals, [thresholds])[0]
+    status = np.where(success, "Success", "Failure")
+    if "Collaboration_Status" in df:
+        status = np.where(signals["has_signals"], status, df["Collaboration_Status"].to_numpy())
+    return pd.Series(status, index=df.index, name="Collaboration_Status")
+
+
+def sweep(df: pd.DataFrame, grid: Dict[str, List]) -> pd.DataFrame:
+    """Evaluate every combination in grid (unspecified thresholds keep their configured value)."""
+    keys = list(grid)
+    configs = [dict(THRESHOLDS, **dict(zip(keys, values))) for values in itertools.product(*grid.values())]
+    signals = signal_arrays(df)
+    mask = signals["has_signals"]
+    success = label_matrix(signals, configs)[:, mask]
+    current = (df["Collaboration_Status"].to_numpy()[mask] == "Success") if "Collaboration_Status" in df else None
+    out = pd.DataFrame(configs)
+    out["rows"] = int(mask.sum())
+    out["success"] = success.sum(axis=1)
+    out["success_rate"] = success.mean(axis=1) if mask.any() else np.nan
+    if current is not None:
+        out["changed"] = (success != current[None, :]).sum(axis=1)
+    return out
+
+
+def _parse_grid(items: List[str]) -> Dict[str, List]:
+    grid: Dict[str, List] = {}
+    for item in items:
+        key, _, values = item.partition("=")
+        if key not in THRESHOLDS:
+            raise SystemExit(f"Unknown threshold '{key}' (choose from: {', '.join(THRESHOLDS)})")
+        cast = (lambda v: v.lower() in {"1", "true", "yes"}) if key == "use_ratings" else float
+        grid[key] = [cast(v) for v in values.split(",") if v]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relabel a factual dataset from its stored raw signals")
+    parser.add_argument("dataset", help="Dataset CSV written by build_factual_dataset")
+    parser.add_argument("--out", default=None, help="Write the relabeled dataset here (default: print a summary only)")
+    parser.add_argument("--rating-min", type=float, default=MB_RATING_MIN)
+    parser.add_argument("--votes-min", type=int, default=MB_RATING_VOTES_MIN)
+    parser.add_argument("--min-releases", type=int, default=MIN_RELEASES_FOR_SUCCESS)
+    parser.add_argument("--success-views", type=int, default=YOUTUBE_SUCCESS_VIEWS)
+    parser.add_argument("--no-ratings", action="store_true", help="Ignore MusicBrainz ratings")
+    parser.add_argument("--sweep", nargs="+", default=None, metavar="NAME=V1,V2",
+                        help=f"Evaluate all combinations of threshold values ({', '.join(THRESHOLDS)})")
+    parser.add_argument("--sweep-out", default=None, help="Write the sweep table to this CSV")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.dataset, dtype=str, keep_default_na=False)
+
+    if args.sweep:
+        table = sweep(df, _parse_grid(args.sweep))
+        print(table.to_string(index=False))
+        if args.sweep_out:
+            table.to_csv(args.sweep_out, index=False)
+            print(f"Sweep written to: {args.sweep_out}")
+        return
+
+    thresholds = {
+        "use_ratings": not args.no_ratings,
+        "rating_min": args.rating_min,
+        "votes_min": args.votes_min,
+        "min_releases": args.min_releases,
+        "success_views": args.success_views,
+    }
+    status = relabel(df, thresholds)
+    with_signals = int(signal_arrays(df)["has_signals"].sum())
+    before = (df["Collaboration_Status"] == "Success").sum() if "Collaboration_Status" in df else 0
+    print(f"Rows: {len(df)} ({with_signals} with raw signals)")
+    print(f"Success: {before} -> {(status == 'Success').sum()}")
+    if "Collaboration_Status" in df:
+        print(f"Changed: {(status != df['Collaboration_Status']).sum()}")
+    if args.out:
+        df["Collaboration_Status"] = status
+        df.to_csv(args.out, index=False, quoting=csv.QUOTE_ALL)
+        print(f"Relabeled dataset written to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
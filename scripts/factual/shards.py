@@ -0,0 +1,125 @@
+"""
+Sharded (multi-process) factual dataset builds.
+
+Pairs are partitioned across N worker processes by a stable hash of the canonical
+pair key. Each worker runs the normal pipeline with its own journal and output
+shard; all workers share one MusicBrainz rate limiter and one row counter held
+in multiprocessing.Values (the YouTube quota cap is split evenly instead). merge_shards() then applies the song-level dedupe
+(normalize_title + artist pair key) globally across shards.
+"""
+import csv
+import multiprocessing as mp
+import os
+import zlib
+from typing import Dict, List, Tuple
+
+from .config import MB_RATE_LIMIT_SECONDS, TARGET_ROWS, YOUTUBE_QUOTA_UNITS
+from .artist_keys import pair_key
+from .pair_scheduler import record_outcomes
+
+
+def shard_of(a1: str, a2: str, num_shards: int) -> int:
+    """Stable shard index for a pair (independent of order and of PYTHONHASHSEED)."""
+    key = "\x1f".join(pair_key(a1, a2))
+    return zlib.crc32(key.encode("utf-8")) % num_shards
+
+
+def partition_pairs(pairs: List[Tuple[str, str]], num_shards: int) -> List[List[Tuple[str, str]]]:
+    shards: List[List[Tuple[str, str]]] = [[] for _ in range(num_shards)]
+    for a1, a2 in pairs:
+        shards[shard_of(a1, a2, num_shards)].append((a1, a2))
+    return shards
+
+
+def shard_paths(out_path: str, index: int) -> Tuple[str, str]:
+    """Return (csv_path, journal_path) for shard `index` of out_path."""
+    base = out_path[:-4] if out_path.endswith(".csv") else out_path
+    return f"{base}.shard{index}.csv", f"{base}.shard{index}_journal.jsonl"
+
+
+def _run_shard(index, num_shards, pairs, out_path, journal_path, resume, target_rows, next_slot, row_counter):
+    # Imported here so each spawned worker installs the shared limiter before any request
+    from .musicbrainz_client import SharedRateLimiter, set_rate_limiter
+    from .build_factual_dataset import build_dataset
+    from .youtube_client import set_quota_units
+
+    set_rate_limiter(SharedRateLimiter(next_slot, MB_RATE_LIMIT_SECONDS))
+    set_quota_units(YOUTUBE_QUOTA_UNITS // num_shards)
+    build_dataset(
+        pairs, out_path, journal_path, resume,
+        target_rows=target_rows, row_counter=row_counter, bar_position=2 * index,
+    )
+
+
+def run_sharded(
+    pairs: List[Tuple[str, str]],
+    num_shards: int,
+    out_path: str,
+    resume: bool = False,
+    target_rows: int = TARGET_ROWS,
+) -> int:
+    """Build num_shards shards in parallel processes, then merge them into out_path.
+
+    Returns the number of rows in the merged output. Shard files and journals are
+    removed after a successful merge.
+    """
+    ctx = mp.get_context("spawn")
+    next_slot = ctx.Value("d", 0.0)
+    row_counter = ctx.Value("q", 0)
+    parts = partition_pairs(pairs, num_shards)
+    procs = []
+    for i, shard in enumerate(parts):
+        shard_csv, shard_journal = shard_paths(out_path, i)
+        p = ctx.Process(
+            target=_run_shard,
+            args=(i, num_shards, shard, shard_csv, shard_journal, resume, target_rows, next_slot, row_counter),
+            name=f"shard-{i}",
+        )
+        p.start()
+        procs.append(p)
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.join()
+        print(f"\nShard journals kept; resume with: --shards {num_shards} --resume")
+        raise SystemExit(0)
+
+    failed = [p.name for p in procs if p.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"Shard workers failed: {', '.join(failed)} (journals kept for --resume)")
+
+    shard_csvs = [shard_paths(out_path, i)[0] for i in range(num_shards)]
+    rows = merge_shards(shard_csvs, out_path, target_rows)
+    for i in range(num_shards):
+        record_outcomes(shard_paths(out_path, i)[1])
+        for path in shard_paths(out_path, i):
+            if os.path.exists(path):
+                os.remove(path)
+    return rows
+
+
+def merge_shards(shard_csvs: List[str], out_path: str, target_rows: int = TARGET_ROWS) -> int:
+    """Concatenate shard CSVs into out_path, keeping the best row per song across all shards."""
+    from .build_factual_dataset import HEADER, is_better_row, song_key
+
+    song_map: Dict[Tuple[str, Tuple[str, str]], List[str]] = {}
+    for path in shard_csvs:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for row in reader:
+                key = song_key(row)
+                existing = song_map.get(key)
+                if existing is None or is_better_row(row, existing):
+                    song_map[key] = row
+
+    final_rows = list(song_map.values())[:target_rows]
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(HEADER)
+        writer.writerows(final_rows)
+    return len(final_rows)
@@ -1,41 +1,207 @@
-from typing import Optional
+"""
+YouTube Data API view counts with batching, caching and a per-run quota cap.
+
+MusicBrainz relations already give most recordings their YouTube video ids, so
+statistics are fetched with `videos` calls of up to 50 ids each (1 quota unit per
+call). A `search` (100 units) is only used when a recording has no known ids.
+Results are cached with a TTL (in memory, persisted to YOUTUBE_CACHE_PATH), and
+once YOUTUBE_QUOTA_UNITS would be exceeded no further requests are made.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
 import requests
 
-from .config import YOUTUBE_API_KEY
+from .config import (
+    YOUTUBE_API_KEY,
+    YOUTUBE_CACHE_PATH,
+    YOUTUBE_CACHE_TTL_SECONDS,
+    YOUTUBE_QUOTA_UNITS,
+)
 
 SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
 VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
 
+VIDEOS_BATCH = 50  # API maximum ids per videos call
+VIDEOS_COST = 1
+SEARCH_COST = 100
+# Searches may use at most this share of the quota, so known ids (100 per 2 units) keep getting stats
+SEARCH_QUOTA_SHARE = 0.5
+
+
+class YouTubeStatsClient:
+    """Thread-safe view-count lookups; see the module docstring for the cost model."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = YOUTUBE_API_KEY,
+        quota_units: int = YOUTUBE_QUOTA_UNITS,
+        cache_ttl: float = YOUTUBE_CACHE_TTL_SECONDS,
+        cache_path: Optional[str] = YOUTUBE_CACHE_PATH,
+    ):
+        self.api_key = api_key
+        self.quota_units = quota_units
+        self.cache_ttl = cache_ttl
+        self.cache_path = cache_path
+        self.units_used = 0
+        self.search_units_used = 0
+        self.videos_calls = 0
+        self.search_calls = 0
+        self.cache_hits = 0
+        # "v:<video id>" -> (fetched_at, views) and "q:<query>" -> (fetched_at, video id)
+        self._cache: Dict[str, Tuple[float, Optional[object]]] = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self.load_cache()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    def _cached(self, key: str) -> Tuple[bool, Optional[object]]:
+        entry = self._cache.get(key)
+        if entry is None or time.time() - entry[0] > self.cache_ttl:
+            return False, None
+        self.cache_hits += 1
+        return True, entry[1]
+
+    def _spend(self, units: int, search: bool = False) -> bool:
+        """Reserve quota units; False when the per-run cap (or the search share of it) would be exceeded."""
+        with self._lock:
+            if self.units_used + units > self.quota_units:
+                return False
+            if search and self.search_units_used + units > self.quota_units * SEARCH_QUOTA_SHARE:
+                return False
+            self.units_used += units
+            if search:
+                self.search_units_used += units
+            return True
+
+    def get_view_counts(self, video_ids: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Map each id to its view count (None if unknown, private, deleted or out of quota)."""
+        out: Dict[str, Optional[int]] = {}
+        missing: List[str] = []
+        with self._lock:
+            for vid in dict.fromkeys(video_ids):
+                found, views = self._cached(f"v:{vid}")
+                if found:
+                    out[vid] = views
+                else:
+                    missing.append(vid)
+        for start in range(0, len(missing), VIDEOS_BATCH):
+            batch = missing[start:start + VIDEOS_BATCH]
+            out.update(dict.fromkeys(batch))
+            if not self.enabled or not self._spend(VIDEOS_COST):
+                continue
+            try:
+                r = self._session.get(VIDEOS_URL, params={
+                    "key": self.api_key,
+                    "part": "statistics",
+                    "id": ",".join(batch),
+                    "maxResults": VIDEOS_BATCH,
+                }, timeout=30)
+                r.raise_for_status()
+                items = r.json().get("items", [])
+            except Exception:
+                continue  # leave uncached so a later call can retry
+            self.videos_calls += 1
+            views = dict.fromkeys(batch)
+            for item in items:
+                vc = item.get("statistics", {}).get("viewCount")
+                views[item["id"]] = int(vc) if vc is not None else None
+            now = time.time()
+            with self._lock:
+                for vid, vc in views.items():
+                    self._cache[f"v:{vid}"] = (now, vc)
+            out.update(views)
+        return out
+
+    def search_video_id(self, query: str) -> Optional[str]:
+        """Most-viewed video id for a query (one search call, cached)."""
+        key = f"q:{query.lower().strip()}"
+        with self._lock:
+            found, vid = self._cached(key)
+        if found:
+            return vid
+        if not self.enabled or not self._spend(SEARCH_COST, search=True):
+            return None
+        try:
+            r = self._session.get(SEARCH_URL, params={
+                "key": self.api_key,
+                "part": "snippet",
+                "q": query,
+                "type": "video",
+                "maxResults": 1,
+                "order": "viewCount",
+            }, timeout=30)
+            r.raise_for_status()
+            items = r.json().get("items", [])
+        except Exception:
+            return None
+        self.search_calls += 1
+        vid = items[0]["id"]["videoId"] if items else None
+        with self._lock:
+            self._cache[key] = (time.time(), vid)
+        return vid
+
+    def get_best_video_view_count(self, query: str) -> Optional[int]:
+        vid = self.search_video_id(query)
+        return self.get_view_counts([vid]).get(vid) if vid else None
+
+    def load_cache(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return
+        cutoff = time.time() - self.cache_ttl
+        with self._lock:
+            for key, (fetched_at, value) in raw.items():
+                if fetched_at >= cutoff and key not in self._cache:
+                    self._cache[key] = (fetched_at, value)
+
+    def save_cache(self) -> None:
+        """Write unexpired entries (merged with the file's current contents) atomically."""
+        if not self.cache_path or not self._cache:
+            return
+        self.load_cache()  # keep entries written meanwhile by other processes (shards)
+        cutoff = time.time() - self.cache_ttl
+        with self._lock:
+            data = {k: [t, v] for k, (t, v) in self._cache.items() if t >= cutoff}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.cache_path)
+
+    def stats_line(self) -> str:
+        return (f"YouTube: {self.units_used}/{self.quota_units} quota units "
+                f"({self.videos_calls} videos, {self.search_calls} search calls, {self.cache_hits} cache hits)")
+
+
+_client: Optional[YouTubeStatsClient] = None
+
+
+def get_client() -> YouTubeStatsClient:
+    """Process-wide client (created on first use)."""
+    global _client
+    if _client is None:
+        _client = YouTubeStatsClient()
+    return _client
+
+
+def set_quota_units(units: int) -> None:
+    """Change the per-run quota cap of the process-wide client (e.g. split across shards)."""
+    get_client().quota_units = units
+
 
 def get_best_video_view_count(query: str) -> Optional[int]:
     """Return the highest-view single video result's viewCount for a query, or None if API key missing/failed."""
     if not YOUTUBE_API_KEY:
         return None
-    try:
-        s = requests.get(SEARCH_URL, params={
-            "key": YOUTUBE_API_KEY,
-            "part": "snippet",
-            "q": query,
-            "type": "video",
-            "maxResults": 1,
-            "order": "viewCount",
-        }, timeout=30)
-        s.raise_for_status()
-        items = s.json().get("items", [])
-        if not items:
-            return None
-        vid = items[0]["id"]["videoId"]
-        v = requests.get(VIDEOS_URL, params={
-            "key": YOUTUBE_API_KEY,
-            "part": "statistics",
-            "id": vid,
-        }, timeout=30)
-        v.raise_for_status()
-        vitems = v.json().get("items", [])
-        if not vitems:
-            return None
-        stats = vitems[0].get("statistics", {})
-        vc = stats.get("viewCount")
-        return int(vc) if vc is not None else None
-    except Exception:
-        return None
+    return get_client().get_best_video_view_count(query)
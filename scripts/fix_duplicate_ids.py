@@ -1,7 +1,12 @@
-import pandas as pd
+import sys
 
-# Read the CSV file
-df = pd.read_csv('data/artist_collaborations_final.csv')
+from columnar import load_dataset, save_dataset
+
+# CSV or Parquet (see columnar.py); defaults to the final CSV
+DATASET_PATH = sys.argv[1] if len(sys.argv) > 1 else 'data/artist_collaborations_final.csv'
+
+# Read the dataset
+df = load_dataset(DATASET_PATH)
 
 print(f"Total rows: {len(df)}")
 print(f"Unique IDs: {df['id'].nunique()}")
@@ -22,7 +27,7 @@ if len(duplicates) > 0:
 df['id'] = range(1, len(df) + 1)
 
 # Save back to the same file
-df.to_csv('data/artist_collaborations_final.csv', index=False)
+save_dataset(df, DATASET_PATH)
 
 print(f"\n✅ IDs have been reset to sequential values from 1 to {len(df)}")
 print(f"New ID range: {df['id'].min()} to {df['id'].max()}")
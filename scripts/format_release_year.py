@@ -1,21 +1,26 @@
-import pandas as pd
+import sys
 
-# Read the CSV file
-df = pd.read_csv('data/artist_collaborations_final.csv')
+from columnar import load_dataset, save_dataset
+
+# CSV or Parquet (see columnar.py); defaults to the final CSV
+DATASET_PATH = sys.argv[1] if len(sys.argv) > 1 else 'data/artist_collaborations_final.csv'
+
+# Read the dataset
+df = load_dataset(DATASET_PATH)
 
 print("Before formatting:")
 print(f"Release_year dtype: {df['release_year'].dtype}")
 print(f"Sample values: {df['release_year'].head(10).tolist()}")
 
-# Convert release_year to integer, handling NaN values
-df['release_year'] = df['release_year'].fillna(0).astype(int)
+# Convert release_year to integer, handling missing values (already typed Int16 by load_dataset)
+df['release_year'] = df['release_year'].fillna(0).astype('int16')
 
 # Replace 0 with empty string if you want to keep missing years as empty
 # Uncomment the next line if you prefer empty cells instead of 0
 # df['release_year'] = df['release_year'].replace(0, '')
 
 # Save back to the same file
-df.to_csv('data/artist_collaborations_final.csv', index=False)
+save_dataset(df, DATASET_PATH)
 
 print("\nAfter formatting:")
 print(f"Release_year dtype: {df['release_year'].dtype}")
@@ -0,0 +1,171 @@
+"""
+Single-pass maintenance for the collaboration dataset.
+
+Replaces running merge_datasets.py, cleanup_csv.py, fix_duplicate_ids.py and
+format_release_year.py one after another (each reading and rewriting the whole
+file). The inputs are streamed in chunks through every step at once:
+
+    merge (inputs in order) -> column projection -> duplicate removal
+    -> release year normalization -> sequential id reassignment
+
+and written to a temporary file next to the output, which then replaces the
+output atomically. Inputs and output may be CSV or Parquet (see columnar.py);
+the output may be one of the inputs.
+
+Duplicates are detected with 64-bit row hashes over the projected columns
+except id, kept in one sorted uint64 array, so memory grows with the number of
+distinct rows (8 bytes each), not with the dataset.
+
+Usage:
+    python scripts/maintain_dataset.py data/artist_collaborations_500_batch1.csv data/artist_collaborations_500_batch2.csv --out data/artist_collaborations_final.csv
+    python scripts/maintain_dataset.py data/artist_collaborations_final.csv      # in place
+"""
+import argparse
+import os
+import time
+from hashlib import blake2b
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from columnar import EMBEDDING_COLUMN, FINAL_COLUMNS, format_embedding, iter_chunks, to_table
+
+
+def project(df, columns):
+    """Keep `columns` in order; columns missing from this input are added empty."""
+    for col in columns:
+        if col not in df:
+            df[col] = pd.NA if col != EMBEDDING_COLUMN else None
+    return df[columns]
+
+
+def _embedding_digest(value):
+    """Digest of the float32 values, so CSV text and Parquet vectors hash alike."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return b''
+    if isinstance(value, str):
+        value = np.fromstring(value.strip()[1:-1], dtype=np.float32, sep=',')
+    return blake2b(np.asarray(value, dtype=np.float32).tobytes(), digest_size=8).digest()
+
+
+def row_hashes(df, key_columns):
+    """uint64 content hash per row."""
+    keys = df[key_columns].copy()
+    if EMBEDDING_COLUMN in keys:
+        keys[EMBEDDING_COLUMN] = [_embedding_digest(v) for v in keys[EMBEDDING_COLUMN]]
+    for col in keys.columns:
+        if isinstance(keys[col].dtype, pd.CategoricalDtype):
+            keys[col] = keys[col].astype('string')  # hash values, not per-chunk category codes
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def is_seen(seen, hashes):
+    """Membership of each hash in the sorted array `seen`."""
+    if not len(seen):
+        return np.zeros(len(hashes), dtype=bool)
+    idx = np.searchsorted(seen, hashes)
+    return seen[np.minimum(idx, len(seen) - 1)] == hashes
+
+
+class ChunkWriter:
+    """Appends chunks to a CSV or Parquet temp file; commit() renames it over the target."""
+
+    def __init__(self, path):
+        self.path = path
+        base, ext = os.path.splitext(path)
+        self.tmp_path = f"{base}.{os.getpid()}.tmp{ext}"
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.parquet:
+            table = to_table(df)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.tmp_path, table.schema, compression='zstd')
+            elif table.schema != self._writer.schema:
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+            return
+        if EMBEDDING_COLUMN in df:
+            df = df.assign(**{EMBEDDING_COLUMN: [format_embedding(v) for v in df[EMBEDDING_COLUMN]]})
+        df.to_csv(self.tmp_path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def commit(self):
+        if self._writer is not None:
+            self._writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def maintain(inputs, out_path, columns=FINAL_COLUMNS, reassign_ids=True, normalize_years=True,
+             dedupe=True, chunk_rows=50000):
+    """Run every maintenance step over the inputs in one pass. Returns a stats dict."""
+    stats = {'rows_in': 0, 'duplicates': 0, 'rows_out': 0}
+    key_columns = [c for c in columns if c != 'id']
+    seen = np.empty(0, dtype=np.uint64)  # sorted hashes of the rows kept so far
+    next_id = 1
+    writer = ChunkWriter(out_path)
+    try:
+        for path in inputs:
+            for chunk in iter_chunks(path, chunk_rows):
+                stats['rows_in'] += len(chunk)
+                chunk = project(chunk, columns)
+                if dedupe:
+                    hashes = row_hashes(chunk, key_columns)
+                    keep = ~pd.Series(hashes).duplicated().to_numpy()
+                    keep &= ~is_seen(seen, hashes)
+                    new = np.sort(hashes[keep])
+                    seen = np.insert(seen, np.searchsorted(seen, new), new)
+                    stats['duplicates'] += int((~keep).sum())
+                    chunk = chunk[keep]
+                if normalize_years and 'release_year' in chunk:
+                    chunk = chunk.assign(release_year=chunk['release_year'].fillna(0).astype('int16'))
+                if reassign_ids and 'id' in chunk:
+                    chunk = chunk.assign(id=np.arange(next_id, next_id + len(chunk), dtype=np.int32))
+                    next_id += len(chunk)
+                stats['rows_out'] += len(chunk)
+                writer.write(chunk)
+        writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge, project, dedupe, normalize years and renumber ids in one pass")
+    parser.add_argument('inputs', nargs='+', help="Dataset files (CSV or Parquet), merged in order")
+    parser.add_argument('--out', default=None, help="Output path (default: the first input, replaced atomically)")
+    parser.add_argument('--columns', default=','.join(FINAL_COLUMNS), help="Comma-separated output columns")
+    parser.add_argument('--keep-ids', action='store_true', help="Do not renumber ids")
+    parser.add_argument('--keep-years', action='store_true', help="Do not normalize release years")
+    parser.add_argument('--keep-duplicates', action='store_true', help="Do not remove duplicate rows")
+    parser.add_argument('--chunk-rows', type=int, default=50000, help="Rows per chunk")
+    args = parser.parse_args()
+
+    out_path = args.out or args.inputs[0]
+    t0 = time.time()
+    stats = maintain(
+        args.inputs, out_path,
+        columns=[c.strip().lower() for c in args.columns.split(',') if c.strip()],
+        reassign_ids=not args.keep_ids,
+        normalize_years=not args.keep_years,
+        dedupe=not args.keep_duplicates,
+        chunk_rows=args.chunk_rows,
+    )
+    print(f"Rows read: {stats['rows_in']}")
+    print(f"Duplicates removed: {stats['duplicates']}")
+    print(f"Rows written: {stats['rows_out']}")
+    print(f"\n✅ Saved to {out_path} in {time.time() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Result cache for /matches, keyed by the request and stamped with the catalog version.
+
+Front ends repeat the same queries, and a ranking depends only on:
+- the canonical tags: lower-cased, de-duplicated, sorted
+- top_n and min_tag_overlap
+- the scoring weights
+- the catalog it was computed from
+
+The catalog version covers the snapshot generation and every change this
+process applied, including collaboration history and its own ingested artists.
+An entry made from an older catalog is never served: a lookup compares versions
+and drops a stale entry. Versions are only meaningful within one process.
+
+The ETag is therefore a digest of the response itself (result_digest of the
+ranking, plus the echoed tags), stored with the cache entry. Workers and
+restarts that produce the same ranking agree on it, and a different ranking
+always gets a different one, so If-None-Match never answers 304 for a body the
+client does not have.
+
+    cache = MatchCache(max_entries=1024)
+    key = cache.key(tags, top_n, min_overlap, weights)
+    entry = cache.get(key, catalog.version)
+    etag = make_etag(tags, result_digest(matches, analyzed))
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from tag_bitsets import split_tags
+
+
+def canonical_tags(tags):
+    """'Pop, R&B, pop ' -> 'pop, r&b' (order and case do not change the ranking key)."""
+    return ', '.join(sorted(set(split_tags(tags))))
+
+
+def result_digest(matches, analyzed):
+    """Digest of a ranking (plain dicts/values), independent of the catalog version that produced it."""
+    return hashlib.sha1(repr((matches, analyzed)).encode('utf-8')).hexdigest()
+
+
+def make_etag(user_tags, digest):
+    """Strong ETag of one response: its ranking digest plus the tags it echoes."""
+    return f'"{hashlib.sha1(repr((user_tags, digest)).encode("utf-8")).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value names etag (weak comparison, '*' matches)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+class MatchCache:
+    """LRU of (version, value) by request key; max_entries=0 keeps nothing."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'stale': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(tags, top_n, min_overlap, weights):
+        return canonical_tags(tags), top_n, min_overlap, tuple(weights)
+
+    def get(self, key, version):
+        """Cached value for key at this catalog version, or None (counts a hit or a miss)."""
+        if version is None:
+            self.stats['misses'] += 1
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != version:
+                del self._entries[key]
+                self.stats['stale'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        if version is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def not_modified(self):
+        """Count a request answered 304 (the client already had this ranking)."""
+        self.stats['not_modified'] += 1
+
+    def metrics(self):
+        stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            **stats,
+            'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else None,
+        }
@@ -1,8 +1,16 @@
 import pandas as pd
+import sys
+
+from columnar import load_dataset, save_dataset
+
+# Inputs and output may be CSV or Parquet (see columnar.py)
+BATCH1_PATH = sys.argv[1] if len(sys.argv) > 1 else 'data/artist_collaborations_500_batch1.csv'
+BATCH2_PATH = sys.argv[2] if len(sys.argv) > 2 else 'data/artist_collaborations_500_batch2.csv'
+MERGED_PATH = sys.argv[3] if len(sys.argv) > 3 else 'data/artist_collaborations_merged.csv'
 
 # Read both batch files
-batch1 = pd.read_csv('data/artist_collaborations_500_batch1.csv')
-batch2 = pd.read_csv('data/artist_collaborations_500_batch2.csv')
+batch1 = load_dataset(BATCH1_PATH)
+batch2 = load_dataset(BATCH2_PATH)
 
 # Merge the datasets
 merged = pd.concat([batch1, batch2], ignore_index=True)
@@ -11,10 +19,10 @@ merged = pd.concat([batch1, batch2], ignore_index=True)
 merged = merged.drop_duplicates()
 
 # Save the merged dataset
-merged.to_csv('data/artist_collaborations_merged.csv', index=False)
+save_dataset(merged, MERGED_PATH)
 
 print(f"Batch 1 rows: {len(batch1)}")
 print(f"Batch 2 rows: {len(batch2)}")
 print(f"Merged rows: {len(merged)}")
 print(f"Duplicates removed: {len(batch1) + len(batch2) - len(merged)}")
-print("\nMerged dataset saved to: data/artist_collaborations_merged.csv")
+print(f"\nMerged dataset saved to: {MERGED_PATH}")
@@ -0,0 +1,284 @@
+"""
+Precompute the top-k matches for every artist in the catalog (nightly job).
+
+Most queries really mean "who fits artist X". This job scores every artist
+against every other one, using the artist's stored embedding and tags, and
+writes the best k per artist to one .npz file. The API serves that file from
+GET /artists/{id}/matches with a dict lookup.
+
+Scores are the API's combined score: 0.6 * cosine + 0.4 * historical rate.
+The historical rate for X and Y weights each collaboration by the number of
+tags it shares with X's tags plus Y's tags:
+
+    rate(X, Y) = sum_h |(X ∪ Y) ∩ h| * success_h / sum_h |(X ∪ Y) ∩ h|
+
+Per tag, |U ∩ h| summed over history is a tag count N_t, or S_t for the
+successful rows only. Also |X ∪ Y| = X + Y - X ∘ Y on 0/1 tag vectors. So
+both sums are matrix products:
+
+    hits(X, Y) = X·S + Y·S - (X ∘ S) @ Yᵀ,  total likewise with N
+
+Artists have a handful of tags out of thousands, so the tag matrices are
+sparse (scipy, already installed with scikit-learn). The embedding part is a
+dense float32 matmul.
+
+Artists are processed in blocks of --block rows against blocks of --block
+candidates. Peak memory is a few (block x block) and (block x tags) float32
+arrays, independent of the catalog size. A running top-k is kept per row.
+Ties on the rounded combined score go to the lower catalog row, as in /matches.
+
+    python scripts/precompute_matches.py                   # published snapshot, else Supabase
+    python scripts/precompute_matches.py --k 50 --artists data/artists.parquet --history data/maindb.csv
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from catalog_snapshot import DEFAULT_ROOT, Catalog, StringColumn, read_current
+from tag_bitsets import fit_width
+
+DEFAULT_PATH = os.path.join('data', 'top_matches.npz')
+DEFAULT_WEIGHTS = (0.6, 0.4)
+
+
+def _dense(profiles, columns):
+    """0/1 float32 (rows, len(columns)) matrix of the given tag ids from uint64 bitsets."""
+    flags = np.unpackbits(np.ascontiguousarray(profiles, dtype='<u8').view(np.uint8), axis=1, bitorder='little')
+    return flags[:, columns].astype(np.float32)
+
+
+def tag_weights(history, columns, block_rows=8192):
+    """Per tag: collaborations containing it (N) and successful ones among them (S)."""
+    n = np.zeros(len(columns), dtype=np.float64)
+    s = np.zeros(len(columns), dtype=np.float64)
+    for start in range(0, len(history), block_rows):
+        block = _dense(history.profiles[start:start + block_rows], columns)
+        n += block.sum(axis=0)
+        s += block[history.success[start:start + block_rows]].sum(axis=0)
+    return n.astype(np.float32), s.astype(np.float32)
+
+
+def compute_top_matches(catalog, k=50, weights=DEFAULT_WEIGHTS, block=2048, progress=None):
+    """TopMatches for every artist of a Catalog (each artist excluded from its own list)."""
+    started = time.perf_counter()
+    count = len(catalog)
+    k = max(0, min(k, count - 1))
+    semantic_weight, history_weight = weights
+    embeddings = np.asarray(catalog.embeddings, dtype=np.float32)
+    profiles = np.asarray(catalog.profiles)
+    history = catalog.history
+    if len(history) and profiles.shape[1] != history.profiles.shape[1]:
+        profiles = fit_width(profiles, history.profiles.shape[1])
+
+    # Only tags some artist has can be in X ∩ Y; the rest only feed the per-artist sums
+    used = np.zeros(profiles.shape[1], dtype=np.uint64)
+    for start in range(0, count, block):
+        used |= np.bitwise_or.reduce(profiles[start:start + block], axis=0)
+    columns = np.flatnonzero(np.unpackbits(used.astype('<u8').view(np.uint8), bitorder='little'))
+    n_weights, s_weights = tag_weights(history, columns) if len(history) else (None, None)
+
+    if n_weights is not None:
+        import scipy.sparse as sp
+        tag_matrix = sp.vstack([sp.csr_matrix(_dense(profiles[start:start + block], columns))
+                                for start in range(0, count, block)] or [sp.csr_matrix((0, len(columns)))]).tocsr()
+        artist_n, artist_s = tag_matrix @ n_weights, tag_matrix @ s_weights
+        tags_n = tag_matrix.multiply(n_weights[None, :]).tocsr()  # X ∘ N
+        tags_s = tag_matrix.multiply(s_weights[None, :]).tocsr()  # X ∘ S
+
+    neighbors = np.zeros((count, k), dtype=np.int32)
+    combined = np.zeros((count, k), dtype=np.float32)
+    similarity = np.zeros((count, k), dtype=np.float32)
+    hist_rate = np.zeros((count, k), dtype=np.float32)
+    # Sort key: rounded score descending, then catalog row (key % scale gives the row back)
+    scale = np.int64(count + 1)
+
+    for q in range(0, count if k else 0, block):
+        q_end = min(count, q + block)
+        rows = q_end - q
+        q_emb = embeddings[q:q_end]
+        if n_weights is not None:
+            q_n, q_s = tags_n[q:q_end], tags_s[q:q_end]
+        best_key = np.full((rows, k), np.iinfo(np.int64).max, dtype=np.int64)
+        best = np.zeros((3, rows, k), dtype=np.float32)  # combined, similarity, history
+
+        for c in range(0, count, block):
+            c_end = min(count, c + block)
+            sims = q_emb @ embeddings[c:c_end].T
+            if n_weights is not None:
+                c_tags = tag_matrix[c:c_end].T.tocsc()
+                total = artist_n[q:q_end, None] + artist_n[None, c:c_end] - (q_n @ c_tags).toarray()
+                hits = artist_s[q:q_end, None] + artist_s[None, c:c_end] - (q_s @ c_tags).toarray()
+                rates = np.full(sims.shape, 0.5, dtype=np.float32)
+                np.divide(hits, total, out=rates, where=total > 0)
+            else:
+                rates = np.full(sims.shape, 0.5, dtype=np.float32)
+            scores = semantic_weight * sims
+            scores += history_weight * rates
+            key = np.rint(scores * -1000).astype(np.int64)
+            key *= scale
+            key += np.arange(c, c_end, dtype=np.int64)
+            # Never an artist's own match
+            lo, hi = max(q, c), min(q_end, c_end)
+            if lo < hi:
+                key[np.arange(lo, hi) - q, np.arange(lo, hi) - c] = np.iinfo(np.int64).max
+
+            # Best k of this block, merged into the running top-k
+            if c_end - c > k:
+                top = np.argpartition(key, k - 1, axis=1)[:, :k]
+                key = np.take_along_axis(key, top, axis=1)
+                values = [np.take_along_axis(v, top, axis=1) for v in (scores, sims, rates)]
+            else:
+                values = [scores, sims, rates]
+            merged_key = np.concatenate([best_key, key], axis=1)
+            keep = np.argpartition(merged_key, k - 1, axis=1)[:, :k]
+            best_key = np.take_along_axis(merged_key, keep, axis=1)
+            best = np.stack([np.take_along_axis(np.concatenate([b, v], axis=1), keep, axis=1)
+                             for b, v in zip(best, values)])
+
+        order = np.argsort(best_key, axis=1)
+        best = np.stack([np.take_along_axis(b, order, axis=1) for b in best])
+        combined[q:q_end], similarity[q:q_end], hist_rate[q:q_end] = best
+        neighbors[q:q_end] = np.take_along_axis(best_key, order, axis=1) % scale
+        if progress is not None:
+            progress(q_end, count)
+
+    runtime = time.perf_counter() - started
+    meta = {
+        'k': k,
+        'weights': list(weights),
+        'artists': count,
+        'collaborations': len(history),
+        'tags': int(len(columns)),
+        'catalog': catalog.version,
+        'block': block,
+        'runtime_s': round(runtime, 2),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return TopMatches(np.asarray(catalog.ids, dtype=np.int64), neighbors, combined, similarity, hist_rate,
+                      _strings(catalog.names), _strings(catalog.tags), meta)
+
+
+def _strings(column):
+    if isinstance(column, StringColumn):
+        return StringColumn(np.asarray(column.data), np.asarray(column.offsets))
+    return StringColumn.from_values(column)
+
+
+class TopMatches:
+    """Precomputed matches: row i holds artist ids[i]'s k best catalog rows (neighbors) and their scores."""
+
+    def __init__(self, ids, neighbors, combined, similarity, history, names, tags, meta=None, path=None):
+        self.ids = ids
+        self.neighbors = neighbors
+        self.combined = combined
+        self.similarity = similarity
+        self.history = history
+        self.names = names
+        self.tags = tags
+        self.meta = meta or {}
+        self.path = path
+        self._rows = {int(artist_id): row for row, artist_id in enumerate(ids.tolist())}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, artist_id):
+        """Row of an artist id, or None."""
+        return self._rows.get(int(artist_id))
+
+    def save(self, path):
+        """Write the .npz atomically (readers see the old or the new file, never half of one)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f'{path}.tmp-{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            np.savez(f, ids=self.ids, neighbors=self.neighbors, combined=self.combined,
+                     similarity=self.similarity, history=self.history,
+                     names=self.names.data, names_offsets=self.names.offsets,
+                     tags=self.tags.data, tags_offsets=self.tags.offsets,
+                     meta=np.array(json.dumps(self.meta)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f['ids'], f['neighbors'], f['combined'], f['similarity'], f['history'],
+                       StringColumn(f['names'], f['names_offsets']), StringColumn(f['tags'], f['tags_offsets']),
+                       json.loads(str(f['meta'])), path)
+
+
+class TopMatchesWatcher:
+    """The latest TopMatches file, reloaded when the nightly job replaces it (checked every few seconds)."""
+
+    def __init__(self, path=DEFAULT_PATH, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._table = None
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The loaded TopMatches, or None if the job has not written one yet."""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return self._table
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                self._table, self._mtime = None, None
+                return None
+            if mtime != self._mtime:
+                self._table = TopMatches.load(self.path)
+                self._mtime = mtime
+        return self._table
+
+
+def _load_catalog(args):
+    if args.artists:
+        from columnar import load_dataset
+        return Catalog.build(load_dataset(args.artists), load_dataset(args.history) if args.history else None)
+    name = read_current(args.root)
+    if name:
+        return Catalog.open(os.path.join(args.root, name))
+    from catalog_snapshot import _build_from_supabase
+    print(f"No snapshot published under {args.root}; reading Supabase")
+    return _build_from_supabase('id')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute the top-k matches for every catalog artist.')
+    parser.add_argument('--root', default=os.getenv('CATALOG_DIR', DEFAULT_ROOT), help='Snapshot directory (CATALOG_DIR)')
+    parser.add_argument('--artists', help='Artist CSV/Parquet with id, artist_name, artist_tags, embedding')
+    parser.add_argument('--history', help='Collaboration CSV/Parquet (with --artists)')
+    parser.add_argument('--out', default=os.getenv('TOP_MATCHES_PATH', DEFAULT_PATH), help='Output .npz (TOP_MATCHES_PATH)')
+    parser.add_argument('--k', type=int, default=50, help='Matches kept per artist')
+    parser.add_argument('--block', type=int, default=2048, help='Rows per block (memory ~ block^2 and block x tags)')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    catalog = _load_catalog(args)
+    loaded = time.perf_counter() - t0
+    print(f"Loaded {len(catalog)} artists, {len(catalog.history)} collaborations in {loaded:.1f} s")
+
+    def progress(done, total):
+        elapsed = time.perf_counter() - t0 - loaded
+        print(f"  {done}/{total} artists ({done / max(elapsed, 1e-9):.0f}/s)", end='\r', flush=True)
+
+    table = compute_top_matches(catalog, args.k, block=args.block, progress=progress)
+    table.meta['load_s'] = round(loaded, 2)
+    table.save(args.out)
+    size = os.path.getsize(args.out) / 1024 / 1024
+    print(f"\n✅ Top {table.meta['k']} matches for {len(table)} artists in {table.meta['runtime_s']:.1f} s "
+          f"(+{loaded:.1f} s loading) -> {args.out} ({size:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
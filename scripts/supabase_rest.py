@@ -0,0 +1,238 @@
+"""
+Shared Supabase (PostgREST) client for the scripts and the Python APIs.
+
+One keep-alive requests.Session per process (pooled connections, gzip responses),
+with retries on connection errors, 429 and 5xx using jittered exponential backoff
+(Retry-After is honoured). On top of that:
+- select_pages()/select_all(): keyset pagination (order by a unique column, then
+  `col=gt.<last>`), so tables larger than PostgREST's max-rows are read completely
+- upsert()/insert(): chunked bulk writes with `Prefer: resolution=merge-duplicates`
+- update(), rpc()
+- optional per-call timing: SUPABASE_TIMING=1 prints every call; timing_summary()
+  reports count / total / max per method and table
+
+Request bodies can also be gzip-compressed (SUPABASE_GZIP_REQUESTS=1). That only
+helps behind a gateway that decodes Content-Encoding, so it is off by default.
+
+    from supabase_rest import get_client
+    db = get_client()
+    artists = db.select_all('artists', 'id,artist_name,artist_tags,embedding')
+    db.upsert('artists', rows, on_conflict='id')
+"""
+import gzip
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class SupabaseError(Exception):
+    """A PostgREST call failed (non-retryable status, or retries exhausted)."""
+
+    def __init__(self, method, path, status, body):
+        super().__init__(f"{method} {path} failed with {status}: {body[:500]}")
+        self.status = status
+        self.body = body
+
+
+class SupabaseREST:
+    def __init__(self, url=None, key=None, timeout=30, max_retries=5, backoff_base=0.5, backoff_max=20.0,
+                 pool_size=10, timing=None, gzip_requests=None):
+        self.url = (url or os.getenv("SUPABASE_URL") or "").rstrip("/")
+        key = key or os.getenv("SUPABASE_SERVICE_KEY")
+        if not self.url or not key:
+            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env file")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timing = _env_flag("SUPABASE_TIMING") if timing is None else timing
+        self.gzip_requests = _env_flag("SUPABASE_GZIP_REQUESTS") if gzip_requests is None else gzip_requests
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+        })
+        self._stats = {}  # (method, table) -> [calls, total seconds, max seconds]
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        # Full jitter: uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record(self, method, path, seconds, status):
+        table = path.split("?", 1)[0]
+        with self._lock:
+            entry = self._stats.setdefault((method, table), [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+        if self.timing:
+            print(f"  ⏱️  {method} {table} -> {status} in {seconds * 1000:.0f} ms")
+
+    def request(self, method, path, params=None, body=None, headers=None, ok=(200, 201, 204, 206)):
+        """Send one PostgREST call with retries; returns the requests.Response."""
+        url = f"{self.url}/rest/v1/{path}"
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body, separators=(",", ":")).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+            if self.gzip_requests and len(data) > 1024:
+                data = gzip.compress(data, compresslevel=5)
+                headers["Content-Encoding"] = "gzip"
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, data=data, headers=headers,
+                                                timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(method, path, time.perf_counter() - start, type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            self._record(method, path, time.perf_counter() - start, response.status_code)
+            if response.status_code in ok:
+                return response
+            if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                raise SupabaseError(method, path, response.status_code, response.text)
+            time.sleep(self._backoff(attempt, response))
+        raise AssertionError("unreachable")
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def select(self, table, columns="*", filters=None, order=None, limit=None, offset=None):
+        """One page of rows. filters are PostgREST params, e.g. {'id': 'eq.5', 'embedding': 'is.null'}."""
+        params = {"select": columns, **(filters or {})}
+        if order:
+            params["order"] = order
+        if limit is not None:
+            params["limit"] = limit
+        if offset:
+            params["offset"] = offset
+        return self.request("GET", table, params=params).json()
+
+    def select_pages(self, table, columns="*", filters=None, page_size=1000, key="id", order=None):
+        """Yield pages of rows ordered by `key` (a unique column), using keyset pagination.
+
+        key=None falls back to limit/offset paging (for tables without a unique column).
+        It then needs an explicit `order` (e.g. 'artist_a.asc,artist_b.asc') that is total
+        over the rows; without one PostgREST may return rows in a different order per
+        page, duplicating or skipping rows. The key column is added to the selection if
+        it is missing.
+        """
+        if not key and not order:
+            raise ValueError("select_pages with key=None needs an explicit order")
+        if key and columns != "*" and key not in columns.split(","):
+            columns = f"{columns},{key}"
+        last = None
+        offset = 0
+        while True:
+            page_filters = dict(filters or {})
+            if key and last is not None:
+                page_filters[key] = f"gt.{last}"
+            rows = self.select(table, columns, page_filters, order=f"{key}.asc" if key else order,
+                               limit=page_size, offset=None if key else offset)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            if key:
+                last = rows[-1][key]
+            else:
+                offset += len(rows)
+
+    def select_all(self, table, columns="*", filters=None, page_size=1000, key="id", order=None):
+        rows = []
+        for page in self.select_pages(table, columns, filters, page_size, key, order):
+            rows.extend(page)
+        return rows
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def insert(self, table, rows, chunk_size=500):
+        """Insert rows in chunks; returns the number of rows sent."""
+        return self._write(table, rows, chunk_size, {"Prefer": "return=minimal"}, None)
+
+    def upsert(self, table, rows, on_conflict=None, chunk_size=500, ignore_duplicates=False, returning=None):
+        """Insert-or-update rows in chunks (on_conflict: unique column(s), default the primary key).
+
+        Every row in a chunk must have the same keys (PostgREST bulk insert), and
+        NOT NULL columns must be present even when the row already exists.
+        Returns the number of rows sent, or with returning='id,artist_name' the
+        written rows with those columns.
+        """
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        params = {"on_conflict": on_conflict} if on_conflict else {}
+        if returning:
+            params["select"] = returning
+        prefer = f"resolution={resolution},return={'representation' if returning else 'minimal'}"
+        return self._write(table, rows, chunk_size, {"Prefer": prefer}, params or None, returning)
+
+    def _write(self, table, rows, chunk_size, headers, params, returning=None):
+        rows = list(rows)
+        written = []
+        for start in range(0, len(rows), chunk_size):
+            response = self.request("POST", table, params=params, body=rows[start:start + chunk_size], headers=headers)
+            if returning:
+                written.extend(response.json())
+        return written if returning else len(rows)
+
+    def update(self, table, values, filters):
+        """PATCH rows matching filters (e.g. {'id': 'eq.5'}); refuses to run without filters."""
+        if not filters:
+            raise ValueError("update() needs filters; PostgREST would update every row")
+        self.request("PATCH", table, params=filters, body=values, headers={"Prefer": "return=minimal"})
+
+    def rpc(self, function, params=None):
+        """Call a SQL function; returns its JSON result."""
+        return self.request("POST", f"rpc/{function}", body=params or {}).json()
+
+    # ------------------------------------------------------------------
+
+    def timing_summary(self):
+        with self._lock:
+            stats = sorted(self._stats.items())
+        lines = [f"{method:6} {table:30} {n:5} calls  {total:7.2f} s total  {peak * 1000:7.0f} ms max"
+                 for (method, table), (n, total, peak) in stats]
+        return "\n".join(lines) if lines else "No Supabase calls"
+
+
+def _env_flag(name):
+    return os.getenv(name, "").lower() in {"1", "true", "yes"}
+
+
+_client = None
+
+
+def get_client():
+    """Process-wide client (created on first use, reads SUPABASE_URL / SUPABASE_SERVICE_KEY)."""
+    global _client
+    if _client is None:
+        _client = SupabaseREST()
+    return _client
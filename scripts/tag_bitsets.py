@@ -0,0 +1,199 @@
+"""
+Interned tags and bitset tag profiles.
+
+Every distinct tag gets a small integer id in a TagVocab; a tag set (an artist,
+or a collaboration's two artists combined) is then a fixed-width bitset packed
+into uint64 words. Overlap and Jaccard against many profiles at once are
+AND/OR plus popcount over a (rows, words) matrix, instead of splitting the
+comma-joined tag strings and building Python sets for every comparison.
+
+Tags are compared lower-cased and stripped. Tags unknown to the vocabulary
+cannot overlap anything; encode() reports how many there were so Jaccard can
+still count them in the union.
+
+    vocab = TagVocab.from_strings(df['artist_01_tags'])
+    profiles = vocab.encode_many(artists['artist_tags'])
+    query, unknown = vocab.encode('pop, dance-pop')
+    scores = jaccard(query, profiles, query_unknown=unknown)
+"""
+import numpy as np
+
+WORD_BITS = 64
+
+if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0
+    def _popcount_words(words):
+        return np.bitwise_count(words)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount_words(words):
+        as_bytes = np.ascontiguousarray(words).view(np.uint8).reshape(words.shape + (8,))
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+def split_tags(tags):
+    """'Pop, Dance-Pop' -> ['pop', 'dance-pop'] (empty and missing values give [])."""
+    if not isinstance(tags, str):
+        return []
+    return [t for t in (part.strip().lower() for part in tags.split(',')) if t]
+
+
+def popcount(bits):
+    """Number of set bits per row of a (..., words) uint64 array."""
+    return _popcount_words(bits).sum(axis=-1, dtype=np.int64)
+
+
+class TagVocab:
+    """Tag -> bit index mapping; the bitset width is fixed by the vocabulary size."""
+
+    def __init__(self, tags=()):
+        self.tags = []
+        self.index = {}
+        for tag in tags:
+            self.intern(tag)
+
+    @classmethod
+    def from_strings(cls, *columns):
+        """Vocabulary of every tag in the given comma-joined tag columns (sorted, so ids are reproducible)."""
+        import pandas as pd
+        tags = set()
+        for column in columns:
+            for value in pd.unique(pd.Series(column, dtype=object)):
+                tags.update(split_tags(value))
+        return cls(sorted(tags))
+
+    def __len__(self):
+        return len(self.tags)
+
+    @property
+    def words(self):
+        return max(1, -(-len(self.tags) // WORD_BITS))
+
+    def intern(self, tag):
+        tag = tag.strip().lower()
+        if tag not in self.index:
+            self.index[tag] = len(self.tags)
+            self.tags.append(tag)
+        return self.index[tag]
+
+    def encode(self, tags):
+        """Return (bitset, unknown_count) for one comma-joined tag string."""
+        bits = np.zeros(self.words, dtype=np.uint64)
+        unknown = 0
+        for tag in set(split_tags(tags)):
+            i = self.index.get(tag)
+            if i is None:
+                unknown += 1
+            else:
+                bits[i // WORD_BITS] |= np.uint64(1) << np.uint64(i % WORD_BITS)
+        return bits, unknown
+
+    def encode_many(self, values):
+        """(len(values), words) bitset matrix; each distinct string is split only once."""
+        import pandas as pd
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+        distinct = np.zeros((len(uniques), self.words), dtype=np.uint64)
+        for row, value in enumerate(uniques):
+            distinct[row] = self.encode(value)[0]
+        return distinct[codes]
+
+    def decode(self, bits):
+        """Tags whose bits are set in one bitset (sorted by tag id)."""
+        flags = np.unpackbits(np.asarray(bits, dtype='<u8').view(np.uint8), bitorder='little')
+        return [self.tags[i] for i in np.flatnonzero(flags[:len(self.tags)])]
+
+
+def fit_width(bits, words):
+    """Pad (with zeros) or truncate the last axis of a bitset array to the given number of words."""
+    have = bits.shape[-1]
+    if have == words:
+        return bits
+    if have > words:
+        return bits[..., :words]
+    return np.concatenate([bits, np.zeros(bits.shape[:-1] + (words - have,), dtype=np.uint64)], axis=-1)
+
+
+def overlap(query, profiles):
+    """Shared tag count between one bitset and each row of profiles."""
+    return popcount(profiles & query)
+
+
+def jaccard(query, profiles, query_unknown=0):
+    """Jaccard similarity between one bitset and each row of profiles (0 where both are empty)."""
+    inter = popcount(profiles & query)
+    union = popcount(profiles | query) + query_unknown
+    return np.divide(inter, union, out=np.zeros(len(profiles)), where=union > 0)
+
+
+def candidate_mask(query, profiles, min_overlap=1):
+    """Rows sharing at least min_overlap tags with the query (a pre-filter before embedding scoring)."""
+    if min_overlap <= 0:
+        return np.ones(len(profiles), dtype=bool)
+    return overlap(query, profiles) >= min_overlap
+
+
+class TagHistory:
+    """Collaboration history as bitsets: one profile (both artists' tags) and a success flag per row."""
+
+    def __init__(self, vocab, profiles, success):
+        self.vocab = vocab
+        self.profiles = profiles
+        self.success = success
+
+    @classmethod
+    def from_frame(cls, history_df, vocab=None):
+        """Build from rows with artist_01_tags, artist_02_tags and collaboration_status."""
+        if history_df.empty:
+            return cls(vocab or TagVocab(), np.zeros((0, 1), dtype=np.uint64), np.zeros(0, dtype=bool))
+        tags1, tags2 = history_df['artist_01_tags'], history_df['artist_02_tags']
+        vocab = vocab or TagVocab.from_strings(tags1, tags2)
+        profiles = vocab.encode_many(tags1) | vocab.encode_many(tags2)
+        success = (history_df['collaboration_status'] == 'Success').to_numpy()
+        return cls(vocab, profiles, success)
+
+    def __len__(self):
+        return len(self.success)
+
+    def success_rates(self, user_tags, artist_tags, block_rows=4096):
+        """Overlap-weighted historical success rate for user_tags combined with each artist's tags.
+
+        Every collaboration sharing at least one tag with the combined set counts,
+        weighted by the number of shared tags; 0.5 when none do (or no history).
+        """
+        if not len(self) or not len(artist_tags):
+            return np.full(len(artist_tags), 0.5)
+        return self.success_rates_bits(self.vocab.encode(user_tags)[0], self.vocab.encode_many(artist_tags), block_rows)
+
+    def success_rates_bits(self, user_bits, artist_profiles, block_rows=4096, max_cells=1 << 22):
+        """success_rates() for artist profiles already encoded with this history's vocabulary."""
+        rates = np.full(len(artist_profiles), 0.5)
+        hits, total = self.success_counts(user_bits, artist_profiles, block_rows, max_cells)
+        np.divide(hits, total, out=rates, where=total > 0)
+        return rates
+
+    def success_counts(self, user_bits, artist_profiles, block_rows=4096, max_cells=1 << 22, row_mask=None):
+        """Overlap-weighted (hits, total) per artist, for adding up rates over several histories.
+
+        Profiles narrower or wider than this history's bitsets (a vocabulary that
+        grew later) are padded or truncated; bits past the width cannot match
+        anything here. Rows where row_mask is False are ignored.
+        """
+        total = np.zeros(len(artist_profiles))
+        hits = np.zeros(len(artist_profiles))
+        if not len(self) or not len(artist_profiles):
+            return hits, total
+        width = self.profiles.shape[1]
+        user_bits = fit_width(user_bits, width)
+        # (artist block, history block, words) at a time keeps memory bounded for large catalogs and histories
+        block_rows = min(block_rows, len(self))
+        artist_rows = max(1, max_cells // (block_rows * width))
+        for a in range(0, len(artist_profiles), artist_rows):
+            combined = fit_width(np.asarray(artist_profiles[a:a + artist_rows]), width) | user_bits
+            for start in range(0, len(self), block_rows):
+                block = self.profiles[start:start + block_rows]
+                weights = popcount(combined[:, None, :] & block[None, :, :])
+                if row_mask is not None:
+                    weights[:, ~row_mask[start:start + block_rows]] = 0
+                total[a:a + artist_rows] += weights.sum(axis=1)
+                hits[a:a + artist_rows] += weights[:, self.success[start:start + block_rows]].sum(axis=1)
+        return hits, total
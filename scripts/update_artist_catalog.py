@@ -0,0 +1,135 @@
+"""
+Incremental artist catalog (data/artists.csv) with stable ids.
+
+create_artist_db.py rebuilds the catalog from scratch and numbers artists by
+sorted name, so every new collaboration batch shifts existing ids and orphans
+their stored embeddings. This script instead merges new batches into the
+existing catalog:
+- existing artists keep their id (and embedding, unless their tags changed)
+- new artists are appended after the current highest id, in name order
+- an artist is "retagged" when the batch gives it a different tag set
+  (order/case-insensitive); its tags are replaced and its embedding cleared
+
+Within one batch the first tags seen for an artist win (as in
+create_artist_db.py); across batches the later batch wins. Rows that are new or
+retagged are written to a delta file, so only those need re-embedding and
+re-uploading. Without an existing catalog the result equals create_artist_db.py.
+
+Usage:
+    python scripts/update_artist_catalog.py data/artist_collaborations_500_batch2.csv
+    python scripts/update_artist_catalog.py batch3.csv batch4.parquet --catalog data/artists.csv --delta data/artists_delta.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from columnar import EMBEDDING_COLUMN, load_dataset, save_dataset
+
+CATALOG_COLUMNS = ['id', 'artist_name', 'artist_tags', EMBEDDING_COLUMN]
+DELTA_COLUMNS = ['id', 'artist_name', 'artist_tags', 'change']
+
+
+def _text(series):
+    """Plain str column (categoricals and missing values from load_dataset -> '')."""
+    return series.astype('string').fillna('').astype(object)
+
+
+def batch_artists(path):
+    """(artist_name, artist_tags) for every artist in a collaboration batch, first tags winning."""
+    df = load_dataset(path, columns=['artist_01', 'artist_01_tags', 'artist_02', 'artist_02_tags'])
+    stacked = pd.concat([
+        df[['artist_01', 'artist_01_tags']].set_axis(['artist_name', 'artist_tags'], axis=1),
+        df[['artist_02', 'artist_02_tags']].set_axis(['artist_name', 'artist_tags'], axis=1),
+    ], ignore_index=True)
+    stacked = stacked.apply(_text)
+    stacked = stacked[stacked['artist_name'].str.strip() != '']
+    return stacked.drop_duplicates('artist_name')
+
+
+def tag_key(tags):
+    """Canonical tag set for change detection: lower-cased, stripped, sorted, de-duplicated."""
+    parts = tags.str.lower().str.split(',')
+    return parts.map(lambda p: ','.join(sorted({t.strip() for t in p if t.strip()})))
+
+
+def load_catalog(path):
+    if not os.path.exists(path):
+        return pd.DataFrame({col: pd.Series(dtype=object) for col in CATALOG_COLUMNS})
+    catalog = load_dataset(path)
+    for col in ('artist_name', 'artist_tags'):
+        catalog[col] = _text(catalog[col])
+    if EMBEDDING_COLUMN not in catalog:
+        catalog[EMBEDDING_COLUMN] = ''
+    return catalog[CATALOG_COLUMNS]
+
+
+def update_catalog(catalog, batches):
+    """Merge batch artist frames into the catalog. Returns (catalog, delta)."""
+    # Latest batch first, so drop_duplicates keeps its tags; empty tags never overwrite known ones
+    incoming = pd.concat(batches[::-1], ignore_index=True)
+    tagged = incoming[incoming['artist_tags'].str.strip() != '']
+    incoming = pd.concat([tagged, incoming], ignore_index=True).drop_duplicates('artist_name')
+    incoming = incoming.rename(columns={'artist_tags': 'new_tags'})
+
+    merged = catalog.merge(incoming, on='artist_name', how='outer', sort=False)
+    added = merged['id'].isna()
+    new_tags = merged['new_tags'].fillna('')
+    retagged = ~added & (new_tags != '') & (tag_key(merged['artist_tags'].fillna('')) != tag_key(new_tags))
+
+    changed = added | retagged
+    merged.loc[changed, 'artist_tags'] = new_tags[changed]
+    merged.loc[changed, EMBEDDING_COLUMN] = None  # stale or never embedded
+
+    # Existing ids are kept; new artists follow the highest id, in name order
+    start = int(pd.to_numeric(catalog['id']).max()) + 1 if len(catalog) else 1
+    order = merged.loc[added, 'artist_name'].sort_values(kind='stable').index
+    merged.loc[order, 'id'] = np.arange(start, start + len(order))
+    merged['id'] = pd.to_numeric(merged['id']).astype('int64')
+
+    merged['change'] = np.select([added, retagged], ['new', 'retagged'], default='')
+    merged = merged.sort_values('id').reset_index(drop=True)
+    delta = merged.loc[merged['change'] != '', DELTA_COLUMNS].reset_index(drop=True)
+    return merged[CATALOG_COLUMNS], delta
+
+
+def save_atomic(df, path):
+    """save_dataset() to a temp file next to path, then rename over it."""
+    base, ext = os.path.splitext(path)
+    tmp_path = f"{base}.{os.getpid()}.tmp{ext}"
+    try:
+        save_dataset(df, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge collaboration batches into the artist catalog with stable ids")
+    parser.add_argument('batches', nargs='+', help="Collaboration datasets (CSV or Parquet), oldest first")
+    parser.add_argument('--catalog', default='data/artists.csv', help="Artist catalog to update (created if missing)")
+    parser.add_argument('--delta', default='data/artists_delta.csv', help="Where to write new/retagged artists")
+    parser.add_argument('--dry-run', action='store_true', help="Report changes without writing anything")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.catalog)
+    catalog, delta = update_catalog(catalog, [batch_artists(p) for p in args.batches])
+
+    counts = delta['change'].value_counts()
+    print(f"Artists in catalog: {len(catalog)}")
+    print(f"New: {counts.get('new', 0)}")
+    print(f"Retagged: {counts.get('retagged', 0)}")
+    if args.dry_run:
+        print(delta.to_string(index=False) if len(delta) else "No changes")
+        return
+
+    save_atomic(catalog, args.catalog)
+    delta.to_csv(args.delta, index=False)
+    print(f"\n✅ Catalog saved to: {args.catalog}")
+    print(f"Delta ({len(delta)} rows to re-embed) saved to: {args.delta}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,8 @@ import os
 from openai import OpenAI
 from dotenv import load_dotenv
 import time
-from supabase import create_client, Client
+
+from supabase_rest import get_client
 
 # Load environment variables
 load_dotenv()
@@ -14,14 +15,10 @@ if not api_key:
 
 client = OpenAI(api_key=api_key)
 
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env file")
+# Initialize Supabase client (shared PostgREST client, reads SUPABASE_URL / SUPABASE_SERVICE_KEY)
+db = get_client()
 
-supabase: Client = create_client(supabase_url, supabase_key)
+UPSERT_BATCH = 50
 
 def generate_embedding(text):
     """Generate embedding for given text using OpenAI"""
@@ -40,14 +37,27 @@ def update_artist_embeddings():
     
     # Fetch all artists from Supabase
     print("Fetching artists from Supabase...")
-    response = supabase.table('artists').select('id, artist_name, artist_tags').execute()
-    artists = response.data
+    artists = db.select_all('artists', 'id,artist_name,artist_tags')
     
     print(f"Found {len(artists)} artists")
     
-    # Process each artist
+    # Process each artist; embeddings are upserted UPSERT_BATCH rows at a time
     success_count = 0
     error_count = 0
+    pending = []
+    
+    def flush():
+        nonlocal success_count, error_count
+        if not pending:
+            return
+        try:
+            db.upsert('artists', pending, on_conflict='id')
+            print(f"✅ Uploaded {len(pending)} embeddings")
+            success_count += len(pending)
+        except Exception as e:
+            print(f"❌ Error uploading {len(pending)} embeddings: {e}")
+            error_count += len(pending)
+        pending.clear()
     
     for i, artist in enumerate(artists, 1):
         artist_id = artist['id']
@@ -60,25 +70,23 @@ def update_artist_embeddings():
         embedding = generate_embedding(artist_tags)
         
         if embedding:
-            try:
-                # Update the embedding in Supabase
-                supabase.table('artists').update({
-                    'embedding': embedding
-                }).eq('id', artist_id).execute()
-                
-                print(f"✅ Updated embedding for {artist_name}")
-                success_count += 1
-                
-                # Rate limiting - small delay to avoid hitting API limits
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"❌ Error updating {artist_name}: {e}")
-                error_count += 1
+            pending.append({
+                'id': artist_id,
+                'artist_name': artist_name,
+                'artist_tags': artist_tags,
+                'embedding': embedding
+            })
+            if len(pending) >= UPSERT_BATCH:
+                flush()
+            
+            # Rate limiting - small delay to avoid hitting API limits
+            time.sleep(0.5)
         else:
             print(f"❌ Failed to generate embedding for {artist_name}")
             error_count += 1
     
+    flush()
+    
     # Summary
     print("\n" + "="*50)
     print("SUMMARY")
@@ -1,9 +1,9 @@
 import os
-import requests
 from openai import OpenAI
 from dotenv import load_dotenv
 import time
-import json
+
+from supabase_rest import SupabaseError, get_client
 
 # Load environment variables
 load_dotenv()
@@ -15,20 +15,11 @@ if not api_key:
 
 client = OpenAI(api_key=api_key)
 
-# Supabase credentials
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env file")
+# Supabase client (pooled session, retries; reads SUPABASE_URL / SUPABASE_SERVICE_KEY)
+db = get_client()
 
-# Supabase API headers
-headers = {
-    "apikey": supabase_key,
-    "Authorization": f"Bearer {supabase_key}",
-    "Content-Type": "application/json",
-    "Prefer": "return=representation"
-}
+# Embeddings are written back in bulk upserts of this many rows instead of one PATCH per artist
+UPSERT_BATCH = 50
 
 def generate_embedding(text):
     """Generate embedding for given text using OpenAI"""
@@ -44,28 +35,21 @@ def generate_embedding(text):
 
 def fetch_artists():
     """Fetch all artists from Supabase"""
-    url = f"{supabase_url}/rest/v1/artists?select=id,artist_name,artist_tags"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error fetching artists: {response.status_code}")
-        print(response.text)
+    try:
+        return db.select_all("artists", "id,artist_name,artist_tags")
+    except (SupabaseError, OSError) as e:
+        print(f"Error fetching artists: {e}")
         return []
 
-def update_artist_embedding(artist_id, embedding):
-    """Update artist embedding in Supabase"""
-    url = f"{supabase_url}/rest/v1/artists?id=eq.{artist_id}"
-    data = {"embedding": embedding}
-    
-    response = requests.patch(url, headers=headers, json=data)
-    
-    if response.status_code in [200, 204]:
+def upload_embeddings(rows):
+    """Upsert a batch of {id, artist_name, artist_tags, embedding} rows; returns True on success"""
+    if not rows:
         return True
-    else:
-        print(f"Error updating artist {artist_id}: {response.status_code}")
-        print(response.text)
+    try:
+        db.upsert("artists", rows, on_conflict="id")
+        return True
+    except (SupabaseError, OSError) as e:
+        print(f"Error uploading {len(rows)} embeddings: {e}")
         return False
 
 def main():
@@ -87,6 +71,20 @@ def main():
     success_count = 0
     error_count = 0
     
+    pending = []
+
+    def flush():
+        nonlocal success_count, error_count
+        if not pending:
+            return
+        if upload_embeddings(pending):
+            print(f"✅ Uploaded {len(pending)} embeddings")
+            success_count += len(pending)
+        else:
+            print(f"❌ Failed to upload {len(pending)} embeddings")
+            error_count += len(pending)
+        pending.clear()
+
     for i, artist in enumerate(artists, 1):
         artist_id = artist['id']
         artist_name = artist['artist_name']
@@ -98,13 +96,11 @@ def main():
         embedding = generate_embedding(artist_tags)
         
         if embedding:
-            # Update the embedding in Supabase
-            if update_artist_embedding(artist_id, embedding):
-                print(f"✅ Updated embedding for {artist_name}")
-                success_count += 1
-            else:
-                print(f"❌ Failed to update {artist_name}")
-                error_count += 1
+            # Queue the row; full batches go to Supabase in one request
+            pending.append({"id": artist_id, "artist_name": artist_name,
+                            "artist_tags": artist_tags, "embedding": embedding})
+            if len(pending) >= UPSERT_BATCH:
+                flush()
             
             # Rate limiting - small delay to avoid hitting API limits
             time.sleep(0.5)
@@ -112,6 +108,8 @@ def main():
             print(f"❌ Failed to generate embedding for {artist_name}")
             error_count += 1
     
+    flush()
+    
     # Summary
     print("\n" + "="*50)
     print("SUMMARY")
@@ -120,6 +118,8 @@ def main():
     print(f"Successfully updated: {success_count}")
     print(f"Errors: {error_count}")
     print("="*50)
+    if db.timing:
+        print(db.timing_summary())
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,9 @@
 import os
-import requests
 from openai import OpenAI
 from dotenv import load_dotenv
 import time
-import json
+
+from supabase_rest import SupabaseError, get_client
 
 # Load environment variables
 load_dotenv()
@@ -15,20 +15,11 @@ if not api_key:
 
 client = OpenAI(api_key=api_key)
 
-# Supabase credentials
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-
-if not supabase_url or not supabase_key:
-    raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in .env file")
+# Supabase client: pooled session, with retries and jittered backoff on 429/5xx/connection errors
+db = get_client()
 
-# Supabase API headers
-headers = {
-    "apikey": supabase_key,
-    "Authorization": f"Bearer {supabase_key}",
-    "Content-Type": "application/json",
-    "Prefer": "return=representation"
-}
+# Embeddings are upserted in batches; a batch is flushed on exit too, so reruns still resume
+UPSERT_BATCH = 25
 
 def generate_embedding(text):
     """Generate embedding for given text using OpenAI"""
@@ -50,46 +41,20 @@ def generate_embedding(text):
 
 def fetch_artists():
     """Fetch all artists from Supabase"""
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            url = f"{supabase_url}/rest/v1/artists?select=id,artist_name,artist_tags,embedding"
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"  ⚠️  Attempt {attempt + 1}/{max_retries} - Error {response.status_code}: {response.text}")
-        except Exception as e:
-            print(f"  ⚠️  Attempt {attempt + 1}/{max_retries} failed: {e}")
-        
-        if attempt < max_retries - 1:
-            time.sleep(2)
-    
-    print(f"  ❌ Failed to fetch artists after {max_retries} attempts")
-    return []
+    try:
+        return db.select_all("artists", "id,artist_name,artist_tags,embedding")
+    except (SupabaseError, OSError) as e:
+        print(f"  ❌ Failed to fetch artists: {e}")
+        return []
 
-def update_artist_embedding(artist_id, embedding):
-    """Update artist embedding in Supabase with retry logic"""
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            url = f"{supabase_url}/rest/v1/artists?id=eq.{artist_id}"
-            data = {"embedding": embedding}
-            
-            response = requests.patch(url, headers=headers, json=data, timeout=10)
-            
-            if response.status_code in [200, 204]:
-                return True
-            else:
-                print(f"  ⚠️  Attempt {attempt + 1}/{max_retries} - Error {response.status_code}: {response.text}")
-        except Exception as e:
-            print(f"  ⚠️  Attempt {attempt + 1}/{max_retries} failed: {e}")
-        
-        if attempt < max_retries - 1:
-            time.sleep(2)
-    
-    return False
+def upload_embeddings(rows):
+    """Upsert a batch of {id, artist_name, artist_tags, embedding} rows (the client retries transient errors)"""
+    try:
+        db.upsert("artists", rows, on_conflict="id")
+        return True
+    except (SupabaseError, OSError) as e:
+        print(f"  ⚠️  Upload of {len(rows)} embeddings failed: {e}")
+        return False
 
 def main():
     """Main function to process all artists"""
@@ -130,30 +95,46 @@ def main():
     success_count = 0
     error_count = 0
     
-    for i, artist in enumerate(artists_to_process, 1):
-        artist_id = artist['id']
-        artist_name = artist['artist_name']
-        artist_tags = artist['artist_tags']
-        
-        print(f"[{i}/{len(artists_to_process)}] Processing: {artist_name}")
-        
-        # Generate embedding from artist tags
-        embedding = generate_embedding(artist_tags)
-        
-        if embedding:
-            # Update the embedding in Supabase
-            if update_artist_embedding(artist_id, embedding):
-                print(f"  ✅ Updated embedding for {artist_name}")
-                success_count += 1
+    pending = []
+
+    def flush():
+        nonlocal success_count, error_count
+        if not pending:
+            return
+        if upload_embeddings(pending):
+            print(f"  ✅ Uploaded {len(pending)} embeddings")
+            success_count += len(pending)
+        else:
+            print(f"  ❌ Failed to upload {len(pending)} embeddings")
+            error_count += len(pending)
+        pending.clear()
+
+    try:
+        for i, artist in enumerate(artists_to_process, 1):
+            artist_id = artist['id']
+            artist_name = artist['artist_name']
+            artist_tags = artist['artist_tags']
+            
+            print(f"[{i}/{len(artists_to_process)}] Processing: {artist_name}")
+            
+            # Generate embedding from artist tags
+            embedding = generate_embedding(artist_tags)
+            
+            if embedding:
+                # Queue the row; full batches go to Supabase in one request
+                pending.append({"id": artist_id, "artist_name": artist_name,
+                                "artist_tags": artist_tags, "embedding": embedding})
+                if len(pending) >= UPSERT_BATCH:
+                    flush()
+                
+                # Rate limiting - small delay to avoid hitting API limits
+                time.sleep(0.5)
             else:
-                print(f"  ❌ Failed to update {artist_name} in database")
+                print(f"  ❌ Failed to generate embedding for {artist_name}")
                 error_count += 1
-            
-            # Rate limiting - small delay to avoid hitting API limits
-            time.sleep(0.5)
-        else:
-            print(f"  ❌ Failed to generate embedding for {artist_name}")
-            error_count += 1
+    finally:
+        # Also on Ctrl+C: keep what was already generated
+        flush()
     
     # Summary
     print("\n" + "="*50)
@@ -165,6 +146,8 @@ def main():
     print(f"Successfully updated: {success_count}")
     print(f"Errors: {error_count}")
     print("="*50)
+    if db.timing:
+        print(db.timing_summary())
 
 if __name__ == "__main__":
     try:
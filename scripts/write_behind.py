@@ -0,0 +1,176 @@
+"""
+Write-behind queue: rows are accepted in memory and flushed to Supabase later
+as chunked bulk upserts by one background thread.
+
+Bounds:
+- queue depth: put() raises QueueFull when max_pending rows are waiting, so
+  callers can push back (the API answers 503) instead of growing without limit
+- flush latency: a chunk is sent as soon as chunk_size rows are waiting, or
+  when the oldest row has waited max_delay seconds
+
+Rows are coalesced by key (e.g. artist_name). A newer version of a queued row
+replaces the older one but keeps its queue position and age. One upsert never
+carries the same key twice, which PostgREST's ON CONFLICT would reject. If a
+flush fails transiently (connection error, or 5xx after the client's own
+retries), its rows go back to the front of the queue and the thread backs off.
+Rows rejected by a 4xx are dropped and counted. close() flushes what is left.
+metrics() reports depth, oldest age, flush time, and enqueue-to-persisted latency.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from supabase_rest import SupabaseError
+
+
+class QueueFull(Exception):
+    """The write-behind queue has max_pending rows waiting."""
+
+
+class WriteBehind:
+    def __init__(self, db, table, key, on_conflict=None, chunk_size=500, max_delay=1.0, max_pending=10000,
+                 returning=None, on_flushed=None, on_dropped=None):
+        self.db = db
+        self.table = table
+        self.key = key
+        self.on_conflict = on_conflict or key
+        self.chunk_size = chunk_size
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.returning = returning
+        self.on_flushed = on_flushed  # called with (rows, returned rows) after each successful flush
+        self.on_dropped = on_dropped  # called with the rows of a flush rejected by a 4xx
+        self._pending = OrderedDict()  # key -> (row, enqueued at)
+        self._in_flight = 0
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self.stats = {
+            'flushes': 0, 'flushed_rows': 0, 'failed_flushes': 0, 'dropped_rows': 0, 'coalesced_rows': 0,
+            'last_flush_ms': None, 'last_latency_s': None, 'max_latency_s': 0.0, 'last_error': None,
+        }
+
+    def free(self):
+        with self._cond:
+            return self.max_pending - len(self._pending)
+
+    def put(self, rows):
+        """Queue rows (dicts with the key column); raises QueueFull if they do not fit."""
+        rows = list(rows)
+        now = time.monotonic()
+        with self._cond:
+            new_keys = {r[self.key] for r in rows} - self._pending.keys()
+            if len(self._pending) + len(new_keys) > self.max_pending:
+                raise QueueFull(f"{len(self._pending)} rows waiting for {self.table}")
+            for row in rows:
+                k = row[self.key]
+                if k in self._pending:
+                    self._pending[k] = (row, self._pending[k][1])
+                    self.stats['coalesced_rows'] += 1
+                else:
+                    self._pending[k] = (row, now)
+            self._cond.notify()
+        if self._thread is None:
+            self._start()
+        return len(rows)
+
+    def _start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'write-behind-{self.table}', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Wait for a full chunk, but never past the oldest row's deadline
+            while len(self._pending) < self.chunk_size and not self._closing:
+                oldest = next(iter(self._pending.values()))[1]
+                remaining = oldest + self.max_delay - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            while self._pending and len(batch) < self.chunk_size:
+                batch.append(self._pending.popitem(last=False))
+            self._in_flight = len(batch)
+            return batch
+
+    def _run(self):
+        failures = 0
+        while True:
+            batch = self._next_batch()
+            ok = self._flush(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+            failures = 0 if ok else failures + 1
+            if failures:
+                time.sleep(min(30.0, 0.5 * 2 ** failures))
+
+    def _flush(self, batch):
+        rows = [row for _, (row, _) in batch]
+        t0 = time.perf_counter()
+        try:
+            returned = self.db.upsert(self.table, rows, on_conflict=self.on_conflict, chunk_size=len(rows),
+                                      returning=self.returning)
+        except Exception as e:
+            self.stats['failed_flushes'] += 1
+            self.stats['last_error'] = f"{type(e).__name__}: {str(e)[:300]}"
+            if isinstance(e, SupabaseError) and 400 <= e.status < 500:
+                self.stats['dropped_rows'] += len(rows)
+                self._callback(self.on_dropped, rows)
+                return True  # bad rows, not a bad connection: do not retry them
+            with self._cond:
+                for k, entry in reversed(batch):
+                    if k not in self._pending:  # a newer version queued meanwhile wins
+                        self._pending[k] = entry
+                        self._pending.move_to_end(k, last=False)
+            return False
+        done = time.monotonic()
+        latency = done - min(enqueued for _, (_, enqueued) in batch)
+        self.stats['flushes'] += 1
+        self.stats['flushed_rows'] += len(rows)
+        self.stats['last_flush_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+        self.stats['last_latency_s'] = round(latency, 3)
+        self.stats['max_latency_s'] = round(max(self.stats['max_latency_s'], latency), 3)
+        self._callback(self.on_flushed, rows, returned if self.returning else [])
+        return True
+
+    def _callback(self, callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            self.stats['last_error'] = f"{callback.__name__} {type(e).__name__}: {str(e)[:300]}"
+
+    def close(self, timeout=10.0):
+        """Flush everything queued (waits up to timeout seconds); returns True if the queue drained."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def metrics(self):
+        with self._cond:
+            depth = len(self._pending)
+            oldest = next(iter(self._pending.values()))[1] if self._pending else None
+            in_flight = self._in_flight
+        return {
+            'table': self.table,
+            'depth': depth,
+            'in_flight': in_flight,
+            'oldest_age_s': round(time.monotonic() - oldest, 3) if oldest is not None else None,
+            'max_pending': self.max_pending,
+            'max_delay_s': self.max_delay,
+            'chunk_size': self.chunk_size,
+            **self.stats,
+        }
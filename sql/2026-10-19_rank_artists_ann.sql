@@ -0,0 +1,172 @@
+-- Two-stage artist ranking: HNSW candidate retrieval, then the 60/40 rerank on the candidates.
+--
+-- rank_artists_by_embedding() orders by final_score. The HNSW index cannot serve
+-- that expression, so every call computes the distance to every artist and
+-- aggregates all of maindb. rank_artists_ann() takes the same arguments, plus
+-- tuning knobs, and returns the same columns:
+--   1. Take the candidate_k nearest artists by `embedding <=> query_embedding`.
+--      This is an index scan on artists_embedding_idx, with hnsw.ef_search set
+--      for the call.
+--   2. Score only those candidates: similarity plus historical success rate.
+--      Each candidate's history is looked up through the lower(artist_0x)
+--      indexes below. Then apply min_semantic_similarity and
+--      only_successful_collabs, and keep match_count rows.
+-- If fewer than match_count candidates survive the filters, K is multiplied by 4
+-- and stage one runs again, up to max_candidate_k. pgvector caps hnsw.ef_search
+-- at 1000, so an index scan never returns more than 1000 rows. If the filters
+-- still leave too few rows at the cap, the function falls back to scoring
+-- every artist. That matches rank_artists_by_embedding.
+--
+-- The ranking is approximate in one way. An artist outside the K nearest that
+-- would only reach the top match_count through its historical rate is not
+-- considered. Raise candidate_k to trade latency for recall. sql/bench/rank_artists_ann_bench.sql measures
+-- both functions and shows the plans.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS artists_embedding_idx
+  ON public.artists USING hnsw (embedding vector_cosine_ops);
+
+-- Per-candidate history lookups (the old function aggregated the whole table)
+CREATE INDEX IF NOT EXISTS maindb_artist_01_lower_idx ON public.maindb (lower(artist_01));
+CREATE INDEX IF NOT EXISTS maindb_artist_02_lower_idx ON public.maindb (lower(artist_02));
+
+-- Stage two: score and filter the given artists (all artists when candidate_ids is NULL)
+CREATE OR REPLACE FUNCTION public.score_artist_candidates(
+  query_embedding vector(1536),
+  candidate_ids bigint[],
+  only_successful_collabs boolean DEFAULT false,
+  min_semantic_similarity float DEFAULT 0.0,
+  semantic_weight float DEFAULT 0.6,
+  historical_weight float DEFAULT 0.4
+)
+RETURNS TABLE (
+  artist_id bigint,
+  artist_name text,
+  artist_tags text,
+  semantic_similarity float,
+  historical_success float,
+  final_score float
+)
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+  a.id,
+  a.artist_name,
+  a.artist_tags,
+  s.similarity,
+  h.success_rate,
+  s.similarity * semantic_weight + h.success_rate * historical_weight
+FROM artists a
+CROSS JOIN LATERAL (
+  SELECT (1 - (a.embedding <=> query_embedding))::float AS similarity
+) s
+CROSS JOIN LATERAL (
+  -- Same aggregate as rank_artists_by_embedding: both positions, neutral prior 0.5 for unseen
+  SELECT COALESCE(SUM(x.success_flag)::float / NULLIF(COUNT(*), 0), 0.5) AS success_rate,
+         COALESCE(SUM(x.success_flag), 0) AS successes
+  FROM (
+    SELECT CASE WHEN lower(m.collaboration_status) = 'success' THEN 1 ELSE 0 END AS success_flag
+    FROM maindb m
+    WHERE lower(m.artist_01) = lower(a.artist_name)
+    UNION ALL
+    SELECT CASE WHEN lower(m.collaboration_status) = 'success' THEN 1 ELSE 0 END AS success_flag
+    FROM maindb m
+    WHERE lower(m.artist_02) = lower(a.artist_name)
+  ) x
+) h
+WHERE a.embedding IS NOT NULL
+  AND (candidate_ids IS NULL OR a.id = ANY (candidate_ids))
+  AND s.similarity >= min_semantic_similarity
+  AND (only_successful_collabs = FALSE OR h.successes > 0);
+$$;
+
+CREATE OR REPLACE FUNCTION public.rank_artists_ann(
+  query_embedding vector(1536),
+  only_successful_collabs boolean DEFAULT false,
+  match_count integer DEFAULT 10,
+  min_semantic_similarity float DEFAULT 0.0,
+  candidate_k integer DEFAULT 100,
+  ef_search integer DEFAULT 100,
+  max_candidate_k integer DEFAULT 1000,
+  semantic_weight float DEFAULT 0.6,
+  historical_weight float DEFAULT 0.4
+)
+RETURNS TABLE (
+  artist_id bigint,
+  artist_name text,
+  artist_tags text,
+  semantic_similarity float,
+  historical_success float,
+  final_score float
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+  max_k integer := LEAST(GREATEST(max_candidate_k, 1), 1000);
+  k integer := LEAST(GREATEST(candidate_k, match_count, 1), max_k);
+  candidate_ids bigint[];
+  fetched integer;
+  survivors integer;
+BEGIN
+  LOOP
+    -- An HNSW scan returns at most ef_search rows, so it must cover K. It is local to this transaction.
+    PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(ef_search, k), 1000)::text, true);
+
+    -- Stage one: K nearest by cosine distance (ORDER BY distance LIMIT k uses the index)
+    SELECT array_agg(c.id), count(*)
+    INTO candidate_ids, fetched
+    FROM (
+      SELECT a.id
+      FROM artists a
+      WHERE a.embedding IS NOT NULL
+      ORDER BY a.embedding <=> query_embedding
+      LIMIT k
+    ) c;
+
+    SELECT count(*) INTO survivors
+    FROM public.score_artist_candidates(
+      query_embedding, COALESCE(candidate_ids, '{}'), only_successful_collabs,
+      min_semantic_similarity, semantic_weight, historical_weight
+    );
+
+    -- Enough rows, every artist already fetched, or no room left to widen
+    EXIT WHEN survivors >= match_count OR fetched < k OR k >= max_k;
+    k := LEAST(k * 4, max_k);
+  END LOOP;
+
+  IF survivors < match_count AND fetched >= k THEN
+    candidate_ids := NULL;  -- filters too selective for the ANN window: score every artist
+  ELSE
+    candidate_ids := COALESCE(candidate_ids, '{}');
+  END IF;
+
+  RETURN QUERY
+  SELECT *
+  FROM public.score_artist_candidates(
+    query_embedding, candidate_ids, only_successful_collabs,
+    min_semantic_similarity, semantic_weight, historical_weight
+  ) r
+  ORDER BY r.final_score DESC
+  LIMIT match_count;
+END;
+$$;
+
+COMMIT;
+
+-- Example usage (same first four arguments as rank_artists_by_embedding):
+-- SELECT * FROM rank_artists_ann(
+--   (SELECT embedding FROM artists WHERE artist_name = 'Ariana Grande' LIMIT 1),
+--   false,
+--   10,
+--   0.3
+-- );
+--
+-- Wider candidate window and a more thorough graph search:
+-- SELECT * FROM rank_artists_ann(
+--   (SELECT embedding FROM artists WHERE artist_name = 'Drake' LIMIT 1),
+--   true, 10, 0.0,
+--   candidate_k => 400, ef_search => 400
+-- );
@@ -0,0 +1,376 @@
+-- Canonical artist keys: accent-folded artist names and integer artist ids on maindb rows.
+--
+-- History lookups joined maindb to artists on names: lower(m.artist_01) =
+-- lower(a.artist_name) with an OR across both positions, or an exact name match.
+-- Those joins need expression indexes (or none apply), and accent variants
+-- (Beyoncé / Beyonce) never match. This migration:
+--   1. Adds public.artist_key(text): unaccent + lower + trim + collapsed
+--      whitespace. This is the same key as scripts/factual/artist_keys.py.
+--   2. Stores it on artists as the generated column artist_key, indexed.
+--   3. Adds maindb.artist_01_id / artist_02_id referencing artists(id). They are
+--      backfilled by key and kept filled by triggers: new maindb rows look up
+--      their artists, and new or renamed artists claim the maindb rows that
+--      were waiting for them. When several artists share a key, the lowest id wins.
+--   4. Rewrites the history functions to use integer joins on those ids, and
+--      drops the lower(name) indexes added for rank_artists_ann.
+--
+-- Artists that share a key after this migration are accent/spacing duplicates.
+-- List them with:
+--   SELECT artist_key, array_agg(artist_name ORDER BY id) FROM artists GROUP BY 1 HAVING count(*) > 1;
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- IMMUTABLE wrapper (unaccent() itself is only STABLE) with the dictionary named explicitly
+CREATE OR REPLACE FUNCTION public.artist_key(name text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+STRICT
+PARALLEL SAFE
+SET search_path = public, extensions, pg_catalog
+AS $$
+  SELECT lower(btrim(regexp_replace(
+    unaccent('unaccent', translate(name, '’‘‐‑–—', '''''----')),
+    '\s+', ' ', 'g'
+  )));
+$$;
+
+-- ============================================
+-- 1. Keys and ids
+-- ============================================
+
+ALTER TABLE public.artists
+  ADD COLUMN IF NOT EXISTS artist_key text GENERATED ALWAYS AS (public.artist_key(artist_name)) STORED;
+
+CREATE INDEX IF NOT EXISTS artists_artist_key_idx ON public.artists (artist_key, id);
+
+ALTER TABLE public.maindb
+  ADD COLUMN IF NOT EXISTS artist_01_id bigint REFERENCES public.artists (id) ON DELETE SET NULL,
+  ADD COLUMN IF NOT EXISTS artist_02_id bigint REFERENCES public.artists (id) ON DELETE SET NULL;
+
+WITH keys AS (
+  SELECT DISTINCT ON (artist_key) artist_key, id
+  FROM public.artists
+  WHERE artist_key IS NOT NULL
+  ORDER BY artist_key, id
+)
+UPDATE public.maindb m
+SET artist_01_id = k.id
+FROM keys k
+WHERE k.artist_key = public.artist_key(m.artist_01)
+  AND m.artist_01_id IS DISTINCT FROM k.id;
+
+WITH keys AS (
+  SELECT DISTINCT ON (artist_key) artist_key, id
+  FROM public.artists
+  WHERE artist_key IS NOT NULL
+  ORDER BY artist_key, id
+)
+UPDATE public.maindb m
+SET artist_02_id = k.id
+FROM keys k
+WHERE k.artist_key = public.artist_key(m.artist_02)
+  AND m.artist_02_id IS DISTINCT FROM k.id;
+
+-- History per artist is an index-only scan on these
+CREATE INDEX IF NOT EXISTS maindb_artist_01_id_idx ON public.maindb (artist_01_id) INCLUDE (collaboration_status);
+CREATE INDEX IF NOT EXISTS maindb_artist_02_id_idx ON public.maindb (artist_02_id) INCLUDE (collaboration_status);
+
+-- Rows whose artist is not in the catalog yet (small; used when that artist is added)
+CREATE INDEX IF NOT EXISTS maindb_artist_01_unlinked_idx
+  ON public.maindb (public.artist_key(artist_01)) WHERE artist_01_id IS NULL;
+CREATE INDEX IF NOT EXISTS maindb_artist_02_unlinked_idx
+  ON public.maindb (public.artist_key(artist_02)) WHERE artist_02_id IS NULL;
+
+DROP INDEX IF EXISTS public.maindb_artist_01_lower_idx;
+DROP INDEX IF EXISTS public.maindb_artist_02_lower_idx;
+
+-- ============================================
+-- 2. Keep the ids filled
+-- ============================================
+
+CREATE OR REPLACE FUNCTION public.maindb_link_artists()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.artist_01_id := (
+    SELECT a.id FROM public.artists a
+    WHERE a.artist_key = public.artist_key(NEW.artist_01)
+    ORDER BY a.id LIMIT 1
+  );
+  NEW.artist_02_id := (
+    SELECT a.id FROM public.artists a
+    WHERE a.artist_key = public.artist_key(NEW.artist_02)
+    ORDER BY a.id LIMIT 1
+  );
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS maindb_link_artists ON public.maindb;
+CREATE TRIGGER maindb_link_artists
+  BEFORE INSERT OR UPDATE OF artist_01, artist_02 ON public.maindb
+  FOR EACH ROW EXECUTE FUNCTION public.maindb_link_artists();
+
+-- Statement-level, so a bulk artist upload runs two UPDATEs rather than two per row
+CREATE OR REPLACE FUNCTION public.artists_claim_history()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  UPDATE public.maindb m
+  SET artist_01_id = n.id
+  FROM (SELECT DISTINCT ON (artist_key) artist_key, id FROM new_artists ORDER BY artist_key, id) n
+  WHERE m.artist_01_id IS NULL
+    AND public.artist_key(m.artist_01) = n.artist_key;
+
+  UPDATE public.maindb m
+  SET artist_02_id = n.id
+  FROM (SELECT DISTINCT ON (artist_key) artist_key, id FROM new_artists ORDER BY artist_key, id) n
+  WHERE m.artist_02_id IS NULL
+    AND public.artist_key(m.artist_02) = n.artist_key;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS artists_claim_history_insert ON public.artists;
+CREATE TRIGGER artists_claim_history_insert
+  AFTER INSERT ON public.artists
+  REFERENCING NEW TABLE AS new_artists
+  FOR EACH STATEMENT EXECUTE FUNCTION public.artists_claim_history();
+
+DROP TRIGGER IF EXISTS artists_claim_history_update ON public.artists;
+CREATE TRIGGER artists_claim_history_update
+  AFTER UPDATE ON public.artists
+  REFERENCING NEW TABLE AS new_artists
+  FOR EACH STATEMENT EXECUTE FUNCTION public.artists_claim_history();
+
+-- ============================================
+-- 3. History functions on integer joins
+-- ============================================
+
+-- Same signature and output as sql/2026-10-19_rank_artists_ann.sql
+CREATE OR REPLACE FUNCTION public.score_artist_candidates(
+  query_embedding vector(1536),
+  candidate_ids bigint[],
+  only_successful_collabs boolean DEFAULT false,
+  min_semantic_similarity float DEFAULT 0.0,
+  semantic_weight float DEFAULT 0.6,
+  historical_weight float DEFAULT 0.4
+)
+RETURNS TABLE (
+  artist_id bigint,
+  artist_name text,
+  artist_tags text,
+  semantic_similarity float,
+  historical_success float,
+  final_score float
+)
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+  a.id,
+  a.artist_name,
+  a.artist_tags,
+  s.similarity,
+  h.success_rate,
+  s.similarity * semantic_weight + h.success_rate * historical_weight
+FROM artists a
+CROSS JOIN LATERAL (
+  SELECT (1 - (a.embedding <=> query_embedding))::float AS similarity
+) s
+CROSS JOIN LATERAL (
+  -- Both positions, neutral prior 0.5 for unseen
+  SELECT COALESCE(SUM(x.success_flag)::float / NULLIF(COUNT(*), 0), 0.5) AS success_rate,
+         COALESCE(SUM(x.success_flag), 0) AS successes
+  FROM (
+    SELECT CASE WHEN lower(m.collaboration_status) = 'success' THEN 1 ELSE 0 END AS success_flag
+    FROM maindb m
+    WHERE m.artist_01_id = a.id
+    UNION ALL
+    SELECT CASE WHEN lower(m.collaboration_status) = 'success' THEN 1 ELSE 0 END AS success_flag
+    FROM maindb m
+    WHERE m.artist_02_id = a.id
+  ) x
+) h
+WHERE a.embedding IS NOT NULL
+  AND (candidate_ids IS NULL OR a.id = ANY (candidate_ids))
+  AND s.similarity >= min_semantic_similarity
+  AND (only_successful_collabs = FALSE OR h.successes > 0);
+$$;
+
+CREATE OR REPLACE FUNCTION public.rank_artists_by_embedding(
+  query_embedding vector(1536),
+  only_successful_collabs boolean DEFAULT false,
+  match_count integer DEFAULT 10,
+  min_semantic_similarity float DEFAULT 0.0
+)
+RETURNS TABLE (
+  artist_id bigint,
+  artist_name text,
+  artist_tags text,
+  semantic_similarity float,
+  historical_success float,
+  final_score float
+)
+LANGUAGE sql
+STABLE
+AS $$
+WITH success_rates AS (
+  -- Aggregate success rate per artist id across both positions
+  SELECT x.artist_id,
+         (SUM(x.success_flag)::float / COUNT(*)) AS success_rate,
+         SUM(x.success_flag) AS successes
+  FROM (
+    SELECT m.artist_01_id AS artist_id,
+           CASE WHEN lower(m.collaboration_status) = 'success' THEN 1 ELSE 0 END AS success_flag
+    FROM maindb m
+    WHERE m.artist_01_id IS NOT NULL
+    UNION ALL
+    SELECT m.artist_02_id AS artist_id,
+           CASE WHEN lower(m.collaboration_status) = 'success' THEN 1 ELSE 0 END AS success_flag
+    FROM maindb m
+    WHERE m.artist_02_id IS NOT NULL
+  ) x
+  GROUP BY x.artist_id
+)
+SELECT
+  a.id AS artist_id,
+  a.artist_name,
+  a.artist_tags,
+  (1 - (a.embedding <=> query_embedding)) AS semantic_similarity,
+  COALESCE(sr.success_rate, 0.5) AS historical_success,  -- neutral prior 0.5 for unseen
+  ((1 - (a.embedding <=> query_embedding)) * 0.6
+     + COALESCE(sr.success_rate, 0.5) * 0.4) AS final_score
+FROM artists a
+LEFT JOIN success_rates sr ON sr.artist_id = a.id
+WHERE a.embedding IS NOT NULL
+  AND (1 - (a.embedding <=> query_embedding)) >= min_semantic_similarity
+  AND (only_successful_collabs = FALSE OR COALESCE(sr.successes, 0) > 0)
+ORDER BY final_score DESC
+LIMIT match_count;
+$$;
+
+-- Per-artist collaboration counts for the two functions below (a self-collaboration counts once)
+CREATE OR REPLACE VIEW public.artist_collab_history AS
+SELECT x.artist_id,
+       COUNT(*) AS total_collabs,
+       SUM(CASE WHEN x.collaboration_status = 'Success' THEN 1 ELSE 0 END) AS successful_collabs
+FROM (
+  SELECT m.artist_01_id AS artist_id, m.collaboration_status
+  FROM maindb m
+  WHERE m.artist_01_id IS NOT NULL
+  UNION ALL
+  SELECT m.artist_02_id, m.collaboration_status
+  FROM maindb m
+  WHERE m.artist_02_id IS NOT NULL
+    AND m.artist_02_id IS DISTINCT FROM m.artist_01_id
+) x
+GROUP BY x.artist_id;
+
+CREATE OR REPLACE FUNCTION match_artists_with_history(
+  query_embedding vector(1536),
+  match_threshold float DEFAULT 0.5,
+  match_count int DEFAULT 10,
+  only_successful bool DEFAULT false
+)
+RETURNS TABLE (
+  id bigint,
+  artist_name text,
+  artist_tags text,
+  similarity float,
+  historical_success_rate float,
+  total_collaborations int,
+  successful_collaborations int
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH artist_similarities AS (
+    SELECT
+      artists.id,
+      artists.artist_name,
+      artists.artist_tags,
+      1 - (artists.embedding <=> query_embedding) AS similarity
+    FROM artists
+    WHERE artists.embedding IS NOT NULL
+      AND 1 - (artists.embedding <=> query_embedding) > match_threshold
+  )
+  SELECT
+    asi.id,
+    asi.artist_name,
+    asi.artist_tags,
+    asi.similarity,
+    COALESCE(ah.successful_collabs::float / NULLIF(ah.total_collabs, 0), 0.5)::float as historical_success_rate,
+    COALESCE(ah.total_collabs, 0)::int as total_collaborations,
+    COALESCE(ah.successful_collabs, 0)::int as successful_collaborations
+  FROM artist_similarities asi
+  LEFT JOIN public.artist_collab_history ah ON ah.artist_id = asi.id
+  WHERE
+    CASE
+      -- artists without history keep the 0.5 prior, as before
+      WHEN only_successful = true THEN COALESCE(ah.successful_collabs::float / NULLIF(ah.total_collabs, 0), 0.5) >= 0.5
+      ELSE true
+    END
+  ORDER BY asi.similarity DESC
+  LIMIT match_count;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION match_artists_combined_score(
+  query_embedding vector(1536),
+  match_threshold float DEFAULT 0.3,
+  match_count int DEFAULT 10,
+  semantic_weight float DEFAULT 0.6,
+  historical_weight float DEFAULT 0.4
+)
+RETURNS TABLE (
+  id bigint,
+  artist_name text,
+  artist_tags text,
+  semantic_similarity float,
+  historical_success_rate float,
+  combined_score float,
+  total_collaborations int,
+  successful_collaborations int
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH scored_artists AS (
+    SELECT
+      a.id,
+      a.artist_name,
+      a.artist_tags,
+      1 - (a.embedding <=> query_embedding) AS similarity,
+      COALESCE(ah.successful_collabs::float / NULLIF(ah.total_collabs, 0), 0.5) AS hist_rate,
+      COALESCE(ah.total_collabs, 0) AS total_collabs,
+      COALESCE(ah.successful_collabs, 0) AS successful_collabs
+    FROM artists a
+    LEFT JOIN public.artist_collab_history ah ON ah.artist_id = a.id
+    WHERE a.embedding IS NOT NULL
+  )
+  SELECT
+    sa.id,
+    sa.artist_name,
+    sa.artist_tags,
+    sa.similarity::float as semantic_similarity,
+    sa.hist_rate::float as historical_success_rate,
+    ((semantic_weight * sa.similarity) + (historical_weight * sa.hist_rate))::float as combined_score,
+    sa.total_collabs::int as total_collaborations,
+    sa.successful_collabs::int as successful_collaborations
+  FROM scored_artists sa
+  WHERE (semantic_weight * sa.similarity) + (historical_weight * sa.hist_rate) >= match_threshold
+  ORDER BY (semantic_weight * sa.similarity) + (historical_weight * sa.hist_rate) DESC
+  LIMIT match_count;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,89 @@
+-- Change feed for the Python API's in-memory catalog (scripts/catalog_feed.py).
+--
+-- The API keeps artists and collaboration history in memory and polls for
+-- rows changed since a watermark, instead of reloading everything:
+--   - artists.updated_at / maindb.updated_at: set on insert, and bumped on
+--     update when a column the catalog uses actually changes. A persist_artist
+--     upsert with identical tags does not wake the feed.
+--   - catalog_deletions: one row per deleted artist or maindb row, written by
+--     a statement-level trigger, so deletions can be polled the same way.
+-- The feed polls with `updated_at >= watermark - lag_window`, ordered by
+-- (updated_at, id). updated_at is taken when the row is written, not when its
+-- transaction commits. A row that commits after a newer one is caught by the
+-- overlap window, and re-applying an unchanged row is a no-op.
+
+BEGIN;
+
+ALTER TABLE public.artists ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+ALTER TABLE public.maindb ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS artists_updated_at_idx ON public.artists (updated_at, id);
+CREATE INDEX IF NOT EXISTS maindb_updated_at_idx ON public.maindb (updated_at, id);
+
+CREATE OR REPLACE FUNCTION public.touch_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.updated_at := clock_timestamp();
+  RETURN NEW;
+END;
+$$;
+
+-- Explicit column lists: generated columns (artist_key) are not computed yet in
+-- a BEFORE trigger, and the artist id backfill on maindb is not a catalog change.
+DROP TRIGGER IF EXISTS artists_touch_updated_at ON public.artists;
+CREATE TRIGGER artists_touch_updated_at
+  BEFORE UPDATE ON public.artists
+  FOR EACH ROW
+  WHEN ((OLD.artist_name, OLD.artist_tags, OLD.embedding) IS DISTINCT FROM (NEW.artist_name, NEW.artist_tags, NEW.embedding))
+  EXECUTE FUNCTION public.touch_updated_at();
+
+DROP TRIGGER IF EXISTS maindb_touch_updated_at ON public.maindb;
+CREATE TRIGGER maindb_touch_updated_at
+  BEFORE UPDATE ON public.maindb
+  FOR EACH ROW
+  WHEN ((OLD.artist_01_tags, OLD.artist_02_tags, OLD.collaboration_status)
+        IS DISTINCT FROM (NEW.artist_01_tags, NEW.artist_02_tags, NEW.collaboration_status))
+  EXECUTE FUNCTION public.touch_updated_at();
+
+CREATE TABLE IF NOT EXISTS public.catalog_deletions (
+  seq bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  table_name text NOT NULL,
+  row_id bigint NOT NULL,
+  deleted_at timestamptz NOT NULL DEFAULT clock_timestamp()
+);
+CREATE INDEX IF NOT EXISTS catalog_deletions_deleted_at_idx ON public.catalog_deletions (deleted_at, seq);
+-- Only the service key (which bypasses RLS) reads it
+ALTER TABLE public.catalog_deletions ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.record_catalog_deletions()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public.catalog_deletions (table_name, row_id)
+  SELECT TG_TABLE_NAME, o.id FROM old_rows o;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS artists_record_deletions ON public.artists;
+CREATE TRIGGER artists_record_deletions
+  AFTER DELETE ON public.artists
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.record_catalog_deletions();
+
+DROP TRIGGER IF EXISTS maindb_record_deletions ON public.maindb;
+CREATE TRIGGER maindb_record_deletions
+  AFTER DELETE ON public.maindb
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.record_catalog_deletions();
+
+COMMIT;
+
+-- The log only needs to cover the longest time an API worker can be behind.
+-- Prune it from time to time (e.g. pg_cron):
+-- DELETE FROM public.catalog_deletions WHERE deleted_at < now() - interval '7 days';
@@ -0,0 +1,181 @@
+-- Reduced-dimension artist embeddings (256 of text-embedding-3-small's 1536).
+--
+-- text-embedding-3 vectors can be shortened: the first N dimensions,
+-- re-normalized, are what the embeddings API returns for `dimensions = N`.
+-- artists.embedding stays the full-size source of truth. This migration adds:
+--   - artists.embedding_256, derived from embedding by a trigger on every
+--     insert or update, so writers (the backend's persist_artist, the upload
+--     scripts, the Python API's /artists) do not change
+--   - an HNSW index on it: 6x smaller than the 1536-d index, and faster to
+--     build and search
+--   - score_artist_candidates_256() and rank_artists_ann_256(). They have the
+--     same arguments and columns as the 1536-d functions, but take a 256-d
+--     query: the embeddings API with dimensions = 256, or the first 256
+--     values of a full embedding, re-normalized
+-- scripts/embedding_dims.py report shows how closely 256-d rankings follow
+-- full-size ones on our catalog, before any caller switches over.
+-- For 512 dimensions, apply a copy of this file with 256 replaced by 512.
+--
+-- Needs pgvector >= 0.7 (subvector, l2_normalize).
+
+BEGIN;
+
+ALTER TABLE public.artists ADD COLUMN IF NOT EXISTS embedding_256 vector(256);
+
+CREATE OR REPLACE FUNCTION public.sync_embedding_256()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.embedding_256 := CASE
+    WHEN NEW.embedding IS NULL THEN NULL
+    ELSE l2_normalize(subvector(NEW.embedding, 1, 256))::vector(256)
+  END;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS artists_sync_embedding_256 ON public.artists;
+CREATE TRIGGER artists_sync_embedding_256
+  BEFORE INSERT OR UPDATE OF embedding ON public.artists
+  FOR EACH ROW
+  EXECUTE FUNCTION public.sync_embedding_256();
+
+-- Backfill. Setting embedding to itself fires the trigger. The row's catalog
+-- columns do not change, so artists.updated_at is not bumped.
+UPDATE public.artists SET embedding = embedding WHERE embedding IS NOT NULL AND embedding_256 IS NULL;
+
+CREATE INDEX IF NOT EXISTS artists_embedding_256_idx
+  ON public.artists USING hnsw (embedding_256 vector_cosine_ops);
+
+-- Same as score_artist_candidates (sql/2026-10-20_artist_keys.sql) on embedding_256
+CREATE OR REPLACE FUNCTION public.score_artist_candidates_256(
+  query_embedding vector(256),
+  candidate_ids bigint[],
+  only_successful_collabs boolean DEFAULT false,
+  min_semantic_similarity float DEFAULT 0.0,
+  semantic_weight float DEFAULT 0.6,
+  historical_weight float DEFAULT 0.4
+)
+RETURNS TABLE (
+  artist_id bigint,
+  artist_name text,
+  artist_tags text,
+  semantic_similarity float,
+  historical_success float,
+  final_score float
+)
+LANGUAGE sql
+STABLE
+AS $$
+SELECT
+  a.id,
+  a.artist_name,
+  a.artist_tags,
+  s.similarity,
+  h.success_rate,
+  s.similarity * semantic_weight + h.success_rate * historical_weight
+FROM artists a
+CROSS JOIN LATERAL (
+  SELECT (1 - (a.embedding_256 <=> query_embedding))::float AS similarity
+) s
+CROSS JOIN LATERAL (
+  -- Both positions, neutral prior 0.5 for unseen
+  SELECT COALESCE(SUM(x.success_flag)::float / NULLIF(COUNT(*), 0), 0.5) AS success_rate,
+         COALESCE(SUM(x.success_flag), 0) AS successes
+  FROM (
+    SELECT CASE WHEN lower(m.collaboration_status) = 'success' THEN 1 ELSE 0 END AS success_flag
+    FROM maindb m
+    WHERE m.artist_01_id = a.id
+    UNION ALL
+    SELECT CASE WHEN lower(m.collaboration_status) = 'success' THEN 1 ELSE 0 END AS success_flag
+    FROM maindb m
+    WHERE m.artist_02_id = a.id
+  ) x
+) h
+WHERE a.embedding_256 IS NOT NULL
+  AND (candidate_ids IS NULL OR a.id = ANY (candidate_ids))
+  AND s.similarity >= min_semantic_similarity
+  AND (only_successful_collabs = FALSE OR h.successes > 0);
+$$;
+
+-- Same as rank_artists_ann (sql/2026-10-19_rank_artists_ann.sql) on embedding_256
+CREATE OR REPLACE FUNCTION public.rank_artists_ann_256(
+  query_embedding vector(256),
+  only_successful_collabs boolean DEFAULT false,
+  match_count integer DEFAULT 10,
+  min_semantic_similarity float DEFAULT 0.0,
+  candidate_k integer DEFAULT 100,
+  ef_search integer DEFAULT 100,
+  max_candidate_k integer DEFAULT 1000,
+  semantic_weight float DEFAULT 0.6,
+  historical_weight float DEFAULT 0.4
+)
+RETURNS TABLE (
+  artist_id bigint,
+  artist_name text,
+  artist_tags text,
+  semantic_similarity float,
+  historical_success float,
+  final_score float
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+  max_k integer := LEAST(GREATEST(max_candidate_k, 1), 1000);
+  k integer := LEAST(GREATEST(candidate_k, match_count, 1), max_k);
+  candidate_ids bigint[];
+  fetched integer;
+  survivors integer;
+BEGIN
+  LOOP
+    PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(ef_search, k), 1000)::text, true);
+
+    SELECT array_agg(c.id), count(*)
+    INTO candidate_ids, fetched
+    FROM (
+      SELECT a.id
+      FROM artists a
+      WHERE a.embedding_256 IS NOT NULL
+      ORDER BY a.embedding_256 <=> query_embedding
+      LIMIT k
+    ) c;
+
+    SELECT count(*) INTO survivors
+    FROM public.score_artist_candidates_256(
+      query_embedding, COALESCE(candidate_ids, '{}'), only_successful_collabs,
+      min_semantic_similarity, semantic_weight, historical_weight
+    );
+
+    EXIT WHEN survivors >= match_count OR fetched < k OR k >= max_k;
+    k := LEAST(k * 4, max_k);
+  END LOOP;
+
+  IF survivors < match_count AND fetched >= k THEN
+    candidate_ids := NULL;
+  ELSE
+    candidate_ids := COALESCE(candidate_ids, '{}');
+  END IF;
+
+  RETURN QUERY
+  SELECT *
+  FROM public.score_artist_candidates_256(
+    query_embedding, candidate_ids, only_successful_collabs,
+    min_semantic_similarity, semantic_weight, historical_weight
+  ) r
+  ORDER BY r.final_score DESC
+  LIMIT match_count;
+END;
+$$;
+
+COMMIT;
+
+-- Example usage:
+-- SELECT * FROM rank_artists_ann_256(
+--   (SELECT embedding_256 FROM artists WHERE artist_name = 'Ariana Grande' LIMIT 1),
+--   false, 10, 0.3
+-- );
+--
+-- Once every caller queries embedding_256, the full-size index can go:
+-- DROP INDEX IF EXISTS artists_embedding_idx;
@@ -0,0 +1,163 @@
+-- Benchmark: rank_artists_by_embedding (scores every artist) vs rank_artists_ann (HNSW + rerank)
+--
+-- Run with psql against a scratch database. It needs pgvector, both functions
+-- (supabase_functions.sql, then the sql/ migrations in order) and
+-- several GB of disk:
+--   psql "$DATABASE_URL" -v n_artists=200000 -v n_collabs=1000000 -f sql/bench/rank_artists_ann_bench.sql
+--
+-- Synthetic data goes into a separate schema `bench`, with tables named artists
+-- and maindb. Both functions refer to their tables without a schema, so with
+-- search_path = bench, public they run against the synthetic tables. Artists are
+-- 1536-d vectors around 64 "genre" centroids, so nearest neighbours are
+-- meaningful. Building the HNSW index dominates setup time.
+--
+-- Check in the output:
+--   - the stage-one plan is "Index Scan using artists_embedding_idx" with a Limit
+--   - the full-scoring plan is a Seq Scan + Sort over every artist
+--   - per-call timings for both functions
+--   - top-10 overlap, which shows the recall cost of the K window
+-- Clean up with: DROP SCHEMA bench CASCADE;
+
+\set ON_ERROR_STOP on
+\if :{?n_artists}
+\else
+  \set n_artists 100000
+\endif
+\if :{?n_collabs}
+\else
+  \set n_collabs 500000
+\endif
+
+DROP SCHEMA IF EXISTS bench CASCADE;
+CREATE SCHEMA bench;
+SET search_path = bench, public;
+
+-- ---------------------------------------------------------------
+-- Synthetic data
+-- ---------------------------------------------------------------
+
+CREATE TABLE bench.centroids AS
+SELECT g, (SELECT array_agg(random() - 0.5) FROM generate_series(1, 1536) WHERE g IS NOT NULL) AS v
+FROM generate_series(0, 63) g;
+
+CREATE TABLE bench.artists (
+  id bigint PRIMARY KEY,
+  artist_name text NOT NULL,
+  artist_tags text,
+  embedding vector(1536)
+);
+
+INSERT INTO bench.artists (id, artist_name, artist_tags, embedding)
+SELECT
+  i,
+  'artist_' || i,
+  'genre_' || (i % 64) || ', tag_' || (i % 997),
+  (SELECT array_agg(c.v[d] + (random() - 0.5) * 0.6 ORDER BY d) FROM generate_series(1, 1536) d)::vector(1536)
+FROM generate_series(1, :n_artists) i
+JOIN bench.centroids c ON c.g = i % 64;
+
+-- A few artists without embeddings, as in production
+UPDATE bench.artists SET embedding = NULL WHERE id % 500 = 0;
+
+CREATE TABLE bench.maindb (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  artist_01 text,
+  artist_02 text,
+  collaboration_status text,
+  artist_01_id bigint,
+  artist_02_id bigint
+);
+
+INSERT INTO bench.maindb (artist_01, artist_02, collaboration_status, artist_01_id, artist_02_id)
+SELECT 'artist_' || a1, 'artist_' || a2, status, a1, a2
+FROM (
+  SELECT
+    (1 + floor(random() * :n_artists))::bigint AS a1,
+    (1 + floor(random() * :n_artists))::bigint AS a2,
+    CASE WHEN random() < 0.35 THEN 'Success' ELSE 'Failure' END AS status
+  FROM generate_series(1, :n_collabs)
+) g;
+
+SET maintenance_work_mem = '2GB';
+CREATE INDEX artists_embedding_idx ON bench.artists USING hnsw (embedding vector_cosine_ops);
+CREATE INDEX maindb_artist_01_id_idx ON bench.maindb (artist_01_id) INCLUDE (collaboration_status);
+CREATE INDEX maindb_artist_02_id_idx ON bench.maindb (artist_02_id) INCLUDE (collaboration_status);
+ANALYZE bench.artists;
+ANALYZE bench.maindb;
+
+-- Query vector: an existing artist's embedding
+SELECT embedding AS q FROM bench.artists WHERE id = 4242 \gset
+
+\timing on
+
+-- ---------------------------------------------------------------
+-- Plans
+-- ---------------------------------------------------------------
+
+-- Stage one: expect Limit -> Index Scan using artists_embedding_idx
+SET hnsw.ef_search = 100;
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT a.id
+FROM artists a
+WHERE a.embedding IS NOT NULL
+ORDER BY a.embedding <=> :'q'::vector(1536)
+LIMIT 100;
+
+-- Stage two on 100 candidates: expect index(-only) scans on maindb_artist_0x_id_idx per candidate
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT *
+FROM score_artist_candidates(:'q'::vector(1536), (SELECT array_agg(id) FROM artists WHERE id <= 100))
+ORDER BY final_score DESC
+LIMIT 10;
+
+-- Ordering by the blended score (what rank_artists_by_embedding does): expect Seq Scan + Sort
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT a.id,
+       (1 - (a.embedding <=> :'q'::vector(1536))) * 0.6 + 0.5 * 0.4 AS final_score
+FROM artists a
+WHERE a.embedding IS NOT NULL
+ORDER BY final_score DESC
+LIMIT 10;
+
+-- The functions' inner plans can also be printed to the client where auto_explain
+-- can be loaded (superuser, or the library under $libdir/plugins):
+-- LOAD 'auto_explain';
+-- SET auto_explain.log_min_duration = 0;
+-- SET auto_explain.log_nested_statements = on;
+-- SET auto_explain.log_analyze = on;
+-- SET auto_explain.log_level = notice;
+
+-- ---------------------------------------------------------------
+-- Timings (first call of each warms the cache)
+-- ---------------------------------------------------------------
+
+SELECT count(*) FROM rank_artists_by_embedding(:'q'::vector(1536), false, 10, 0.0);
+SELECT count(*) FROM rank_artists_by_embedding(:'q'::vector(1536), false, 10, 0.0);
+SELECT count(*) FROM rank_artists_by_embedding(:'q'::vector(1536), true, 10, 0.0);
+
+SELECT count(*) FROM rank_artists_ann(:'q'::vector(1536), false, 10, 0.0);
+SELECT count(*) FROM rank_artists_ann(:'q'::vector(1536), false, 10, 0.0);
+SELECT count(*) FROM rank_artists_ann(:'q'::vector(1536), true, 10, 0.0);
+SELECT count(*) FROM rank_artists_ann(:'q'::vector(1536), false, 10, 0.0, candidate_k => 400, ef_search => 400);
+
+-- Selective filter: forces the K window to widen (and, at the cap, the full-scoring fallback)
+SELECT count(*) FROM rank_artists_ann(:'q'::vector(1536), false, 10, 0.9);
+
+-- ---------------------------------------------------------------
+-- Recall of the K window against full scoring
+-- ---------------------------------------------------------------
+
+\timing off
+
+SELECT k,
+       count(ann.artist_id) AS top10_overlap
+FROM unnest(ARRAY[50, 100, 400, 1000]) k
+LEFT JOIN LATERAL (
+  SELECT r.artist_id
+  FROM rank_artists_ann(:'q'::vector(1536), false, 10, 0.0, candidate_k => k, ef_search => k) r
+  JOIN rank_artists_by_embedding(:'q'::vector(1536), false, 10, 0.0) e USING (artist_id)
+) ann ON true
+GROUP BY k
+ORDER BY k;
+
+RESET search_path;